@@ -1,6 +1,14 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class AccountsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'accounts'
+
+    def ready(self):
+        import cloudinary
+
+        from . import signals  # noqa: F401
+
+        cloudinary.config(**getattr(settings, 'CLOUDINARY_CONFIG', {}))
@@ -0,0 +1,93 @@
+"""
+Donor availability lifecycle.
+
+Completing a donation defers the donor: they go 'busy' with
+``available_after`` set to the end of DONATION_INTERVAL_DAYS.
+release_deferred_donors (run by the release_deferred_donors command) puts
+donors whose deferral has ended back to 'available' in batches of set-based
+UPDATEs, so dispatch's ``availability_status = 'available'`` filter stays
+accurate on its own.
+
+Statuses a donor picked themselves are left alone: the release only turns
+'busy' back into 'available', and only for rows with an ``available_after``.
+"""
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+
+from blood_requests.models import DonationHistory
+from .counters import record_completions
+from .models import User
+
+DEFAULT_DONATION_INTERVAL_DAYS = 90
+DEFAULT_BATCH_SIZE = 1000
+
+
+def get_deferral_days():
+    return getattr(settings, 'DONATION_INTERVAL_DAYS', DEFAULT_DONATION_INTERVAL_DAYS)
+
+
+def defer_donors(donor_ids, donated_on=None):
+    """Mark donors as having just donated: busy until their deferral ends."""
+    donated_on = donated_on or timezone.localdate()
+    return User.objects.filter(pk__in=donor_ids).update(
+        last_donation_date=donated_on,
+        availability_status='busy',
+        available_after=donated_on + timedelta(days=get_deferral_days()),
+        updated_at=timezone.now(),
+    )
+
+
+def complete_donations(blood_request_ids):
+    """
+    Complete the accepted donations for finished requests and defer their
+    donors. The rows are locked first, and each donor's count comes from
+    their own guarded UPDATE, so a concurrent completion of the same
+    donations can't count them twice.
+    """
+    with transaction.atomic():
+        donations = DonationHistory.objects.filter(blood_request_id__in=blood_request_ids, status='accepted')
+        by_donor = {}
+        for pk, donor_id in donations.select_for_update().values_list('pk', 'donor_id'):
+            by_donor.setdefault(donor_id, []).append(pk)
+        per_donor = Counter()
+        for donor_id, pks in by_donor.items():
+            completed = donations.filter(pk__in=pks).update(status='completed', updated_at=timezone.now())
+            if completed:
+                per_donor[donor_id] = completed
+        if not per_donor:
+            return 0
+        record_completions(per_donor)
+        return defer_donors(list(per_donor))
+
+
+def release_deferred_donors(today=None, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Return donors whose deferral ended on or before ``today`` to the matching
+    pool; one UPDATE per batch of ``batch_size``. Returns how many deferrals ended.
+    """
+    today = today or timezone.localdate()
+    released = 0
+    while True:
+        batch = list(
+            User.objects.filter(available_after__lte=today)
+            .order_by('pk')
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        if not batch:
+            return released
+        User.objects.filter(pk__in=batch).update(
+            availability_status=Case(
+                When(availability_status='busy', then=Value('available')),
+                default=F('availability_status'),
+            ),
+            available_after=None,
+            updated_at=timezone.now(),
+        )
+        released += len(batch)
+        if len(batch) < batch_size:
+            return released
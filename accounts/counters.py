@@ -0,0 +1,54 @@
+"""
+Per-donor counters, kept on User so the leaderboard and "most active
+donors" read an index instead of grouping DonationHistory.
+
+- accepted_count: requests the donor has accepted (DonationHistory rows)
+- donation_count: those donations that were completed
+- last_donation_date: set with the deferral, see accounts.availability
+
+They're bumped with F() in the same transaction as the DonationHistory
+write. ``rebuild`` (the rebuild_donor_counters command) recounts everything
+from DonationHistory in one UPDATE, for backfills or after edits made
+outside the API.
+"""
+from django.db.models import Case, Count, F, IntegerField, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from blood_requests.models import DonationHistory
+from .models import User
+
+
+def record_acceptance(donor_id):
+    User.objects.filter(pk=donor_id).update(accepted_count=F('accepted_count') + 1, updated_at=timezone.now())
+
+
+def record_completions(donations_per_donor):
+    """``donations_per_donor``: {donor id: donations just completed}."""
+    if not donations_per_donor:
+        return 0
+    increment = Case(
+        *[When(pk=donor_id, then=Value(count)) for donor_id, count in donations_per_donor.items()],
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+    return User.objects.filter(pk__in=donations_per_donor).update(
+        donation_count=F('donation_count') + increment, updated_at=timezone.now(),
+    )
+
+
+def donation_counts(status=None):
+    """Correlated count of a user's DonationHistory rows (optionally of one status)."""
+    donations = DonationHistory.objects.filter(donor=OuterRef('pk'))
+    if status:
+        donations = donations.filter(status=status)
+    counted = donations.order_by().values('donor').annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(counted, output_field=IntegerField()), Value(0))
+
+
+def rebuild():
+    """Recount every user's counters from DonationHistory; returns the rows updated."""
+    return User.objects.update(
+        accepted_count=donation_counts(),
+        donation_count=donation_counts('completed'),
+    )
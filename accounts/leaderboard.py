@@ -0,0 +1,82 @@
+"""
+Donor leaderboard pagination.
+
+Donors are ranked by ``-donation_count, id``, the order of
+user_donation_count_idx. Pages are keyset-paginated: the cursor carries the
+last row's (donation_count, id) and the next page is the rows after it in
+index order, so every page costs one index range scan of page size + 1 rows
+however deep it is. There's no total count; that would scan every donor.
+"""
+import base64
+import binascii
+
+from django.db.models import Q
+from rest_framework import serializers
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+ORDERING = ('-donation_count', 'pk')
+# Cursor values must fit a signed 64-bit column
+MAX_CURSOR_VALUE = 2 ** 63 - 1
+
+
+def encode_cursor(donation_count, pk):
+    return base64.urlsafe_b64encode(f'{donation_count}:{pk}'.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        donation_count, pk = (int(part) for part in raw.split(':'))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise serializers.ValidationError({'cursor': ['Invalid cursor.']})
+    if not (0 <= donation_count <= MAX_CURSOR_VALUE and 0 <= pk <= MAX_CURSOR_VALUE):
+        raise serializers.ValidationError({'cursor': ['Invalid cursor.']})
+    return donation_count, pk
+
+
+class LeaderboardPagination(BasePagination):
+    page_size = 20
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            donation_count, pk = decode_cursor(cursor)
+            queryset = queryset.filter(Q(donation_count__lt=donation_count) | Q(donation_count=donation_count, pk__gt=pk))
+
+        rows = list(queryset.order_by(*ORDERING)[:page_size + 1])
+        self.next_cursor = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            self.next_cursor = encode_cursor(rows[-1].donation_count, rows[-1].pk)
+        return rows
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
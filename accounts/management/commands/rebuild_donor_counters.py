@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from accounts.counters import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Recount every donor\'s accepted and completed donations from the donation history'
+
+    def handle(self, *args, **options):
+        updated = rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Recounted donations for {updated} users'))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from accounts.search import rebuild_gram_index, reindex_trigram_indexes, uses_gram_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the fuzzy user search index (pg_trgm indexes or the trigram fallback table)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default', help='Database alias to rebuild')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per bulk insert')
+
+    def handle(self, *args, **options):
+        conn = connections[options['database']]
+        if uses_gram_index(conn):
+            rebuild_gram_index(using=conn.alias, batch_size=options['batch_size'])
+        else:
+            reindex_trigram_indexes(conn)
+        self.stdout.write(self.style.SUCCESS('User search index rebuilt.'))
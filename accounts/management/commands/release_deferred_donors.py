@@ -0,0 +1,25 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from accounts.availability import DEFAULT_BATCH_SIZE, release_deferred_donors
+
+
+class Command(BaseCommand):
+    help = 'Return donors whose post-donation deferral has ended to available'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Release due donors once and exit')
+        parser.add_argument('--interval', type=float, default=None, help='Seconds between runs')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='Donors per UPDATE')
+
+    def handle(self, *args, **options):
+        interval = options['interval'] or getattr(settings, 'AVAILABILITY_RELEASE_INTERVAL', 60 * 60)
+        while True:
+            released = release_deferred_donors(batch_size=options['batch_size'])
+            if released:
+                self.stdout.write(self.style.SUCCESS(f'Released {released} donors'))
+            if options['once']:
+                break
+            time.sleep(interval)
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.25 on 2026-10-19 15:48
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_remove_user_latitude_remove_user_longitude'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserSearchGram',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('field', models.CharField(choices=[('full_name', 'Full name'), ('email', 'Email'), ('address', 'Address')], max_length=20)),
+                ('gram', models.CharField(max_length=3)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['role', 'is_active', 'is_verified'], name='user_role_active_verified_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['is_active', 'is_verified'], name='user_active_verified_idx'),
+        ),
+        migrations.AddField(
+            model_name='usersearchgram',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_grams', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='usersearchgram',
+            index=models.Index(fields=['gram', 'field', 'user'], name='usersearchgram_lookup_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.25 on 2026-10-19 15:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0008_user_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='profile_picture_thumbnail',
+            field=models.URLField(blank=True, default='', max_length=500),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 4.2.25 on 2026-10-19 17:00
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def count_donations(apps, schema_editor):
+    User = apps.get_model('accounts', 'User')
+    DonationHistory = apps.get_model('blood_requests', 'DonationHistory')
+
+    def counted(**filters):
+        rows = DonationHistory.objects.filter(donor=OuterRef('pk'), **filters)
+        totals = rows.order_by().values('donor').annotate(total=Count('pk')).values('total')
+        return Coalesce(Subquery(totals, output_field=IntegerField()), Value(0))
+
+    User.objects.update(accepted_count=counted(), donation_count=counted(status='completed'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0011_user_available_after'),
+        ('blood_requests', '0006_bloodrequestevent_bloodrequestdailystats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='accepted_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='donation_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['-donation_count', 'id'], name='user_donation_count_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['-accepted_count', 'id'], name='user_accepted_count_idx'),
+        ),
+        migrations.RunPython(count_donations, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 4.2.25 on 2026-10-19 18:45
+
+import re
+
+from django.db import migrations
+
+TABLE = 'accounts_user'
+SEARCHABLE_FIELDS = ('full_name', 'email', 'address')
+
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def trigrams(text):
+    grams = set()
+    for word in _WORD_RE.findall((text or '').lower()):
+        padded = f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def install_trigram_index(apps, schema_editor):
+    """
+    PostgreSQL: enable pg_trgm and add GIN trigram indexes. Other databases
+    use the UserSearchGram table, which is backfilled here if it is empty.
+    """
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        for field in SEARCHABLE_FIELDS:
+            schema_editor.execute(
+                f"CREATE INDEX IF NOT EXISTS {TABLE}_{field}_trgm ON {TABLE} USING GIN ({field} gin_trgm_ops)"
+            )
+        return
+
+    using = schema_editor.connection.alias
+    User = apps.get_model('accounts', 'User')
+    UserSearchGram = apps.get_model('accounts', 'UserSearchGram')
+    if UserSearchGram.objects.using(using).exists():
+        return
+    batch = []
+    for user in User.objects.using(using).only('pk', *SEARCHABLE_FIELDS).iterator(chunk_size=1000):
+        batch.extend(
+            UserSearchGram(user_id=user.pk, field=field, gram=gram)
+            for field in SEARCHABLE_FIELDS
+            for gram in trigrams(getattr(user, field))
+        )
+        if len(batch) >= 1000:
+            UserSearchGram.objects.using(using).bulk_create(batch)
+            batch = []
+    UserSearchGram.objects.using(using).bulk_create(batch)
+
+
+def remove_trigram_index(apps, schema_editor):
+    # The pg_trgm extension is left installed; other schemas may use it
+    if schema_editor.connection.vendor == 'postgresql':
+        for field in SEARCHABLE_FIELDS:
+            schema_editor.execute(f"DROP INDEX IF EXISTS {TABLE}_{field}_trgm")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0012_user_donor_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_trigram_index, remove_trigram_index),
+    ]
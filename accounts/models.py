@@ -61,11 +61,21 @@ class User(AbstractUser):
     availability_status = models.CharField(
         max_length=20, choices=AVAILABILITY_CHOICES, default='available'
     )
+    # End of the deferral after a completed donation; accounts.availability
+    # keeps the donor busy until then
+    available_after = models.DateField(blank=True, null=True)
     is_verified = models.BooleanField(default=False)
     blood_group = models.CharField(max_length=3, choices=BLOOD_GROUP_CHOICES, blank=True, null=True)
     role = models.CharField(max_length=20, choices=ROLE_CHOICES, default='donor')
 
     profile_picture = CloudinaryField('image', blank=True, null=True, default='profile_pictures/default.jpg')
+    # Precomputed when the picture is recorded so list endpoints don't rebuild it
+    profile_picture_thumbnail = models.URLField(max_length=500, blank=True, default='')
+    # Denormalized from DonationHistory by accounts.counters
+    accepted_count = models.PositiveIntegerField(default=0)
+    donation_count = models.PositiveIntegerField(default=0)
+    # Bumped by save(); queryset.update() callers must set it themselves
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     
 
@@ -77,5 +87,41 @@ class User(AbstractUser):
 
     objects = CustomUserManager()
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Admin list filters (role / is_active / is_verified)
+            models.Index(fields=['role', 'is_active', 'is_verified'], name='user_role_active_verified_idx'),
+            models.Index(fields=['is_active', 'is_verified'], name='user_active_verified_idx'),
+            # Deferrals that have ended: available_after <= today
+            models.Index(fields=['available_after'], name='user_available_after_idx'),
+            # Leaderboard and most active donors, read in counter order
+            models.Index(fields=['-donation_count', 'id'], name='user_donation_count_idx'),
+            models.Index(fields=['-accepted_count', 'id'], name='user_accepted_count_idx'),
+        ]
+
+    def __str__(self):
+        return self.email
+
+
+class UserSearchGram(models.Model):
+    """
+    Trigram index for fuzzy user search on databases without pg_trgm.
+    One row per (user, field, trigram); maintained by accounts.signals.
+    """
+    FIELD_CHOICES = [
+        ('full_name', 'Full name'),
+        ('email', 'Email'),
+        ('address', 'Address'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='search_grams')
+    field = models.CharField(max_length=20, choices=FIELD_CHOICES)
+    gram = models.CharField(max_length=3)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['gram', 'field', 'user'], name='usersearchgram_lookup_idx'),
+        ]
+
     def __str__(self):
-        return self.email
\ No newline at end of file
+        return f"{self.user_id}:{self.field}:{self.gram}"
\ No newline at end of file
@@ -0,0 +1,149 @@
+import math
+import operator
+import re
+from functools import reduce
+
+from django.db import connection, connections, models
+from django.db.models import Count, OuterRef, Q, Subquery, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Coalesce, Greatest
+from rest_framework import filters
+
+from .models import User, UserSearchGram
+
+# Fields of User that can be searched; each view picks a subset via search_fields
+SEARCHABLE_FIELDS = ('full_name', 'email', 'address')
+
+# Share of the query's trigrams a field must contain to count as a match
+# (mirrors pg_trgm's word_similarity threshold closely enough for names)
+MIN_SIMILARITY = 0.5
+
+TABLE = User._meta.db_table
+
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+# -------------------------
+# PostgreSQL trigram indexes
+# -------------------------
+# pg_trgm and the GIN indexes below are installed by migration
+# 0013_user_search_trigram_indexes; other databases use UserSearchGram.
+def trigram_index_names():
+    return [f'{TABLE}_{field}_trgm' for field in SEARCHABLE_FIELDS]
+
+
+def reindex_trigram_indexes(conn=connection):
+    with conn.cursor() as cursor:
+        for name in trigram_index_names():
+            cursor.execute(f'REINDEX INDEX {name}')
+
+
+# -------------------------
+# Pure-Python n-gram index
+# -------------------------
+def trigrams(text):
+    """Trigrams the way pg_trgm builds them: lowercase words padded with blanks."""
+    grams = set()
+    for word in _WORD_RE.findall((text or '').lower()):
+        padded = f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def gram_rows(user):
+    return [
+        UserSearchGram(user_id=user.pk, field=field, gram=gram)
+        for field in SEARCHABLE_FIELDS
+        for gram in trigrams(getattr(user, field))
+    ]
+
+
+def uses_gram_index(conn=connection):
+    return conn.vendor != 'postgresql'
+
+
+def reindex_user(user, using='default'):
+    UserSearchGram.objects.using(using).filter(user_id=user.pk).delete()
+    UserSearchGram.objects.using(using).bulk_create(gram_rows(user))
+
+
+def rebuild_gram_index(using='default', batch_size=1000):
+    UserSearchGram.objects.using(using).all().delete()
+    users = User.objects.using(using).only('pk', *SEARCHABLE_FIELDS)
+    batch = []
+    for user in users.iterator(chunk_size=batch_size):
+        batch.extend(gram_rows(user))
+        if len(batch) >= batch_size:
+            UserSearchGram.objects.using(using).bulk_create(batch)
+            batch = []
+    UserSearchGram.objects.using(using).bulk_create(batch)
+
+
+# -------------------------
+# Querying
+# -------------------------
+def search_users(queryset, text, fields):
+    """
+    Fuzzy-match ``text`` against ``fields`` of the users in ``queryset`` and
+    order the results by similarity. Returns the queryset unchanged when
+    ``text`` has no searchable words. Runs on the queryset's database.
+    """
+    conn = connections[queryset.db]
+    fields = [field for field in fields if field in SEARCHABLE_FIELDS]
+    text = ' '.join(_WORD_RE.findall(text or ''))
+    if not text or not fields:
+        return queryset
+
+    if conn.vendor == 'postgresql':
+        # "<%" (word similarity) and ILIKE are both served by the gin_trgm_ops indexes
+        conditions = [
+            RawSQL(f'%s <%% {TABLE}.{field}', [text], output_field=models.BooleanField())
+            for field in fields
+        ] + [Q(**{f'{field}__icontains': text}) for field in fields]
+        similarity = [
+            RawSQL(f'word_similarity(%s, coalesce({TABLE}.{field}, \'\'))', [text],
+                   output_field=models.FloatField())
+            for field in fields
+        ]
+        rank = Greatest(*similarity) if len(similarity) > 1 else similarity[0]
+        return (
+            queryset.filter(reduce(operator.or_, conditions))
+            .annotate(search_rank=rank)
+            .order_by('-search_rank', 'pk')
+        )
+
+    grams = trigrams(text)
+    required = max(1, math.ceil(len(grams) * MIN_SIMILARITY))
+    search_grams = UserSearchGram.objects.using(queryset.db)
+    hits = (
+        search_grams.filter(user=OuterRef('pk'), field__in=fields, gram__in=grams)
+        .values('user')
+        .annotate(hits=Count('gram', distinct=True))
+        .values('hits')
+    )
+    matching = (
+        search_grams.filter(field__in=fields, gram__in=grams)
+        .values('user')
+        .annotate(hits=Count('gram', distinct=True))
+        .filter(hits__gte=required)
+        .values('user')
+    )
+    return (
+        queryset.filter(pk__in=matching)
+        .annotate(search_rank=Coalesce(Subquery(hits), Value(0)))
+        .order_by('-search_rank', 'pk')
+    )
+
+
+class TrigramSearchFilter(filters.SearchFilter):
+    """
+    SearchFilter replacement for User querysets: typo-tolerant and backed by
+    pg_trgm on PostgreSQL or the UserSearchGram table elsewhere.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        fields = self.get_search_fields(view, request)
+        if not fields:
+            return queryset
+        text = ' '.join(self.get_search_terms(request))
+        return search_users(queryset, text, fields)
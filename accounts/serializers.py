@@ -7,8 +7,10 @@ from django.utils.http import urlsafe_base64_encode
 from django.utils.encoding import force_bytes
 from django.contrib.auth.tokens import default_token_generator
 from .models import User 
+from .uploads import CachedImageField, get_upload_backend, make_resource, profile_picture_prefix, thumbnail_url
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from django.contrib.auth import authenticate
+from hemogrid.fieldsets import SparseFieldsetMixin
 User = get_user_model()
 
 
@@ -59,7 +61,7 @@ class ResendVerificationSerializer(serializers.Serializer):
 
 
 # Admin view of users
-class AdminUserSerializer(serializers.ModelSerializer):
+class AdminUserSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['id', 'email', 'blood_group', 'is_active', 'is_verified', 'is_staff']
@@ -105,16 +107,60 @@ class RegisterSerializer(serializers.ModelSerializer):
 # -------------------------
 # Donor Profile Serializer
 # -------------------------
-class DonorProfileSerializer(serializers.ModelSerializer):
-    profile_picture = serializers.ImageField(required=False, allow_null=True)
+class DonorProfileSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    profile_picture = CachedImageField(required=False, allow_null=True)
+    profile_picture_thumbnail = serializers.SerializerMethodField()
 
     class Meta:
         model = User
         fields = [
             'id', 'email', 'full_name', 'age', 'address',
             'last_donation_date', 'availability_status', 'blood_group',
-            'is_verified', 'profile_picture', 'role',
+            'is_verified', 'profile_picture', 'role', 'profile_picture_thumbnail', 'available_after',
         ]
+        read_only_fields = ['available_after']
+        method_field_sources = {'profile_picture_thumbnail': ['profile_picture_thumbnail', 'profile_picture']}
+
+    def get_profile_picture_thumbnail(self, obj):
+        return obj.profile_picture_thumbnail or thumbnail_url(obj.profile_picture)
+
+    def update(self, instance, validated_data):
+        instance = super().update(instance, validated_data)
+        if 'profile_picture' in validated_data:
+            # Multipart uploads still pass through the worker; keep the thumbnail in step
+            instance.profile_picture_thumbnail = thumbnail_url(instance.profile_picture) or ''
+            instance.save(update_fields=['profile_picture_thumbnail', 'updated_at'])
+        return instance
+
+# -------------------------
+# Direct Profile Picture Upload
+# -------------------------
+class ProfilePictureUploadSerializer(serializers.Serializer):
+    """Records a picture the client uploaded straight to storage."""
+    public_id = serializers.CharField(max_length=200)
+    version = serializers.CharField(max_length=20)
+    signature = serializers.CharField(max_length=128)
+    format = serializers.CharField(max_length=10, required=False, allow_blank=True)
+
+    def validate(self, attrs):
+        user = self.context['request'].user
+        if not attrs['public_id'].startswith(profile_picture_prefix(user)):
+            raise serializers.ValidationError({"public_id": "Upload was not signed for this account."})
+        if not get_upload_backend().verify_upload(attrs['public_id'], attrs['version'], attrs['signature']):
+            raise serializers.ValidationError({"signature": "Invalid upload signature."})
+        return attrs
+
+    def save(self, **kwargs):
+        user = self.context['request'].user
+        resource = make_resource(
+            self.validated_data['public_id'],
+            version=self.validated_data['version'],
+            format=self.validated_data.get('format'),
+        )
+        user.profile_picture = resource
+        user.profile_picture_thumbnail = thumbnail_url(resource) or ''
+        user.save(update_fields=['profile_picture', 'profile_picture_thumbnail', 'updated_at'])
+        return user
 # -------------------------
 # Update Availability Serializer
 # -------------------------
@@ -171,6 +217,15 @@ class UpdateEmailSerializer(serializers.Serializer):
             raise serializers.ValidationError("This email is already in use.")
         return value
     
+# -------------------------
+# Leaderboard
+# -------------------------
+class LeaderboardSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = User
+        fields = ['id', 'full_name', 'blood_group', 'donation_count', 'last_donation_date']
+
+
 # -------------------------
 # Availability
 # -------------------------
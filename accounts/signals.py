@@ -0,0 +1,16 @@
+from django.db import connections
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import User
+from .search import SEARCHABLE_FIELDS, reindex_user, uses_gram_index
+
+
+@receiver(post_save, sender=User)
+def update_search_grams(sender, instance, using, update_fields=None, raw=False, **kwargs):
+    """Keep the fallback trigram index in step with the searchable fields."""
+    if raw or not uses_gram_index(connections[using]):
+        return
+    if update_fields is not None and not set(update_fields) & set(SEARCHABLE_FIELDS):
+        return
+    reindex_user(instance, using=using)
@@ -1,9 +1,20 @@
+import io
+from datetime import date, timedelta
+from unittest import mock
+
 from django.urls import reverse
 from django.core import mail
+from django.core.management import call_command
+from django.db.models import QuerySet
 from django.test import override_settings
 from rest_framework import status
 from rest_framework.test import APITestCase
 from django.contrib.auth import get_user_model
+from django.utils import timezone
+
+from blood_requests.models import BloodRequest, DonationHistory
+from .availability import complete_donations, release_deferred_donors
+from .leaderboard import encode_cursor
 
 User = get_user_model()
 
@@ -61,3 +72,318 @@ class RegisterViewTests(APITestCase):
         self.assertEqual(len(mail.outbox), 1)
         sent_mail = mail.outbox[0]
         self.assertIn("http://testserver/api/auth/verify-email/", sent_mail.body)
+
+
+@override_settings(PROFILE_PICTURE_UPLOAD_BACKEND="accounts.uploads.LocalStubUploadBackend")
+class UserSearchTests(APITestCase):
+    def setUp(self):
+        def create(email, **extra):
+            extra.setdefault("is_active", True)
+            extra.setdefault("is_verified", True)
+            return User.objects.create_user(email=email, password="StrongPass!234", **extra)
+
+        self.create = create
+        self.rahman = create("rahman@example.com", full_name="Abdur Rahman", address="Mirpur, Dhaka")
+        self.karim = create("karim@hospital.org", full_name="Karim Uddin", address="Agrabad, Chittagong")
+
+    def search_donors(self, term):
+        response = self.client.get(reverse("auth:donors"), {"search": term})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [row["id"] for row in response.data["results"]]
+
+    def test_public_donor_search_tolerates_typos(self):
+        self.assertEqual(self.search_donors("rahmna"), [self.rahman.id])
+        self.assertEqual(self.search_donors("chittagong"), [self.karim.id])
+
+    def test_public_donor_search_does_not_match_email(self):
+        self.assertEqual(self.search_donors("hospital"), [])
+
+    def test_search_index_follows_profile_changes(self):
+        self.rahman.full_name = "Abdur Hossain"
+        self.rahman.save()
+        self.assertEqual(self.search_donors("rahman"), [])
+        self.assertEqual(self.search_donors("hossain"), [self.rahman.id])
+
+    def test_admin_user_list_filters_and_searches_email(self):
+        admin = self.create("admin@example.com", role="admin", is_staff=True)
+        self.create("pending@example.com", is_verified=False, role="hospital")
+        self.client.force_authenticate(admin)
+
+        response = self.client.get("/api/admin/users/", {"is_verified": "false"})
+        self.assertEqual([row["email"] for row in response.data["results"]], ["pending@example.com"])
+
+        response = self.client.get(reverse("auth:admin-users-list"), {"role": "donor", "search": "hospital.org"})
+        self.assertEqual([row["id"] for row in response.data["results"]], [self.karim.id])
+
+
+@override_settings(PROFILE_PICTURE_UPLOAD_BACKEND="accounts.uploads.LocalStubUploadBackend", MEDIA_URL="/media/")
+class ProfilePictureUploadTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="donor@example.com", password="StrongPass!234", is_active=True, is_verified=True,
+        )
+        self.client.force_authenticate(self.user)
+
+    def sign(self):
+        response = self.client.post(reverse("auth:profile-picture-signature"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data["fields"]["public_id"]
+
+    def test_signed_upload_is_recorded_with_thumbnail(self):
+        from .uploads import get_upload_backend
+
+        public_id = self.sign()
+        upload = get_upload_backend().upload_response(public_id, version=17)
+        response = self.client.post(reverse("auth:profile-picture"), {**upload, "format": "jpg"}, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["profile_picture"], f"http://testserver/media/{public_id}.jpg")
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.profile_picture.public_id, public_id)
+        self.assertEqual(self.user.profile_picture.version, "17")
+        self.assertEqual(self.user.profile_picture_thumbnail, f"/media/{public_id}.jpg?w=150&h=150")
+
+        donors = self.client.get(reverse("auth:donors")).data["results"]
+        self.assertEqual(donors[0]["profile_picture_thumbnail"], self.user.profile_picture_thumbnail)
+
+    def test_rejects_bad_signature_and_foreign_public_id(self):
+        from .uploads import get_upload_backend
+
+        public_id = self.sign()
+        upload = get_upload_backend().upload_response(public_id)
+        response = self.client.post(reverse("auth:profile-picture"), {**upload, "signature": "forged"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        foreign = get_upload_backend().upload_response("profile_pictures/user_999_abc")
+        response = self.client.post(reverse("auth:profile-picture"), foreign, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@override_settings(PROFILE_PICTURE_UPLOAD_BACKEND="accounts.uploads.LocalStubUploadBackend", MEDIA_URL="/media/")
+class PublicDonorProjectionTests(APITestCase):
+    """The .values() fast path must render exactly what DonorProfileSerializer does."""
+
+    def setUp(self):
+        from .uploads import make_resource
+
+        def create(email, **extra):
+            extra = {"is_active": True, "is_verified": True, **extra}
+            return User.objects.create_user(email=email, password="StrongPass!234", **extra)
+
+        create("plain@example.com", full_name="Abdur Rahman", address="Mirpur, Dhaka", blood_group="O+")
+        create("pictured@example.com", full_name="করিম উদ্দিন", age=31, blood_group="A-",
+               last_donation_date=date(2024, 1, 15), profile_picture=make_resource("profile_pictures/user_2_a", 4, "png"))
+        create("thumbed@example.com", full_name="Nusrat Jahan", availability_status="not_available",
+               profile_picture=make_resource("profile_pictures/user_3_b", 9, "jpg"),
+               profile_picture_thumbnail="https://cdn.example.com/thumb.jpg")
+        create("hidden@example.com", is_verified=False)
+        for i in range(10):
+            create(f"donor{i}@example.com", full_name=f"Donor {i}", blood_group="B+")
+
+    def assert_identical(self, params=None, queries=None):
+        from .views import PublicDonorListView
+
+        url = reverse("auth:donors")
+        if queries is None:
+            fast = self.client.get(url, params)
+        else:
+            with self.assertNumQueries(queries):
+                fast = self.client.get(url, params)
+        with mock.patch.object(PublicDonorListView, "use_projection", False):
+            slow = self.client.get(url, params)
+        self.assertEqual(fast.status_code, status.HTTP_200_OK)
+        self.assertEqual(fast.content, slow.content)
+        return fast
+
+    def test_public_donor_list_is_byte_identical(self):
+        response = self.assert_identical(queries=3)
+        self.assertEqual(response.data["count"], 13)
+        self.assert_identical({"page": 2})
+        self.assert_identical({"blood_group": "A-"})
+        self.assert_identical({"availability_status": "not_available"})
+        response = self.assert_identical({"search": "rahman"})
+        self.assertEqual([row["email"] for row in response.data["results"]], ["plain@example.com"])
+
+    def test_sparse_fieldsets_are_byte_identical(self):
+        response = self.assert_identical({"fields": "id,full_name,profile_picture_thumbnail"})
+        self.assertEqual(list(response.data["results"][0]), ["id", "full_name", "profile_picture_thumbnail"])
+        self.assert_identical({"exclude": "email,profile_picture", "blood_group": "A-"})
+
+    def test_pictures_render_as_absolute_urls(self):
+        response = self.assert_identical({"blood_group": "A-"})
+        row = response.data["results"][0]
+        self.assertEqual(row["profile_picture"], "http://testserver/media/profile_pictures/user_2_a.png")
+        self.assertEqual(row["profile_picture_thumbnail"], "/media/profile_pictures/user_2_a.png?w=150&h=150")
+
+
+@override_settings(PROFILE_PICTURE_UPLOAD_BACKEND="accounts.uploads.LocalStubUploadBackend", MEDIA_URL="/media/")
+class DonorProfileConditionalTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="donor@example.com", password="StrongPass!234", is_active=True, full_name="Donor",
+        )
+        self.client.force_authenticate(self.user)
+        self.url = reverse("auth:donor-profile")
+
+    def test_profile_revalidates_without_queries(self):
+        etag = self.client.get(self.url)["ETag"]
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.client.patch(self.url, {"full_name": "Renamed"}, format="json")
+        self.user.refresh_from_db()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["full_name"], "Renamed")
+
+
+@override_settings(DONATION_INTERVAL_DAYS=90)
+class AvailabilityLifecycleTests(APITestCase):
+    def setUp(self):
+        self.requester = User.objects.create_user(email="requester@example.com", password="x", is_active=True)
+        self.donor = User.objects.create_user(
+            email="donor@example.com", password="x", is_active=True, availability_status="available",
+        )
+
+    def test_completing_a_donation_defers_the_donor(self):
+        blood_request = BloodRequest.objects.create(
+            requester=self.requester, blood_group="O+", quantity=1, location="Dhaka", contact_info="017",
+            status="accepted",
+        )
+        donation = DonationHistory.objects.create(donor=self.donor, blood_request=blood_request)
+        self.client.force_authenticate(self.requester)
+        response = self.client.post(reverse("blood-request-complete", args=[blood_request.pk]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        today = timezone.localdate()
+        self.donor.refresh_from_db()
+        donation.refresh_from_db()
+        self.assertEqual(donation.status, "completed")
+        self.assertEqual(self.donor.availability_status, "busy")
+        self.assertEqual(self.donor.last_donation_date, today)
+        self.assertEqual(self.donor.available_after, today + timedelta(days=90))
+        self.assertEqual((self.donor.accepted_count, self.donor.donation_count), (0, 1))
+
+        # The donor can't opt back in early
+        self.client.force_authenticate(self.donor)
+        response = self.client.put(reverse("auth:update-availability"), {"availability_status": "available"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_racing_completions_count_each_donation_once(self):
+        blood_request = BloodRequest.objects.create(
+            requester=self.requester, blood_group="O+", quantity=1, location="Dhaka", contact_info="017",
+        )
+        donation = DonationHistory.objects.create(donor=self.donor, blood_request=blood_request)
+        self.assertEqual(complete_donations([blood_request.pk]), 1)
+
+        # A second completion that read the row before the first one's UPDATE
+        stale = mock.Mock(**{"values_list.return_value": [(donation.pk, self.donor.pk)]})
+        with mock.patch.object(QuerySet, "select_for_update", return_value=stale):
+            self.assertEqual(complete_donations([blood_request.pk]), 0)
+        self.donor.refresh_from_db()
+        self.assertEqual(self.donor.donation_count, 1)
+
+    def test_release_only_ends_due_deferrals(self):
+        today = timezone.localdate()
+        due = [
+            User.objects.create_user(email=f"due{i}@example.com", password="x", availability_status="busy",
+                                     available_after=today - timedelta(days=i))
+            for i in range(3)
+        ]
+        waiting = User.objects.create_user(email="waiting@example.com", password="x", availability_status="busy",
+                                           available_after=today + timedelta(days=1))
+        chose_busy = User.objects.create_user(email="busy@example.com", password="x", availability_status="busy")
+        opted_out = User.objects.create_user(email="out@example.com", password="x",
+                                             availability_status="not_available", available_after=today)
+
+        # Two full batches (select + update each) and a last, empty select
+        with self.assertNumQueries(5):
+            self.assertEqual(release_deferred_donors(batch_size=2), 4)
+
+        statuses = dict(User.objects.values_list("email", "availability_status"))
+        self.assertEqual({statuses[user.email] for user in due}, {"available"})
+        self.assertEqual(statuses[waiting.email], "busy")
+        self.assertEqual(statuses[chose_busy.email], "busy")
+        self.assertEqual(statuses[opted_out.email], "not_available")
+        self.assertFalse(User.objects.filter(available_after__lte=today).exists())
+
+        out = io.StringIO()
+        call_command("release_deferred_donors", "--once", stdout=out)
+        self.assertEqual(out.getvalue(), "")
+
+
+class DonorCounterTests(APITestCase):
+    def setUp(self):
+        self.requester = User.objects.create_user(email="requester@example.com", password="x", is_active=True)
+        self.admin = User.objects.create_user(email="admin@example.com", password="x", is_active=True,
+                                              role="admin", is_staff=True)
+        self.donors = [
+            User.objects.create_user(email=f"donor{i}@example.com", password="x", is_active=True,
+                                     is_verified=True, full_name=f"Donor {i}")
+            for i in range(4)
+        ]
+
+    def give(self, donor, complete=True):
+        blood_request = BloodRequest.objects.create(
+            requester=self.requester, blood_group="O+", quantity=1, location="Dhaka", contact_info="017",
+        )
+        self.client.force_authenticate(donor)
+        self.client.post(reverse("blood-request-accept", args=[blood_request.pk]))
+        if complete:
+            self.client.post(reverse("blood-request-complete", args=[blood_request.pk]))
+
+    def test_counters_follow_donations_and_rebuild_agrees(self):
+        for donor, (completed, accepted_only) in zip(self.donors, [(3, 0), (1, 2), (2, 0), (0, 1)]):
+            for _ in range(completed):
+                self.give(donor)
+            for _ in range(accepted_only):
+                self.give(donor, complete=False)
+
+        counters = lambda: list(
+            User.objects.filter(pk__in=[d.pk for d in self.donors]).order_by("pk")
+            .values_list("accepted_count", "donation_count")
+        )
+        self.assertEqual(counters(), [(3, 3), (3, 1), (2, 2), (1, 0)])
+        User.objects.update(accepted_count=0, donation_count=0)
+        call_command("rebuild_donor_counters", stdout=io.StringIO())
+        self.assertEqual(counters(), [(3, 3), (3, 1), (2, 2), (1, 0)])
+
+        # Ties on accepted requests go to the older account
+        self.client.force_authenticate(self.admin)
+        response = self.client.get("/api/admin/stats/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row["donor"] for row in response.data["most_active_donors"]],
+                         [self.donors[0].pk, self.donors[1].pk, self.donors[2].pk, self.donors[3].pk])
+        # The blood_requests app's own admin stats
+        response = self.client.get("/api/blood-requests/admin/stats/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["active_donors"], 4)
+        self.assertEqual(response.data["most_active_donors"][0],
+                         {"id": self.donors[0].pk, "email": "donor0@example.com", "donation_count": 3})
+
+    def test_leaderboard_pages_by_keyset(self):
+        for donor, count in zip(self.donors, [2, 5, 2, 0]):
+            User.objects.filter(pk=donor.pk).update(donation_count=count)
+        url = reverse("auth:leaderboard")
+
+        response = self.client.get(url, {"page_size": 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row["id"] for row in response.data["results"]], [self.donors[1].pk, self.donors[0].pk])
+        self.assertEqual(response.data["results"][0]["donation_count"], 5)
+
+        # One query per page, whatever its depth
+        with self.assertNumQueries(1):
+            response = self.client.get(response.data["next"])
+        self.assertEqual([row["id"] for row in response.data["results"]], [self.donors[2].pk])
+        self.assertIsNone(response.data["next"])
+
+        self.assertEqual(self.client.get(url, {"cursor": encode_cursor(2, self.donors[2].pk)}).data["results"], [])
+        self.assertEqual(self.client.get(url, {"cursor": "bogus"}).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_leaderboard_rejects_out_of_range_cursor(self):
+        url = reverse("auth:leaderboard")
+        for donation_count, pk in ((10 ** 23, 1), (1, 2 ** 63), (-1, 1), (1, -5)):
+            response = self.client.get(url, {"cursor": encode_cursor(donation_count, pk)})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertEqual(response.data["cursor"], ["Invalid cursor."])
@@ -0,0 +1,155 @@
+import hashlib
+import hmac
+import time
+from functools import lru_cache
+
+import cloudinary
+import cloudinary.utils
+from cloudinary import CloudinaryImage, CloudinaryResource
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.crypto import get_random_string
+from django.utils.module_loading import import_string
+from rest_framework import serializers
+
+from .models import User
+
+PROFILE_PICTURE_FOLDER = 'profile_pictures'
+DEFAULT_THUMBNAIL = {'width': 150, 'height': 150, 'crop': 'fill', 'gravity': 'face'}
+
+
+def profile_picture_prefix(user):
+    """Public IDs a user may claim; keeps one user from recording another's upload."""
+    return f'{PROFILE_PICTURE_FOLDER}/user_{user.pk}_'
+
+
+def new_profile_picture_id(user):
+    return profile_picture_prefix(user) + get_random_string(12).lower()
+
+
+def make_resource(public_id, version=None, format=None):
+    return CloudinaryResource(
+        public_id, version=str(version) if version else None, format=format or None,
+        type='upload', resource_type='image',
+    )
+
+
+# -------------------------
+# Upload backends
+# -------------------------
+class CloudinaryUploadBackend:
+    """Signs direct browser/mobile uploads to Cloudinary and builds delivery URLs."""
+
+    def __init__(self):
+        self.config = cloudinary.config()
+
+    def sign_upload(self, public_id):
+        params = {'public_id': public_id, 'timestamp': int(time.time())}
+        signature = cloudinary.utils.api_sign_request(params, self.config.api_secret)
+        return {
+            'upload_url': f'https://api.cloudinary.com/v1_1/{self.config.cloud_name}/image/upload',
+            'fields': {**params, 'api_key': self.config.api_key, 'signature': signature},
+        }
+
+    def verify_upload(self, public_id, version, signature):
+        return cloudinary.utils.verify_api_response_signature(public_id, version, signature)
+
+    def image_url(self, resource):
+        return resource.url
+
+    def thumbnail_url(self, resource):
+        options = getattr(settings, 'PROFILE_PICTURE_THUMBNAIL', DEFAULT_THUMBNAIL)
+        return CloudinaryImage(
+            resource.public_id, version=resource.version, format=resource.format,
+        ).build_url(secure=True, fetch_format='auto', quality='auto', **options)
+
+
+class LocalStubUploadBackend:
+    """
+    Offline stand-in for Cloudinary (tests and local development). Uploads are
+    "accepted" by signing the response with SECRET_KEY; URLs point at MEDIA_URL.
+    """
+
+    def _sign(self, *parts):
+        message = ':'.join(str(part) for part in parts).encode()
+        return hmac.new(settings.SECRET_KEY.encode(), message, hashlib.sha256).hexdigest()
+
+    def sign_upload(self, public_id):
+        params = {'public_id': public_id, 'timestamp': int(time.time())}
+        return {
+            'upload_url': f"{settings.MEDIA_URL.rstrip('/')}/upload/",
+            'fields': {**params, 'api_key': 'local', 'signature': self._sign(public_id, params['timestamp'])},
+        }
+
+    def upload_response(self, public_id, version=1):
+        """What the storage would return after a successful upload."""
+        return {'public_id': public_id, 'version': version, 'signature': self._sign(public_id, version)}
+
+    def verify_upload(self, public_id, version, signature):
+        return hmac.compare_digest(self._sign(public_id, version), str(signature))
+
+    def image_url(self, resource):
+        suffix = f'.{resource.format}' if resource.format else ''
+        return f'{settings.MEDIA_URL}{resource.public_id}{suffix}'
+
+    def thumbnail_url(self, resource):
+        options = getattr(settings, 'PROFILE_PICTURE_THUMBNAIL', DEFAULT_THUMBNAIL)
+        return f"{self.image_url(resource)}?w={options['width']}&h={options['height']}"
+
+
+@lru_cache(maxsize=None)
+def get_upload_backend():
+    return import_string(settings.PROFILE_PICTURE_UPLOAD_BACKEND)()
+
+
+# -------------------------
+# Cached URLs
+# -------------------------
+# Building a Cloudinary URL is pure string work on (public_id, version, format),
+# so list endpoints memoize it instead of rebuilding it for every row.
+def _resource(prep_value):
+    return User._meta.get_field('profile_picture').parse_cloudinary_resource(prep_value)
+
+
+@lru_cache(maxsize=4096)
+def _image_url(prep_value):
+    return get_upload_backend().image_url(_resource(prep_value))
+
+
+@lru_cache(maxsize=4096)
+def _thumbnail_url(prep_value):
+    return get_upload_backend().thumbnail_url(_resource(prep_value))
+
+
+def image_url(resource):
+    prep_value = resource.get_prep_value()
+    return _image_url(prep_value) if prep_value else None
+
+
+def thumbnail_url(resource):
+    prep_value = resource.get_prep_value() if isinstance(resource, CloudinaryResource) else None
+    return _thumbnail_url(prep_value) if prep_value else None
+
+
+@receiver(setting_changed)
+def clear_url_caches(setting, **kwargs):
+    if setting in ('PROFILE_PICTURE_UPLOAD_BACKEND', 'PROFILE_PICTURE_THUMBNAIL', 'MEDIA_URL'):
+        get_upload_backend.cache_clear()
+        _image_url.cache_clear()
+        _thumbnail_url.cache_clear()
+
+
+class CachedImageField(serializers.ImageField):
+    """ImageField whose Cloudinary URL comes from the memoized upload backend."""
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        if not isinstance(value, CloudinaryResource):
+            return super().to_representation(value)
+        url = image_url(value)
+        request = self.context.get('request', None)
+        if request is not None and url:
+            return request.build_absolute_uri(url)
+        return url
@@ -5,7 +5,10 @@ from .views import (
     RegisterView,
     VerifyEmailView,
     DonorProfileView,
+    ProfilePictureUploadSignatureView,
+    ProfilePictureView,
     PublicDonorListView,
+    DonorLeaderboardView,
     DashboardView,
     ResetPasswordView,
     ChangePasswordView,
@@ -39,7 +42,10 @@ urlpatterns = [
 
     # Donor profile & listing
     path('donor-profile/', DonorProfileView.as_view(), name='donor-profile'),
+    path('donor-profile/picture/signature/', ProfilePictureUploadSignatureView.as_view(), name='profile-picture-signature'),
+    path('donor-profile/picture/', ProfilePictureView.as_view(), name='profile-picture'),
     path('donors/', PublicDonorListView.as_view(), name='donors'),
+    path('leaderboard/', DonorLeaderboardView.as_view(), name='leaderboard'),
 
     # Dashboard
     path('dashboard/', DashboardView.as_view(), name='dashboard'),
@@ -9,6 +9,8 @@ from django.contrib.auth.tokens import default_token_generator
 from django.core.mail import send_mail
 from django.conf import settings
 from django.urls import reverse
+from django.utils import timezone
+from .search import TrigramSearchFilter
 from .serializers import (
     RegisterSerializer,
     DonorProfileSerializer,
@@ -19,11 +21,18 @@ from .serializers import (
     AvailabilitySerializer,
     AdminUserSerializer,
     AdminUserUpdateSerializer,
-    MyTokenObtainPairSerializer
+    MyTokenObtainPairSerializer,
+    ProfilePictureUploadSerializer,
+    LeaderboardSerializer,
 )
+from .leaderboard import LeaderboardPagination
+from .uploads import get_upload_backend, new_profile_picture_id
 from blood_requests.models import BloodRequest, DonationHistory
 from blood_requests.serializers import BloodRequestSerializer, DonationHistorySerializer
 from django_filters.rest_framework import DjangoFilterBackend
+from hemogrid.conditional import ConditionalListMixin, ConditionalRetrieveMixin
+from hemogrid.fieldsets import SparseQuerysetMixin
+from hemogrid.projection import ProjectedListMixin
 from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 
@@ -72,10 +81,17 @@ class IsAdminUser(permissions.BasePermission):
 # -------------------------
 # Admin User Views
 # -------------------------
-class AdminUserListView(generics.ListAPIView):
-    queryset = User.objects.all()
+class AdminUserListView(ConditionalListMixin, SparseQuerysetMixin, generics.ListAPIView):
+    queryset = User.objects.all().order_by('id')
     serializer_class = AdminUserSerializer
     permission_classes = [IsAdminUser]
+    filter_backends = [DjangoFilterBackend, TrigramSearchFilter]
+
+    # Backed by the (role, is_active, is_verified) indexes
+    filterset_fields = ['role', 'is_verified', 'is_active']
+
+    # Fuzzy search by name, email or address
+    search_fields = ['full_name', 'email', 'address']
 
 class AdminUserUpdateView(generics.UpdateAPIView):
     queryset = User.objects.all()
@@ -165,7 +181,7 @@ class ResendVerificationView(generics.GenericAPIView):
 # -------------------------
 # Donor Profile & Listing
 # -------------------------
-class DonorProfileView(generics.RetrieveUpdateAPIView):
+class DonorProfileView(ConditionalRetrieveMixin, generics.RetrieveUpdateAPIView):
     serializer_class = DonorProfileSerializer
     permission_classes = [permissions.IsAuthenticated]
     parser_classes = (MultiPartParser, FormParser, JSONParser)
@@ -173,18 +189,56 @@ class DonorProfileView(generics.RetrieveUpdateAPIView):
     def get_object(self):
         return self.request.user
 
-class PublicDonorListView(generics.ListAPIView):
+class ProfilePictureUploadSignatureView(APIView):
+    """
+    Step 1 of a direct upload: hand the client a signed upload so the image
+    goes straight to storage instead of through the API worker.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        public_id = new_profile_picture_id(request.user)
+        return Response(get_upload_backend().sign_upload(public_id), status=status.HTTP_200_OK)
+
+class ProfilePictureView(generics.GenericAPIView):
+    """Step 2: record the public ID returned by storage after the upload."""
+    serializer_class = ProfilePictureUploadSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user = serializer.save()
+        profile = DonorProfileSerializer(user, context=self.get_serializer_context()).data
+        return Response({
+            "profile_picture": profile['profile_picture'],
+            "profile_picture_thumbnail": profile['profile_picture_thumbnail'],
+        }, status=status.HTTP_200_OK)
+
+class PublicDonorListView(ConditionalListMixin, ProjectedListMixin, SparseQuerysetMixin, generics.ListAPIView):
     queryset = User.objects.filter(role="donor", is_active=True, is_verified=True)
     serializer_class = DonorProfileSerializer
     permission_classes = [AllowAny]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter]
+    filter_backends = [DjangoFilterBackend, TrigramSearchFilter]
 
     # Filters by blood group and availability
     filterset_fields = ['blood_group', 'availability_status']
 
-    # Search by name or address
+    # Fuzzy search by name or address (email stays private)
     search_fields = ['full_name', 'address']
 
+# -------------------------
+# Leaderboard
+# -------------------------
+class DonorLeaderboardView(generics.ListAPIView):
+    """Donors by completed donations; keyset-paginated with ?cursor= (see leaderboard.py)."""
+    queryset = User.objects.filter(is_active=True, is_verified=True, donation_count__gt=0).only(
+        'id', 'full_name', 'blood_group', 'donation_count', 'last_donation_date',
+    )
+    serializer_class = LeaderboardSerializer
+    permission_classes = [AllowAny]
+    pagination_class = LeaderboardPagination
+
 # -------------------------
 # Dashboard
 # -------------------------
@@ -319,7 +373,14 @@ class UpdateAvailabilityView(generics.UpdateAPIView):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
-        self.object.availability_status = serializer.validated_data['availability_status']
+        availability_status = serializer.validated_data['availability_status']
+        available_after = self.object.available_after
+        if availability_status == 'available' and available_after and available_after > timezone.localdate():
+            return Response(
+                {"detail": f"You can be available again from {available_after.isoformat()}."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        self.object.availability_status = availability_status
         self.object.save()
         return Response({"message": f"Availability updated to {self.object.availability_status}"}, status=status.HTTP_200_OK)
 
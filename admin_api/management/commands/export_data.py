@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from admin_api.exports import DATASETS, FORMATS, export, get_chunk_size, parse_since
+
+
+class Command(BaseCommand):
+    help = 'Stream a dataset (users, blood_requests, donations, notifications) as CSV or JSON lines'
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=sorted(DATASETS))
+        parser.add_argument('--format', dest='fmt', choices=sorted(FORMATS), default='csv')
+        parser.add_argument('--since', help='Only rows changed at or after this ISO date/datetime')
+        parser.add_argument('--output', help='File to write (default: stdout)')
+        parser.add_argument('--chunk-size', type=int, default=None, help='Rows per cursor fetch')
+
+    def handle(self, *args, **options):
+        try:
+            since = parse_since(options['since'])
+        except ValueError as exc:
+            raise CommandError(exc)
+
+        chunks = export(
+            options['dataset'], options['fmt'], since=since,
+            chunk_size=options['chunk_size'] or get_chunk_size(),
+        )
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8', newline='') as fh:
+                for chunk in chunks:
+                    fh.write(chunk)
+            self.stderr.write(self.style.SUCCESS(f"Exported {options['dataset']} to {options['output']}"))
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
@@ -0,0 +1,88 @@
+"""
+Set-based user moderation.
+
+Batch actions resolve to a list of user IDs and apply one UPDATE per chunk
+instead of a fetch + save() per user. Suspended users are locked out on their
+next request (JWTAuthentication and the session backend both reject inactive
+users), and their outstanding refresh tokens are blacklisted in the same
+transaction, so they can't mint new access tokens either. Anything else
+caching per-user state should listen to ``users_moderated``.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.dispatch import Signal
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+from accounts.models import User
+
+ACTIONS = {
+    'suspend': {'is_active': False},
+    'verify': {'is_verified': True},
+}
+
+CHANGED = 'changed'
+UNCHANGED = 'unchanged'
+NOT_FOUND = 'not_found'
+SKIPPED = 'skipped'
+
+# Sent once per batch with action=<name> and user_ids=<list of changed IDs>
+users_moderated = Signal()
+
+
+def get_chunk_size():
+    return getattr(settings, 'ADMIN_BATCH_CHUNK_SIZE', 500)
+
+
+def get_max_users():
+    return getattr(settings, 'ADMIN_BATCH_MAX_USERS', 10000)
+
+
+def blacklist_tokens(user_ids):
+    """Blacklist every outstanding refresh token of the given users."""
+    token_ids = list(OutstandingToken.objects.filter(
+        user_id__in=user_ids, blacklistedtoken__isnull=True,
+    ).values_list('pk', flat=True))
+    if not token_ids:
+        return 0
+    created = BlacklistedToken.objects.bulk_create(
+        [BlacklistedToken(token_id=pk) for pk in token_ids], ignore_conflicts=True,
+    )
+    return len(created)
+
+
+def moderate_users(action, user_ids, acting_user=None, chunk_size=None):
+    """
+    Apply ``action`` to ``user_ids``; returns {user_id: status} in input order.
+    The acting admin is never changed by their own batch.
+    """
+    values = ACTIONS[action]
+    field, target = next(iter(values.items()))
+    chunk_size = chunk_size or get_chunk_size()
+    ids = list(dict.fromkeys(user_ids))
+    results = {pk: NOT_FOUND for pk in ids}
+    changed = []
+
+    for start in range(0, len(ids), chunk_size):
+        chunk = ids[start:start + chunk_size]
+        with transaction.atomic():
+            pending = []
+            for pk, current in User.objects.select_for_update().filter(pk__in=chunk).values_list('pk', field):
+                if acting_user is not None and pk == acting_user.pk:
+                    results[pk] = SKIPPED
+                elif current == target:
+                    results[pk] = UNCHANGED
+                else:
+                    pending.append(pk)
+            if pending:
+                User.objects.filter(pk__in=pending).update(**values, updated_at=timezone.now())
+                results.update(dict.fromkeys(pending, CHANGED))
+                changed.extend(pending)
+                if action == 'suspend':
+                    blacklist_tokens(pending)
+
+    if changed:
+        transaction.on_commit(
+            lambda: users_moderated.send(sender=User, action=action, user_ids=changed)
+        )
+    return results
@@ -1,6 +1,7 @@
 from rest_framework import serializers
-from accounts.models import User
-from blood_requests.models import BloodRequest, DonationHistory
+from accounts.models import BLOOD_GROUP_CHOICES, ROLE_CHOICES, User
+from blood_requests.models import BloodRequest, BloodRequestDailyStats, DonationHistory
+from .moderation import get_max_users
 
 
 # -----------------
@@ -21,3 +22,76 @@ class AdminBloodRequestSerializer(serializers.ModelSerializer):
     class Meta:
         model = BloodRequest
         fields = '__all__'
+
+
+# -----------------
+# Request Analytics
+# -----------------
+class RequestAnalyticsQuerySerializer(serializers.Serializer):
+    days = serializers.IntegerField(min_value=1, max_value=366, default=30)
+    blood_group = serializers.ChoiceField(choices=BLOOD_GROUP_CHOICES, required=False)
+
+
+class RequestDailyStatsSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = BloodRequestDailyStats
+        fields = ['day', 'blood_group', 'created', 'accepted', 'completed', 'cancelled', 'expired', 'reopened']
+
+
+# -----------------
+# Batch Moderation
+# -----------------
+class AdminUserBatchFilterSerializer(serializers.Serializer):
+    """Whitelisted filters a batch action may select users by."""
+    role = serializers.ChoiceField(choices=ROLE_CHOICES, required=False)
+    is_active = serializers.BooleanField(required=False)
+    is_verified = serializers.BooleanField(required=False)
+    blood_group = serializers.ChoiceField(choices=BLOOD_GROUP_CHOICES, required=False)
+    email_domain = serializers.CharField(max_length=255, required=False)
+    joined_after = serializers.DateTimeField(required=False)
+    joined_before = serializers.DateTimeField(required=False)
+
+    LOOKUPS = {
+        'email_domain': 'email__iendswith',
+        'joined_after': 'date_joined__gte',
+        'joined_before': 'date_joined__lt',
+    }
+
+    def validate(self, attrs):
+        if not attrs:
+            raise serializers.ValidationError("At least one filter is required.")
+        return attrs
+
+    @classmethod
+    def to_lookups(cls, filters):
+        lookups = {}
+        for key, value in filters.items():
+            if key == 'email_domain':
+                value = '@' + value.lstrip('@').lower()
+            lookups[cls.LOOKUPS.get(key, key)] = value
+        return lookups
+
+
+class AdminUserBatchSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False, allow_empty=False)
+    filter = AdminUserBatchFilterSerializer(required=False)
+
+    def validate(self, attrs):
+        if ('ids' in attrs) == ('filter' in attrs):
+            raise serializers.ValidationError("Provide either 'ids' or 'filter'.")
+        max_users = get_max_users()
+        if 'ids' in attrs:
+            if len(attrs['ids']) > max_users:
+                raise serializers.ValidationError({'ids': f"At most {max_users} users per batch."})
+            attrs['user_ids'] = attrs['ids']
+        else:
+            lookups = AdminUserBatchFilterSerializer.to_lookups(attrs['filter'])
+            user_ids = list(
+                User.objects.filter(**lookups).order_by('pk').values_list('pk', flat=True)[:max_users + 1]
+            )
+            if len(user_ids) > max_users:
+                raise serializers.ValidationError(
+                    {'filter': f"Filter matches more than {max_users} users; narrow it down."}
+                )
+            attrs['user_ids'] = user_ids
+        return attrs
@@ -1,3 +1,187 @@
-from django.test import TestCase
+import csv
+import io
+import json
+from datetime import timedelta
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from accounts.availability import complete_donations
+from blood_requests.models import BloodRequest, DonationHistory
+from .moderation import users_moderated
+
+User = get_user_model()
+
+
+def create_user(email, **extra):
+    return User.objects.create_user(email=email, password="StrongPass!234", is_active=True, **extra)
+
+
+class AdminUserBatchTests(APITestCase):
+    def setUp(self):
+        self.admin = create_user("admin@example.com", role="admin")
+        self.client.force_authenticate(self.admin)
+        self.spammers = [create_user(f"spam{i}@spam.example") for i in range(3)]
+        self.donor = create_user("donor@example.com")
+
+    def statuses(self, response):
+        return {item["id"]: item["status"] for item in response.data["results"]}
+
+    @override_settings(ADMIN_BATCH_CHUNK_SIZE=2)
+    def test_suspend_by_ids_reports_per_id_results(self):
+        self.spammers[0].is_active = False
+        self.spammers[0].save()
+        ids = [s.pk for s in self.spammers] + [999999]
+
+        # Per chunk of two: savepoint, select, update, the users' refresh
+        # tokens, release -- nothing per user
+        with self.assertNumQueries(10):
+            response = self.client.post(reverse("admin-user-batch-suspend"), {"ids": ids}, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["changed"], 2)
+        results = self.statuses(response)
+        self.assertEqual(results[self.spammers[0].pk], "unchanged")
+        self.assertEqual(results[self.spammers[1].pk], "changed")
+        self.assertEqual(results[999999], "not_found")
+        self.assertFalse(User.objects.filter(pk__in=ids, is_active=True).exists())
+        self.assertTrue(User.objects.get(pk=self.donor.pk).is_active)
+
+    def test_suspended_user_refresh_token_is_rejected(self):
+        User.objects.filter(pk=self.donor.pk).update(is_verified=True)
+        self.client.force_authenticate(None)
+        login = self.client.post(
+            reverse("auth:login"), {"email": "donor@example.com", "password": "StrongPass!234"}, format="json",
+        )
+        refresh = login.data["refresh"]
+        self.assertEqual(self.client.post(reverse("auth:token_refresh"), {"refresh": refresh}).status_code, 200)
+
+        self.client.force_authenticate(self.admin)
+        self.client.post(reverse("admin-user-batch-suspend"), {"ids": [self.donor.pk]}, format="json")
+        self.client.force_authenticate(None)
+        response = self.client.post(reverse("auth:token_refresh"), {"refresh": refresh})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_suspend_by_filter_skips_acting_admin(self):
+        received = []
+
+        def handler(sender, action, user_ids, **kwargs):
+            received.append((action, sorted(user_ids)))
+
+        users_moderated.connect(handler)
+        self.addCleanup(users_moderated.disconnect, handler)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse("admin-user-batch-suspend"), {"filter": {"is_active": True}}, format="json"
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.statuses(response)[self.admin.pk], "skipped")
+        self.assertTrue(User.objects.get(pk=self.admin.pk).is_active)
+        self.assertEqual(received, [("suspend", sorted([s.pk for s in self.spammers] + [self.donor.pk]))])
+
+    def test_verify_by_email_domain(self):
+        response = self.client.post(
+            reverse("admin-user-batch-verify"), {"filter": {"email_domain": "spam.example"}}, format="json"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["matched"], 3)
+        self.assertEqual(User.objects.filter(is_verified=True).count(), 3)
+
+    @override_settings(ADMIN_BATCH_MAX_USERS=2)
+    def test_rejects_oversized_or_ambiguous_batches(self):
+        url = reverse("admin-user-batch-verify")
+        self.assertEqual(self.client.post(url, {"filter": {"role": "donor"}}, format="json").status_code, 400)
+        self.assertEqual(self.client.post(url, {"ids": [1, 2, 3]}, format="json").status_code, 400)
+        self.assertEqual(self.client.post(url, {"ids": [1], "filter": {"role": "donor"}}, format="json").status_code, 400)
+        self.assertEqual(self.client.post(url, {"filter": {}}, format="json").status_code, 400)
+
+    def test_requires_admin(self):
+        self.client.force_authenticate(self.donor)
+        response = self.client.post(reverse("admin-user-batch-suspend"), {"ids": [self.donor.pk]}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class AdminExportTests(APITestCase):
+    def setUp(self):
+        self.admin = create_user("admin@example.com", role="admin")
+        self.client.force_authenticate(self.admin)
+        self.donor = create_user("donor@example.com", full_name="Rahim, Uddin")
+        self.old = BloodRequest.objects.create(
+            requester=self.donor, blood_group="O+", quantity=1, location="Dhaka", contact_info="017",
+        )
+        ten_days_ago = timezone.now() - timedelta(days=10)
+        BloodRequest.objects.filter(pk=self.old.pk).update(created_at=ten_days_ago, updated_at=ten_days_ago)
+        self.new = BloodRequest.objects.create(
+            requester=self.donor, blood_group="A-", quantity=2, location="Sylhet", contact_info="018",
+        )
+
+    def content(self, response):
+        return b"".join(response.streaming_content).decode()
+
+    def test_csv_export_streams_all_users(self):
+        response = self.client.get(reverse("admin-export", args=["users"]))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertIn("attachment;", response["Content-Disposition"])
+        rows = list(csv.reader(io.StringIO(self.content(response))))
+        self.assertEqual(rows[0][:3], ["id", "email", "full_name"])
+        self.assertNotIn("password", rows[0])
+        self.assertIn("Rahim, Uddin", [row[2] for row in rows[1:]])
+        self.assertEqual(len(rows), 3)
+
+    def test_jsonl_export_since(self):
+        since = (timezone.now() - timedelta(days=1)).date().isoformat()
+        response = self.client.get(reverse("admin-export", args=["blood_requests"]), {"fmt": "jsonl", "since": since})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        lines = [json.loads(line) for line in self.content(response).splitlines()]
+        self.assertEqual([line["id"] for line in lines], [self.new.pk])
+        self.assertEqual(lines[0]["blood_group"], "A-")
+
+    def test_since_includes_rows_changed_after_creation(self):
+        self.old.status = "completed"
+        self.old.save()
+        since = (timezone.now() - timedelta(days=1)).date().isoformat()
+        response = self.client.get(reverse("admin-export", args=["blood_requests"]), {"fmt": "jsonl", "since": since})
+
+        lines = [json.loads(line) for line in self.content(response).splitlines()]
+        self.assertEqual([line["id"] for line in lines], [self.new.pk, self.old.pk])
+        self.assertEqual(lines[1]["status"], "completed")
+
+    def test_completed_donation_is_exported_again(self):
+        donation = DonationHistory.objects.create(donor=self.donor, blood_request=self.old)
+        ten_days_ago = timezone.now() - timedelta(days=10)
+        DonationHistory.objects.filter(pk=donation.pk).update(accepted_at=ten_days_ago, updated_at=ten_days_ago)
+        since = (timezone.now() - timedelta(days=1)).date().isoformat()
+        url = reverse("admin-export", args=["donations"])
+
+        self.assertEqual(self.content(self.client.get(url, {"fmt": "jsonl", "since": since})), "")
+        complete_donations([self.old.pk])
+        response = self.client.get(url, {"fmt": "jsonl", "since": since})
+        lines = [json.loads(line) for line in self.content(response).splitlines()]
+        self.assertEqual([(line["id"], line["status"]) for line in lines], [(donation.pk, "completed")])
+
+    def test_rejects_bad_parameters(self):
+        url = reverse("admin-export", args=["blood_requests"])
+        self.assertEqual(self.client.get(reverse("admin-export", args=["payments"])).status_code, 404)
+        self.assertEqual(self.client.get(url, {"fmt": "xml"}).status_code, 400)
+        self.assertEqual(self.client.get(url, {"since": "yesterday"}).status_code, 400)
+
+        self.client.force_authenticate(self.donor)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_export_command(self):
+        out = io.StringIO()
+        call_command("export_data", "blood_requests", "--format", "jsonl", "--chunk-size", "1", stdout=out)
+        self.assertEqual(
+            [json.loads(line)["id"] for line in out.getvalue().splitlines()], [self.old.pk, self.new.pk]
+        )
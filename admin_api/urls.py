@@ -3,8 +3,12 @@ from .views import (
     AdminUserListView,
     AdminUserSuspendView,
     AdminUserVerifyView,
+    AdminUserBatchSuspendView,
+    AdminUserBatchVerifyView,
     AdminBloodRequestListView,
     AdminStatsView,
+    AdminExportView,
+    AdminRequestAnalyticsView,
 )
 
 urlpatterns = [
@@ -12,10 +16,16 @@ urlpatterns = [
     path('users/', AdminUserListView.as_view(), name='admin-user-list'),
     path('users/<int:pk>/suspend/', AdminUserSuspendView.as_view(), name='admin-user-suspend'),
     path('users/<int:pk>/verify/', AdminUserVerifyView.as_view(), name='admin-user-verify'),
+    path('users/batch/suspend/', AdminUserBatchSuspendView.as_view(), name='admin-user-batch-suspend'),
+    path('users/batch/verify/', AdminUserBatchVerifyView.as_view(), name='admin-user-batch-verify'),
 
     # Blood Requests
     path('requests/', AdminBloodRequestListView.as_view(), name='admin-blood-request-list'),
 
+    # Exports
+    path('export/<str:dataset>/', AdminExportView.as_view(), name='admin-export'),
+
     # Statistics
     path('stats/', AdminStatsView.as_view(), name='admin-stats'),
+    path('analytics/requests/', AdminRequestAnalyticsView.as_view(), name='admin-request-analytics'),
 ]
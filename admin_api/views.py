@@ -1,20 +1,38 @@
+from datetime import timedelta
+
 from rest_framework import generics
 from accounts.models import User
-from blood_requests.models import BloodRequest, DonationHistory
-from .serializers import AdminUserSerializer, AdminBloodRequestSerializer
+from blood_requests.events import STATS_COLUMNS
+from blood_requests.models import BloodRequest, BloodRequestDailyStats
+from .serializers import (
+    AdminUserSerializer,
+    AdminBloodRequestSerializer,
+    AdminUserBatchSerializer,
+    RequestAnalyticsQuerySerializer,
+    RequestDailyStatsSerializer,
+)
+from .moderation import CHANGED, moderate_users
+from . import exports
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from django.db.models import Count
+from django.db.models import F, Sum
+from django.http import StreamingHttpResponse
+from django.utils import timezone
 from accounts.permissions import IsRole  # import your custom permission
+from accounts.search import TrigramSearchFilter
+from django_filters.rest_framework import DjangoFilterBackend
 
 
 # -----------------
 # User Management
 # -----------------
 class AdminUserListView(generics.ListAPIView):
-    queryset = User.objects.all()
+    queryset = User.objects.all().order_by('id')
     serializer_class = AdminUserSerializer
     permission_classes = [IsRole.with_roles('admin')]
+    filter_backends = [DjangoFilterBackend, TrigramSearchFilter]
+    filterset_fields = ['role', 'is_verified', 'is_active']
+    search_fields = ['full_name', 'email', 'address']
 
 
 class AdminUserSuspendView(APIView):
@@ -43,6 +61,35 @@ class AdminUserVerifyView(APIView):
             return Response({"error": "User not found"}, status=404)
 
 
+class AdminUserBatchView(generics.GenericAPIView):
+    """
+    POST {"ids": [1, 2, ...]} or {"filter": {"email_domain": "spam.example", ...}}.
+    Returns the outcome per user ID: changed, unchanged, not_found or skipped.
+    """
+    permission_classes = [IsRole.with_roles('admin')]
+    serializer_class = AdminUserBatchSerializer
+    action = None
+
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results = moderate_users(self.action, serializer.validated_data['user_ids'], acting_user=request.user)
+        return Response({
+            "action": self.action,
+            "matched": len(results),
+            "changed": sum(1 for status in results.values() if status == CHANGED),
+            "results": [{"id": pk, "status": status} for pk, status in results.items()],
+        })
+
+
+class AdminUserBatchSuspendView(AdminUserBatchView):
+    action = 'suspend'
+
+
+class AdminUserBatchVerifyView(AdminUserBatchView):
+    action = 'verify'
+
+
 # -----------------
 # Blood Requests
 # -----------------
@@ -52,6 +99,36 @@ class AdminBloodRequestListView(generics.ListAPIView):
     permission_classes = [IsRole.with_roles('admin')]
 
 
+# -----------------
+# Exports
+# -----------------
+class AdminExportView(APIView):
+    """
+    GET /api/admin/export/<dataset>/?fmt=csv|jsonl&since=<ISO date/datetime>
+    Streams the whole dataset; ``fmt`` because DRF reserves ``format``.
+    """
+    permission_classes = [IsRole.with_roles('admin')]
+    swagger_schema = None
+
+    def get(self, request, dataset):
+        if dataset not in exports.DATASETS:
+            return Response({"error": f"Unknown dataset. Choose from: {', '.join(exports.DATASETS)}"}, status=404)
+        fmt = request.query_params.get('fmt', 'csv')
+        if fmt not in exports.FORMATS:
+            return Response({"error": f"Unknown format. Choose from: {', '.join(exports.FORMATS)}"}, status=400)
+        try:
+            since = exports.parse_since(request.query_params.get('since'))
+        except ValueError as exc:
+            return Response({"error": str(exc)}, status=400)
+
+        response = StreamingHttpResponse(
+            exports.export(dataset, fmt, since=since), content_type=exports.FORMATS[fmt],
+        )
+        filename = f"{dataset}-{timezone.now():%Y%m%d%H%M%S}.{fmt}"
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+
 # -----------------
 # Statistics
 # -----------------
@@ -67,10 +144,11 @@ class AdminStatsView(APIView):
             (completed_requests / total_requests) * 100 if total_requests > 0 else 0
         )
 
+        # Read off the denormalized counter's index (see accounts.counters)
         active_donors = (
-            DonationHistory.objects.values("donor")
-            .annotate(total=Count("id"))
-            .order_by("-total")[:5]
+            User.objects.filter(accepted_count__gt=0)
+            .order_by("-accepted_count", "id")[:5]
+            .values(donor=F("pk"), total=F("accepted_count"))
         )
 
         return Response({
@@ -81,3 +159,28 @@ class AdminStatsView(APIView):
             "fulfillment_rate": fulfillment_rate,
             "most_active_donors": list(active_donors),
         })
+
+
+class AdminRequestAnalyticsView(APIView):
+    """
+    Daily request transitions over the last ?days= (default 30), optionally
+    for one ?blood_group=, from the table rebuild_request_stats maintains.
+    Today's figures are as fresh as the last rebuild.
+    """
+    permission_classes = [IsRole.with_roles('admin')]
+
+    def get(self, request):
+        params = RequestAnalyticsQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        days = params.validated_data['days']
+        stats = BloodRequestDailyStats.objects.filter(day__gte=timezone.localdate() - timedelta(days=days - 1))
+        if 'blood_group' in params.validated_data:
+            stats = stats.filter(blood_group=params.validated_data['blood_group'])
+
+        columns = sorted(set(STATS_COLUMNS.values()))
+        totals = stats.aggregate(**{column: Sum(column) for column in columns})
+        return Response({
+            "days": days,
+            "totals": {column: totals[column] or 0 for column in columns},
+            "daily": RequestDailyStatsSerializer(stats.order_by('day', 'blood_group'), many=True).data,
+        })
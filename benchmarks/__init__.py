@@ -0,0 +1,18 @@
+"""
+Performance benchmarks.
+
+Run from the project root, e.g.:
+
+    python -m benchmarks api --scale 10k --output bench.json
+    python -m benchmarks api --scale 10k --baseline bench.json --tolerance 0.2
+    python -m benchmarks startup --output startup.json --budget-ms 1500
+    python -m benchmarks server --scale 10k --concurrency 16 --duration 10
+    python -m benchmarks renderers --rows 1000
+    python -m benchmarks projection --rows 1000
+    python -m benchmarks inventory --threads 8 --attempts 50
+
+API, server, renderer and projection benchmarks run against a throwaway test database populated by
+benchmarks.datagen, never against the configured one; the inventory benchmark
+uses a throwaway database too, with a single hot stock row. Startup benchmarks
+only import code in fresh interpreters and don't touch a database.
+"""
@@ -0,0 +1,289 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+
+def setup_django():
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'hemogrid.settings')
+    import django
+
+    django.setup()
+
+
+def test_database(keepdb=False):
+    """Create (and later destroy) an isolated database, like the test runner does."""
+    from django.db import connection
+
+    class TestDatabase:
+        def __enter__(self):
+            self.old_name = connection.settings_dict['NAME']
+            connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=keepdb)
+            return connection
+
+        def __exit__(self, *exc):
+            connection.creation.destroy_test_db(self.old_name, verbosity=0, keepdb=keepdb)
+
+    return TestDatabase()
+
+
+def write_report(report, output):
+    text = json.dumps(report, indent=2)
+    if output:
+        with open(output, 'w') as fh:
+            fh.write(text + '\n')
+    else:
+        print(text)
+
+
+def command_api(args):
+    setup_django()
+    from django.test.utils import setup_test_environment
+
+    from benchmarks import api, datagen
+
+    setup_test_environment()
+    rows = datagen.parse_scale(args.scale)
+    with test_database(keepdb=args.keepdb):
+        start = time.perf_counter()
+        counts = datagen.generate(rows, seed=args.seed, stdout=sys.stderr)
+        sys.stderr.write(f'Dataset ready in {time.perf_counter() - start:.1f}s\n')
+        results, uncovered = api.run(args.iterations, args.warmup, only=args.only, stdout=sys.stderr)
+
+    report = {
+        'scale': args.scale,
+        'rows': counts,
+        'iterations': args.iterations,
+        'environment': api.environment(),
+        'results': results,
+        'uncovered': uncovered,
+    }
+    status = 0
+    if args.baseline:
+        with open(args.baseline) as fh:
+            baseline = json.load(fh)
+        report['regressions'] = api.compare(results, baseline['results'], args.tolerance, args.min_delta_ms)
+        status = 1 if report['regressions'] else 0
+
+    write_report(report, args.output)
+
+    for item in report.get('regressions', []):
+        sys.stderr.write(
+            f"REGRESSION {item['endpoint']} {item['metric']}: {item['baseline']} -> {item['current']}\n"
+        )
+    if uncovered:
+        sys.stderr.write(f"Endpoints without a scenario: {', '.join(uncovered)}\n")
+    return status
+
+
+def command_startup(args):
+    # Only for the report's environment; every target runs in its own interpreter
+    setup_django()
+    from benchmarks import api, startup
+
+    results = startup.run(args.iterations, only=args.only, top=args.top, stdout=sys.stderr)
+    report = {
+        'iterations': args.iterations,
+        'environment': api.environment(),
+        'results': results,
+    }
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as fh:
+            baseline = json.load(fh)['results']
+    report['regressions'] = startup.compare(results, baseline, args.tolerance, args.min_delta_ms, args.budget_ms)
+    write_report(report, args.output)
+
+    for item in report['regressions']:
+        sys.stderr.write(
+            f"REGRESSION {item['target']} {item['metric']}: {item['baseline']} -> {item['current']}\n"
+        )
+    return 1 if report['regressions'] else 0
+
+
+def command_renderers(args):
+    setup_django()
+    from django.test.utils import setup_test_environment
+
+    from benchmarks import api, datagen, renderers
+
+    setup_test_environment()
+    with test_database(keepdb=args.keepdb):
+        counts = datagen.generate(max(args.rows, 1000), seed=args.seed, stdout=sys.stderr)
+        results = renderers.run(args.rows, args.iterations, args.warmup, stdout=sys.stderr)
+        report = {
+            'rows': counts,
+            'items': args.rows,
+            'iterations': args.iterations,
+            'environment': api.environment(),
+            'results': results,
+        }
+    write_report(report, args.output)
+    return 0
+
+
+def command_projection(args):
+    setup_django()
+    from django.test.utils import setup_test_environment
+
+    from benchmarks import api, datagen, projection
+
+    setup_test_environment()
+    with test_database(keepdb=args.keepdb):
+        counts = datagen.generate(max(args.rows, 1000), seed=args.seed, stdout=sys.stderr)
+        results = projection.run(args.rows, args.iterations, args.warmup, stdout=sys.stderr)
+        report = {
+            'rows': counts,
+            'items': args.rows,
+            'iterations': args.iterations,
+            'environment': api.environment(),
+            'results': results,
+        }
+    write_report(report, args.output)
+    return 0
+
+
+def command_inventory(args):
+    # Threads need their own connections to one database; on SQLite that's a file
+    os.environ['DJANGO_SETTINGS_MODULE'] = 'benchmarks.settings'
+    setup_django()
+    from django.test.utils import setup_test_environment
+
+    from benchmarks import api, inventory
+
+    setup_test_environment()
+    with test_database(keepdb=args.keepdb):
+        results = inventory.run(
+            threads=args.threads, attempts=args.attempts, units=args.units,
+            only=args.strategy, stdout=sys.stderr,
+        )
+    report = {
+        'threads': args.threads,
+        'attempts': args.attempts,
+        'environment': api.environment(),
+        'results': results,
+    }
+    write_report(report, args.output)
+    # Overselling under the atomic strategy is a bug, not a slowdown
+    return 1 if results.get('atomic', {}).get('oversold') else 0
+
+
+def command_server(args):
+    import importlib.util
+
+    if importlib.util.find_spec('gunicorn') is None:
+        sys.stderr.write('The server benchmark needs gunicorn installed.\n')
+        return 2
+    # Workers are separate processes; these settings point them at the benchmark database
+    os.environ['DJANGO_SETTINGS_MODULE'] = 'benchmarks.settings'
+    setup_django()
+    from django.test.utils import setup_test_environment
+
+    from benchmarks import api, datagen, server
+
+    setup_test_environment()
+    rows = datagen.parse_scale(args.scale)
+    with test_database(keepdb=args.keepdb) as connection:
+        counts = datagen.generate(rows, seed=args.seed, stdout=sys.stderr)
+        results = server.run(
+            connection.settings_dict['NAME'], args.profile or server.PROFILES,
+            concurrency=args.concurrency, duration=args.duration, warmup=args.warmup, stdout=sys.stderr,
+        )
+        report = {
+            'scale': args.scale,
+            'rows': counts,
+            'concurrency': args.concurrency,
+            'duration_s': args.duration,
+            'environment': api.environment(),
+            'results': results,
+        }
+    write_report(report, args.output)
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    api_parser = subparsers.add_parser('api', help='Drive every API endpoint against a synthetic dataset.')
+    api_parser.add_argument('--scale', default='10k', help='1k, 10k, 100k, 1m or a row count (default: 10k).')
+    api_parser.add_argument('--iterations', type=int, default=50)
+    api_parser.add_argument('--warmup', type=int, default=3)
+    api_parser.add_argument('--seed', type=int, default=42)
+    api_parser.add_argument('--only', help='Only run scenarios whose label contains this string.')
+    api_parser.add_argument('--output', help='Write the JSON report here instead of stdout.')
+    api_parser.add_argument('--baseline', help='Previous report to compare against; exits 1 on regression.')
+    api_parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed p95 growth (default: 0.2 = 20%%).')
+    api_parser.add_argument('--min-delta-ms', type=float, default=1.0, help='Ignore p95 changes below this.')
+    api_parser.add_argument('--keepdb', action='store_true', help='Keep the test database between runs.')
+    api_parser.set_defaults(func=command_api)
+
+    startup_parser = subparsers.add_parser(
+        'startup', help='Import time of a fresh worker and of the periodic management commands.',
+    )
+    startup_parser.add_argument('--iterations', type=int, default=5)
+    startup_parser.add_argument('--only', help='Only run targets whose name contains this string.')
+    startup_parser.add_argument('--top', type=int, default=10, help='Slowest packages to list.')
+    startup_parser.add_argument('--output', help='Write the JSON report here instead of stdout.')
+    startup_parser.add_argument('--baseline', help='Previous report to compare against; exits 1 on regression.')
+    startup_parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed import time growth.')
+    startup_parser.add_argument('--min-delta-ms', type=float, default=10.0, help='Ignore changes below this.')
+    startup_parser.add_argument('--budget-ms', type=float, help='Fail any target whose import time exceeds this.')
+    startup_parser.set_defaults(func=command_startup)
+
+    renderers_parser = subparsers.add_parser(
+        'renderers', help='Encode time and payload size of each available response renderer.',
+    )
+    renderers_parser.add_argument('--rows', type=int, default=1000, help='Items per payload (default: 1000).')
+    renderers_parser.add_argument('--iterations', type=int, default=50)
+    renderers_parser.add_argument('--warmup', type=int, default=5)
+    renderers_parser.add_argument('--seed', type=int, default=42)
+    renderers_parser.add_argument('--output', help='Write the JSON report here instead of stdout.')
+    renderers_parser.add_argument('--keepdb', action='store_true', help='Keep the test database between runs.')
+    renderers_parser.set_defaults(func=command_renderers)
+
+    projection_parser = subparsers.add_parser(
+        'projection', help='Rows per second of projected list endpoints against their serializers.',
+    )
+    projection_parser.add_argument('--rows', type=int, default=1000, help='Rows per render (default: 1000).')
+    projection_parser.add_argument('--iterations', type=int, default=20)
+    projection_parser.add_argument('--warmup', type=int, default=3)
+    projection_parser.add_argument('--seed', type=int, default=42)
+    projection_parser.add_argument('--output', help='Write the JSON report here instead of stdout.')
+    projection_parser.add_argument('--keepdb', action='store_true', help='Keep the test database between runs.')
+    projection_parser.set_defaults(func=command_projection)
+
+    inventory_parser = subparsers.add_parser(
+        'inventory', help='Concurrent reservations against one stock row, atomic vs read-modify-write.',
+    )
+    inventory_parser.add_argument('--threads', type=int, default=8)
+    inventory_parser.add_argument('--attempts', type=int, default=50, help='Reservations tried per thread.')
+    inventory_parser.add_argument('--units', type=int, help='Starting stock (default: half the total demand).')
+    inventory_parser.add_argument('--strategy', action='append', choices=('atomic', 'naive'),
+                                  help='Strategy to run; repeat for several (default: both).')
+    inventory_parser.add_argument('--output', help='Write the JSON report here instead of stdout.')
+    inventory_parser.add_argument('--keepdb', action='store_true', help='Keep the benchmark database between runs.')
+    inventory_parser.set_defaults(func=command_inventory)
+
+    server_parser = subparsers.add_parser(
+        'server', help='Throughput of gunicorn under each worker profile in gunicorn.conf.py.',
+    )
+    server_parser.add_argument('--scale', default='10k', help='1k, 10k, 100k, 1m or a row count (default: 10k).')
+    server_parser.add_argument('--profile', action='append', choices=('sync', 'gthread', 'uvicorn'),
+                               help='Profile to run; repeat for several (default: all).')
+    server_parser.add_argument('--concurrency', type=int, default=16, help='Concurrent clients.')
+    server_parser.add_argument('--duration', type=float, default=10.0, help='Seconds of load per profile.')
+    server_parser.add_argument('--warmup', type=float, default=2.0, help='Seconds of unmeasured load first.')
+    server_parser.add_argument('--seed', type=int, default=42)
+    server_parser.add_argument('--output', help='Write the JSON report here instead of stdout.')
+    server_parser.add_argument('--keepdb', action='store_true', help='Keep the benchmark database between runs.')
+    server_parser.set_defaults(func=command_server)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
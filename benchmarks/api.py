@@ -0,0 +1,367 @@
+"""
+In-process API benchmark.
+
+Every URL in hemogrid/urls.py is driven through the DRF test client against
+a synthetic dataset, recording latency percentiles, throughput and query
+counts per endpoint. Read-only scenarios run first so the mutating ones
+(accept, cancel, ...) don't change what the reads see.
+"""
+import itertools
+import logging
+import platform
+import time
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.tokens import default_token_generator
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import URLPattern, URLResolver, get_resolver
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from blood_requests.models import BloodRequest, DonationHistory
+from notifications.models import Notification
+from sync.feed import encode_cursor
+
+from .datagen import PASSWORD
+
+
+# Endpoints that are deliberately not driven
+SKIPPED = {
+    'admin': 'Django admin site',
+    'api-auth': 'browsable API login',
+    '': 'redirect to /api/',
+}
+
+
+def percentile(values, pct):
+    """Linear-interpolated percentile of ``values`` (0-100)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100.0
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def url_names(patterns=None, prefix='', namespace=None):
+    """Yield (view name, route) for every URL pattern in the project."""
+    if patterns is None:
+        patterns = get_resolver().url_patterns
+    for item in patterns:
+        if isinstance(item, URLResolver):
+            ns = item.namespace or namespace
+            if item.namespace and namespace:
+                ns = f'{namespace}:{item.namespace}'
+            yield from url_names(item.url_patterns, prefix + str(item.pattern), ns)
+        elif isinstance(item, URLPattern):
+            name = item.name or str(item.pattern)
+            yield (f'{namespace}:{name}' if namespace else name), prefix + str(item.pattern)
+
+
+class Context:
+    """Sample objects the scenarios draw on."""
+
+    def __init__(self):
+        self.admin = User.objects.create_superuser(email='bench-admin@example.com', password=PASSWORD, role='admin')
+        self.donor = (
+            User.objects.filter(role='donor', is_verified=True, notifications__isnull=False).order_by('pk').first()
+        )
+        self.requester = (
+            BloodRequest.objects.filter(is_active=True).order_by('pk').values_list('requester', flat=True).first()
+        )
+        self.requester = User.objects.get(pk=self.requester)
+        self.hospital = User.objects.filter(role='hospital').order_by('pk').first()
+        self.own_request = BloodRequest.objects.filter(requester=self.requester).order_by('pk').first()
+        self.notification = Notification.objects.filter(recipient=self.donor).order_by('pk').first()
+        self.counter = itertools.count()
+        # Active requests the donor can accept, one per iteration
+        self.acceptable = iter(
+            BloodRequest.objects.filter(is_active=True)
+            .exclude(requester=self.donor)
+            .exclude(donations__donor=self.donor)
+            .order_by('pk')
+            .values_list('pk', flat=True)
+        )
+        self.cancellable = iter(
+            BloodRequest.objects.filter(status='pending').order_by('-pk').values_list('pk', flat=True)
+        )
+        self.users = iter(User.objects.filter(role='donor').order_by('-pk').values_list('pk', flat=True))
+
+    def accepted_request_for_donor(self):
+        """Accept a fresh request as the donor so it can be completed."""
+        pk = next(self.acceptable)
+        DonationHistory.objects.create(donor=self.donor, blood_request_id=pk)
+        BloodRequest.objects.filter(pk=pk).update(status='accepted', is_active=False)
+        return pk
+
+    def reset_password(self, user):
+        User.objects.filter(pk=user.pk).update(password=make_password(PASSWORD))
+        user.refresh_from_db(fields=['password'])
+
+    def uid_token(self, user):
+        return urlsafe_base64_encode(force_bytes(user.pk)), default_token_generator.make_token(user)
+
+
+class Scenario:
+    def __init__(self, name, method, path, user=None, data=None, setup=None, label=None):
+        self.name = name
+        self.label = label or name
+        self.method = method
+        self.path = path
+        self.user = user
+        self.data = data
+        self.setup = setup
+
+
+def scenarios():
+    """Scenario list; ``path``/``data``/``user`` are callables on (ctx, state)."""
+    def fixed(value):
+        return lambda ctx, state: value
+
+    reads = [
+        Scenario('api-home', 'get', fixed('/api/')),
+        Scenario('schema-swagger-ui', 'get', fixed('/swagger/')),
+        Scenario('schema-swagger-ui', 'get', fixed('/swagger/?format=openapi'), label='schema-swagger-ui:openapi'),
+        Scenario('schema-redoc', 'get', fixed('/redoc/')),
+        Scenario('auth:donors', 'get', fixed('/api/auth/donors/')),
+        Scenario('auth:donors', 'get', fixed('/api/auth/donors/?search=rahman&blood_group=O%2B'), label='auth:donors:search'),
+        Scenario('auth:leaderboard', 'get', fixed('/api/auth/leaderboard/')),
+        Scenario('auth:donor-profile', 'get', fixed('/api/auth/donor-profile/'), user=lambda ctx, s: ctx.donor),
+        Scenario('auth:dashboard', 'get', fixed('/api/auth/dashboard/'), user=lambda ctx, s: ctx.donor),
+        Scenario('auth:admin-users-list', 'get', fixed('/api/auth/admin/users/'), user=lambda ctx, s: ctx.admin),
+        Scenario('auth:admin-users-list', 'get', fixed('/api/auth/admin/users/?search=karim&is_verified=true'),
+                 user=lambda ctx, s: ctx.admin, label='auth:admin-users-list:search'),
+        Scenario('admin-user-list', 'get', fixed('/api/admin/users/'), user=lambda ctx, s: ctx.admin),
+        Scenario('admin-blood-request-list', 'get', fixed('/api/admin/requests/'), user=lambda ctx, s: ctx.admin),
+        Scenario('admin-stats', 'get', fixed('/api/admin/stats/'), user=lambda ctx, s: ctx.admin),
+        Scenario('admin-request-analytics', 'get', fixed('/api/admin/analytics/requests/?days=90'),
+                 user=lambda ctx, s: ctx.admin),
+        Scenario('blood-request-list', 'get', fixed('/api/blood-requests/'), user=lambda ctx, s: ctx.donor),
+        Scenario('blood-request-list', 'get', fixed('/api/blood-requests/?search=hospital%20dhaka'),
+                 user=lambda ctx, s: ctx.donor, label='blood-request-list:search'),
+        Scenario('blood-request-compatible', 'get', fixed('/api/blood-requests/compatible/'),
+                 user=lambda ctx, s: ctx.donor),
+        Scenario('my-requests', 'get', fixed('/api/blood-requests/my-requests/'), user=lambda ctx, s: ctx.requester),
+        Scenario('user-donation-history', 'get', fixed('/api/blood-requests/donation-history/'),
+                 user=lambda ctx, s: ctx.donor),
+        Scenario('donation-history-all', 'get', fixed('/api/blood-requests/donation-history/all/'),
+                 user=lambda ctx, s: ctx.donor),
+        Scenario('admin-requests-list', 'get', fixed('/api/blood-requests/admin/requests/'),
+                 user=lambda ctx, s: ctx.admin),
+        Scenario('admin-stats', 'get', fixed('/api/blood-requests/admin/stats/'), user=lambda ctx, s: ctx.admin,
+                 label='blood-requests:admin-stats'),
+        Scenario('blood-request-contact', 'get', lambda ctx, s: f'/api/blood-requests/{ctx.own_request.pk}/contact/',
+                 user=lambda ctx, s: ctx.requester),
+        Scenario('notification-list', 'get', fixed('/api/notifications/'), user=lambda ctx, s: ctx.donor),
+        Scenario('notification-digest', 'get', fixed('/api/notifications/digest/'), user=lambda ctx, s: ctx.donor),
+        Scenario('sync-changes', 'get', lambda ctx, s: f'/api/sync/changes/?since={encode_cursor(0)}',
+                 user=lambda ctx, s: ctx.donor),
+        Scenario('inventory-stock', 'get', fixed('/api/inventory/stock/'), user=lambda ctx, s: ctx.hospital),
+        Scenario('inventory-reservations', 'get', fixed('/api/inventory/reservations/'),
+                 user=lambda ctx, s: ctx.hospital),
+        Scenario('inventory-availability', 'get', fixed('/api/inventory/availability/?blood_group=O%2B&location=Dhaka'),
+                 user=lambda ctx, s: ctx.donor),
+        Scenario('admin-export', 'get', fixed('/api/admin/export/users/'), user=lambda ctx, s: ctx.admin),
+        Scenario('admin-export', 'get', fixed('/api/admin/export/blood_requests/?fmt=jsonl'),
+                 user=lambda ctx, s: ctx.admin, label='admin-export:jsonl'),
+        Scenario('metrics', 'get', fixed('/metrics/'), user=lambda ctx, s: ctx.admin),
+    ]
+
+    def new_email(ctx, state):
+        return f'bench-{next(ctx.counter)}@example.com'
+
+    writes = [
+        Scenario('token_obtain_pair', 'post', fixed('/api/auth/jwt/create/'),
+                 data=lambda ctx, s: {'email': ctx.donor.email, 'password': PASSWORD}),
+        Scenario('auth:login', 'post', fixed('/api/auth/login/'),
+                 data=lambda ctx, s: {'email': ctx.donor.email, 'password': PASSWORD}),
+        Scenario('token_refresh', 'post', fixed('/api/auth/jwt/refresh/'), data=lambda ctx, s: {'refresh': s['refresh']},
+                 setup=lambda ctx, client: {'refresh': client.post(
+                     '/api/auth/jwt/create/', {'email': ctx.donor.email, 'password': PASSWORD}, format='json'
+                 ).data['refresh']}),
+        Scenario('auth:token_refresh', 'post', fixed('/api/auth/token/refresh/'),
+                 data=lambda ctx, s: {'refresh': s['refresh']},
+                 setup=lambda ctx, client: {'refresh': client.post(
+                     '/api/auth/jwt/create/', {'email': ctx.donor.email, 'password': PASSWORD}, format='json'
+                 ).data['refresh']}),
+        Scenario('auth:register', 'post', fixed('/api/auth/register/'),
+                 data=lambda ctx, s: {'email': new_email(ctx, s), 'password': PASSWORD, 'full_name': 'Bench User', 'age': 30}),
+        Scenario('auth:resend-verification', 'post', fixed('/api/auth/resend-verification/'),
+                 data=lambda ctx, s: {'email': ctx.donor.email}),
+        Scenario('auth:verify-email', 'get',
+                 lambda ctx, s: '/api/auth/verify-email/%s/%s/' % ctx.uid_token(User.objects.get(pk=next(ctx.users)))),
+        Scenario('auth:forgot-password', 'post', fixed('/api/auth/forgot-password/'),
+                 data=lambda ctx, s: {'email': ctx.donor.email}),
+        Scenario('auth:reset-password', 'post',
+                 lambda ctx, s: '/api/auth/reset-password/%s/%s/' % ctx.uid_token(User.objects.get(pk=next(ctx.users))),
+                 data=fixed({'new_password': PASSWORD, 'confirm_password': PASSWORD})),
+        Scenario('auth:change-password', 'put', fixed('/api/auth/change-password/'), user=lambda ctx, s: ctx.donor,
+                 data=lambda ctx, s: ctx.reset_password(ctx.donor) or {
+                     'old_password': PASSWORD, 'new_password': PASSWORD + 'x', 'confirm_password': PASSWORD + 'x',
+                 }),
+        Scenario('auth:update-availability', 'put', fixed('/api/auth/update-availability/'),
+                 user=lambda ctx, s: ctx.donor, data=fixed({'availability_status': 'available'})),
+        Scenario('auth:donor-profile', 'patch', fixed('/api/auth/donor-profile/'), user=lambda ctx, s: ctx.donor,
+                 data=fixed({'address': 'House 1, Dhanmondi, Dhaka'}), label='auth:donor-profile:update'),
+        Scenario('auth:profile-picture-signature', 'post', fixed('/api/auth/donor-profile/picture/signature/'),
+                 user=lambda ctx, s: ctx.donor),
+        Scenario('auth:profile-picture', 'post', fixed('/api/auth/donor-profile/picture/'),
+                 user=lambda ctx, s: ctx.donor,
+                 data=lambda ctx, s: _signed_upload(ctx)),
+        Scenario('auth:admin-user-update', 'patch', lambda ctx, s: f'/api/auth/admin/users/{next(ctx.users)}/update/',
+                 user=lambda ctx, s: ctx.admin, data=fixed({'is_verified': True})),
+        Scenario('admin-user-verify', 'post', lambda ctx, s: f'/api/admin/users/{next(ctx.users)}/verify/',
+                 user=lambda ctx, s: ctx.admin),
+        Scenario('admin-user-suspend', 'post', lambda ctx, s: f'/api/admin/users/{next(ctx.users)}/suspend/',
+                 user=lambda ctx, s: ctx.admin),
+        Scenario('admin-user-batch-verify', 'post', fixed('/api/admin/users/batch/verify/'),
+                 user=lambda ctx, s: ctx.admin, data=lambda ctx, s: {'ids': [next(ctx.users) for _ in range(50)]}),
+        Scenario('admin-user-batch-suspend', 'post', fixed('/api/admin/users/batch/suspend/'),
+                 user=lambda ctx, s: ctx.admin, data=lambda ctx, s: {'ids': [next(ctx.users) for _ in range(50)]}),
+        Scenario('blood-request-create', 'post', fixed('/api/blood-requests/create/'), user=lambda ctx, s: ctx.requester,
+                 data=fixed({'blood_group': 'O+', 'quantity': 1, 'location': 'Square Hospital, Dhaka',
+                             'contact_info': '01700000000', 'details': 'Benchmark', 'urgency': 'high'})),
+        Scenario('blood-request-bulk-create', 'post', fixed('/api/blood-requests/bulk-create/'),
+                 user=lambda ctx, s: ctx.hospital,
+                 data=fixed({'requests': [
+                     {'blood_group': group, 'quantity': 1, 'location': 'Dhaka Medical College, Dhaka',
+                      'contact_info': '01700000000', 'urgency': 'medium'}
+                     for group in ('O+', 'A+', 'B+', 'AB+', 'O-') * 4
+                 ]})),
+        Scenario('inventory-stock-adjust', 'post', fixed('/api/inventory/stock/adjust/'),
+                 user=lambda ctx, s: ctx.hospital, data=fixed({'blood_group': 'O+', 'delta': 1})),
+        Scenario('blood-request-accept', 'post', lambda ctx, s: f'/api/blood-requests/{next(ctx.acceptable)}/accept/',
+                 user=lambda ctx, s: ctx.donor),
+        Scenario('blood-request-complete', 'post',
+                 lambda ctx, s: f'/api/blood-requests/{ctx.accepted_request_for_donor()}/complete/',
+                 user=lambda ctx, s: ctx.donor),
+        Scenario('blood-request-update-status', 'patch',
+                 lambda ctx, s: f'/api/blood-requests/{ctx.own_request.pk}/update-status/',
+                 user=lambda ctx, s: ctx.requester, data=fixed({'status': 'pending'})),
+        Scenario('blood-request-cancel', 'post', lambda ctx, s: f'/api/blood-requests/{next(ctx.cancellable)}/cancel/',
+                 user=lambda ctx, s: ctx.admin),
+        Scenario('notification-mark-read', 'patch',
+                 lambda ctx, s: f'/api/notifications/mark-read/{ctx.notification.pk}/', user=lambda ctx, s: ctx.donor),
+        Scenario('initiate-payment', 'post', fixed('/api/donation/initiate-payment/'),
+                 data=lambda ctx, s: {'amount': '500', 'name': 'Bench Donor', 'email': new_email(ctx, s)}),
+        Scenario('initiate-payment', 'post', fixed('/api/donation/initiate-payment/'),
+                 data=fixed({'amount': '500', 'name': 'Bench Donor', 'email': 'repeat@example.com'}),
+                 label='initiate-payment:retry'),
+        Scenario('payment-ipn', 'post', fixed('/api/donation/ipn/'),
+                 data=fixed({'tran_id': 'DONUNKNOWN', 'val_id': 'bench', 'status': 'VALID'})),
+        Scenario('auth:update-email', 'put', fixed('/api/auth/update-email/'), user=lambda ctx, s: ctx.requester,
+                 data=lambda ctx, s: {'new_email': new_email(ctx, s)}),
+    ]
+    return reads + writes
+
+
+def _signed_upload(ctx):
+    from accounts.uploads import get_upload_backend, new_profile_picture_id
+
+    backend = get_upload_backend()
+    return backend.upload_response(new_profile_picture_id(ctx.donor))
+
+
+def run_scenario(scenario, ctx, iterations, warmup):
+    # Server errors are reported in status_codes rather than aborting the run
+    client = APIClient(raise_request_exception=False)
+    state = scenario.setup(ctx, client) if scenario.setup else {}
+    latencies, queries, statuses = [], [], {}
+    for i in range(warmup + iterations):
+        user = scenario.user(ctx, state) if scenario.user else None
+        client.force_authenticate(user)
+        path = scenario.path(ctx, state)
+        data = scenario.data(ctx, state) if scenario.data else None
+        request = getattr(client, scenario.method)
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            if scenario.method == 'get':
+                response = request(path)
+            else:
+                response = request(path, data, format='json')
+            if response.streaming:
+                b''.join(response.streaming_content)
+            elapsed = time.perf_counter() - start
+        if i < warmup:
+            continue
+        latencies.append(elapsed * 1000)
+        queries.append(len(captured.captured_queries))
+        statuses[str(response.status_code)] = statuses.get(str(response.status_code), 0) + 1
+    total = sum(latencies) / 1000
+    return {
+        'endpoint': scenario.name,
+        'method': scenario.method.upper(),
+        'iterations': iterations,
+        'p50_ms': round(percentile(latencies, 50), 3),
+        'p95_ms': round(percentile(latencies, 95), 3),
+        'p99_ms': round(percentile(latencies, 99), 3),
+        'mean_ms': round(sum(latencies) / len(latencies), 3),
+        'throughput_rps': round(iterations / total, 2) if total else None,
+        'queries_avg': round(sum(queries) / len(queries), 2),
+        'queries_max': max(queries),
+        'status_codes': statuses,
+    }
+
+
+def run(iterations=50, warmup=3, only=None, stdout=None):
+    """Run every scenario (or those whose label contains ``only``)."""
+    ctx = Context()
+    results = {}
+    selected = [s for s in scenarios() if not only or only in s.label]
+    logging.disable(logging.CRITICAL)
+    with override_settings(
+        EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+        PROFILE_PICTURE_UPLOAD_BACKEND='accounts.uploads.LocalStubUploadBackend',
+        PAYMENT_GATEWAY_BACKEND='donation.gateway.StubGateway',
+    ):
+        for scenario in selected:
+            if stdout:
+                stdout.write(f'  {scenario.label}...\n')
+            results[scenario.label] = run_scenario(scenario, ctx, iterations, warmup)
+    logging.disable(logging.NOTSET)
+
+    covered = {s.name for s in scenarios()}
+    uncovered = sorted(
+        name for name, route in url_names()
+        if name not in covered and name.split(':')[0] not in SKIPPED and route.split('/')[0] not in SKIPPED
+        and name not in SKIPPED
+    )
+    return results, uncovered
+
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': connection.vendor,
+    }
+
+
+def compare(results, baseline, tolerance=0.2, min_delta_ms=1.0):
+    """
+    Compare a run against a saved baseline. An endpoint regresses when its
+    p95 grows by more than ``tolerance`` (and at least ``min_delta_ms``), or
+    when it issues more queries on average.
+    """
+    regressions = []
+    for label, current in results.items():
+        previous = baseline.get(label)
+        if not previous:
+            continue
+        delta = current['p95_ms'] - previous['p95_ms']
+        if delta > previous['p95_ms'] * tolerance and delta >= min_delta_ms:
+            regressions.append({
+                'endpoint': label, 'metric': 'p95_ms',
+                'baseline': previous['p95_ms'], 'current': current['p95_ms'],
+            })
+        if current['queries_avg'] > previous['queries_avg']:
+            regressions.append({
+                'endpoint': label, 'metric': 'queries_avg',
+                'baseline': previous['queries_avg'], 'current': current['queries_avg'],
+            })
+    return regressions
@@ -0,0 +1,180 @@
+"""
+Synthetic dataset generator.
+
+Donors are built from the names and addresses in data/donor.json, so the
+scaled data looks like the seed file. Every table gets roughly ``rows``
+rows (donation histories get half), inserted with bulk_create in batches.
+bulk_create skips the signals and F() updates that keep the derived data in
+step, so generate() rebuilds it afterwards: the fallback user search index,
+the donor counters and the sync change log (one change per blood request and
+notification).
+"""
+import json
+import random
+from datetime import date, timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.utils import timezone
+
+from accounts.models import BLOOD_GROUP_CHOICES, User
+from blood_requests.models import BloodRequest, DonationHistory
+from notifications.models import Notification
+from sync.models import Change
+
+SCALES = {
+    '1k': 1_000,
+    '10k': 10_000,
+    '100k': 100_000,
+    '1m': 1_000_000,
+}
+
+PASSWORD = 'BenchPass!234'
+SEED_FILE = Path(settings.BASE_DIR) / 'data' / 'donor.json'
+
+CITIES = ['Dhaka', 'Chittagong', 'Sylhet', 'Khulna', 'Rajshahi', 'Barisal', 'Rangpur', 'Comilla']
+HOSPITALS = ['Medical College Hospital', 'General Hospital', 'Square Hospital', 'Popular Diagnostic', 'CMH']
+DETAILS = [
+    'Needed for surgery', 'Thalassemia patient', 'Accident victim', 'Dengue patient, platelets low',
+    'C-section scheduled', 'Cancer treatment', '',
+]
+
+
+def parse_scale(value):
+    value = str(value).lower()
+    if value in SCALES:
+        return SCALES[value]
+    return int(value)
+
+
+def load_seed():
+    with open(SEED_FILE, encoding='utf-8') as fh:
+        donors = json.load(fh)
+    first_names = sorted({d['full_name'].split()[0] for d in donors if d.get('full_name')})
+    last_names = sorted({d['full_name'].split()[-1] for d in donors if d.get('full_name')})
+    areas = sorted({d['address'].split(',')[-2].strip() for d in donors if d.get('address', '').count(',') >= 1})
+    return first_names, last_names, areas
+
+
+def _batched(objects, model, batch_size):
+    batch = []
+    for obj in objects:
+        batch.append(obj)
+        if len(batch) >= batch_size:
+            model.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        model.objects.bulk_create(batch)
+
+
+def generate(rows, seed=42, batch_size=5000, stdout=None):
+    """Populate the current database; returns a summary of row counts."""
+    rnd = random.Random(seed)
+    first_names, last_names, areas = load_seed()
+    groups = [value for value, _ in BLOOD_GROUP_CHOICES]
+    password = make_password(PASSWORD)
+    today = date.today()
+    now = timezone.now()
+
+    def log(message):
+        if stdout:
+            stdout.write(message + '\n')
+
+    def users():
+        for i in range(rows):
+            first, last = rnd.choice(first_names), rnd.choice(last_names)
+            last_donation = today - timedelta(days=rnd.randint(20, 720)) if rnd.random() < 0.7 else None
+            yield User(
+                email=f'{first}.{last}.{i}@bench.example.com'.lower(),
+                password=password,
+                full_name=f'{first} {last}',
+                age=rnd.randint(18, 60),
+                address=f'House {rnd.randint(1, 300)}, {rnd.choice(areas)}, {rnd.choice(CITIES)}',
+                last_donation_date=last_donation,
+                availability_status=rnd.choices(['available', 'not_available', 'busy'], [7, 2, 1])[0],
+                blood_group=rnd.choice(groups),
+                role=rnd.choices(['donor', 'requester', 'hospital'], [85, 12, 3])[0],
+                is_active=True,
+                is_verified=rnd.random() < 0.95,
+            )
+
+    log(f'Creating {rows} users...')
+    _batched(users(), User, batch_size)
+    user_ids = list(User.objects.order_by('pk').values_list('pk', flat=True))
+
+    def requests():
+        for _ in range(rows):
+            status = rnd.choices(['pending', 'accepted', 'completed', 'cancelled'], [5, 2, 2, 1])[0]
+            yield BloodRequest(
+                requester_id=rnd.choice(user_ids),
+                blood_group=rnd.choice(groups),
+                quantity=rnd.randint(1, 4),
+                location=f'{rnd.choice(HOSPITALS)}, {rnd.choice(CITIES)}',
+                contact_info=f'+88017{rnd.randint(10000000, 99999999)}',
+                details=rnd.choice(DETAILS),
+                status=status,
+                urgency=rnd.choice(['low', 'medium', 'high']),
+                is_active=status == 'pending',
+                expires_at=now + timedelta(days=rnd.randint(-5, 30)) if rnd.random() < 0.5 else None,
+            )
+
+    log(f'Creating {rows} blood requests...')
+    _batched(requests(), BloodRequest, batch_size)
+    request_ids = list(BloodRequest.objects.order_by('pk').values_list('pk', flat=True))
+
+    def histories():
+        for request_id in rnd.sample(request_ids, min(len(request_ids), rows // 2)):
+            yield DonationHistory(
+                donor_id=rnd.choice(user_ids),
+                blood_request_id=request_id,
+                status=rnd.choice(['accepted', 'completed']),
+            )
+
+    log(f'Creating {rows // 2} donation histories...')
+    _batched(histories(), DonationHistory, batch_size)
+
+    def notifications():
+        for _ in range(rows):
+            yield Notification(
+                recipient_id=rnd.choice(user_ids),
+                blood_request_id=rnd.choice(request_ids),
+                message='New blood request near you!',
+                is_read=rnd.random() < 0.6,
+            )
+
+    log(f'Creating {rows} notifications...')
+    _batched(notifications(), Notification, batch_size)
+
+    # bulk_create skips the signal that maintains the fallback user search index
+    from accounts.search import rebuild_gram_index, uses_gram_index
+
+    if uses_gram_index(connection):
+        log('Rebuilding user search index...')
+        rebuild_gram_index(batch_size=batch_size)
+
+    # ... and the per-donor counters bumped when donations are accepted
+    from accounts.counters import rebuild
+
+    log('Rebuilding donor counters...')
+    rebuild()
+
+    # ... and the sync change log written by the save signals
+    def changes():
+        for pk in BloodRequest.objects.order_by('pk').values_list('pk', flat=True).iterator(chunk_size=batch_size):
+            yield Change(kind=Change.BLOOD_REQUEST, object_id=pk)
+        notifications = Notification.objects.order_by('pk').values_list('pk', 'recipient_id')
+        for pk, recipient_id in notifications.iterator(chunk_size=batch_size):
+            yield Change(kind=Change.NOTIFICATION, object_id=pk, owner_id=recipient_id)
+
+    log('Backfilling sync change log...')
+    _batched(changes(), Change, batch_size)
+
+    return {
+        'users': User.objects.count(),
+        'blood_requests': BloodRequest.objects.count(),
+        'donation_histories': DonationHistory.objects.count(),
+        'notifications': Notification.objects.count(),
+        'changes': Change.objects.count(),
+    }
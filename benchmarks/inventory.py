@@ -0,0 +1,127 @@
+"""
+Stock contention benchmark.
+
+Threads, each on its own database connection, take one unit at a time from
+the same hot BloodStock row until every thread has made its attempts. Total
+demand exceeds the stock, so the row runs dry mid-run. Two strategies are
+compared:
+
+- atomic: inventory.stock.reserve, one guarded F() UPDATE per unit;
+- naive: read the row, check it, write the new counts back.
+
+Reported per strategy: reservations per second, successful and failed
+attempts, errors (e.g. SQLite "database is locked"), latency percentiles,
+and how far the row ended up from the truth: units handed out beyond the
+stock (oversold) and reservations the row's counters don't account for
+(lost updates).
+"""
+import threading
+import time
+
+from django.db import connection, transaction
+from django.db.models import Sum
+
+from accounts.models import User
+from blood_requests.models import BloodRequest
+from inventory.models import BloodStock, StockReservation
+from inventory.stock import reserve
+
+from .api import percentile
+
+STRATEGIES = ('atomic', 'naive')
+
+
+def naive_reserve(stock_id, blood_request, quantity):
+    """What reserve() replaces: read-check-write, racing with every other thread."""
+    with transaction.atomic():
+        stock = BloodStock.objects.get(pk=stock_id)
+        if stock.available < quantity:
+            return None
+        stock.available -= quantity
+        stock.reserved += quantity
+        stock.save(update_fields=['available', 'reserved', 'updated_at'])
+        return StockReservation.objects.create(stock_id=stock_id, blood_request=blood_request, quantity=quantity)
+
+
+RESERVE = {'atomic': reserve, 'naive': naive_reserve}
+
+
+def setup_stock(units):
+    hospital, _ = User.objects.get_or_create(
+        email='inventory-bench@example.com',
+        defaults={'role': 'hospital', 'is_active': True, 'address': 'Benchmark'},
+    )
+    blood_request = BloodRequest.objects.create(
+        requester=hospital, blood_group='O+', quantity=1, location='Benchmark', contact_info='0',
+    )
+    StockReservation.objects.filter(stock__hospital=hospital).delete()
+    stock, _ = BloodStock.objects.update_or_create(
+        hospital=hospital, blood_group='O+', defaults={'available': units, 'reserved': 0},
+    )
+    return stock, blood_request
+
+
+def run_strategy(name, threads, attempts, units):
+    stock, blood_request = setup_stock(units)
+    take = RESERVE[name]
+    start_barrier = threading.Barrier(threads + 1)
+    lock = threading.Lock()
+    totals = {'reserved': 0, 'refused': 0, 'errors': 0}
+    timings = []
+
+    def worker():
+        local = {'reserved': 0, 'refused': 0, 'errors': 0}
+        local_timings = []
+        start_barrier.wait()
+        try:
+            for _ in range(attempts):
+                began = time.perf_counter()
+                try:
+                    local['reserved' if take(stock.pk, blood_request, 1) else 'refused'] += 1
+                except Exception:
+                    local['errors'] += 1
+                local_timings.append(time.perf_counter() - began)
+        finally:
+            connection.close()
+        with lock:
+            for key, value in local.items():
+                totals[key] += value
+            timings.extend(local_timings)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    start_barrier.wait()
+    began = time.perf_counter()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - began
+
+    stock.refresh_from_db()
+    held = StockReservation.objects.filter(stock=stock).aggregate(units=Sum('quantity'))['units'] or 0
+    return {
+        **totals,
+        'ops_per_s': round((threads * attempts) / elapsed) if elapsed else None,
+        'p50_ms': round(percentile(timings, 50) * 1000, 3),
+        'p95_ms': round(percentile(timings, 95) * 1000, 3),
+        'p99_ms': round(percentile(timings, 99) * 1000, 3),
+        'oversold': max(held - units, 0),
+        'lost_updates': held - stock.reserved,
+        'final': {'available': stock.available, 'reserved': stock.reserved},
+    }
+
+
+def run(threads=8, attempts=50, units=None, only=None, stdout=None):
+    # Demand is twice the stock unless told otherwise, so refusals are exercised too
+    units = units if units is not None else threads * attempts // 2
+    results = {}
+    for name in only or STRATEGIES:
+        results[name] = run_strategy(name, threads, attempts, units)
+        if stdout:
+            item = results[name]
+            stdout.write(
+                f"{name:<7} {item['ops_per_s']:>7} ops/s  reserved {item['reserved']:>5}  "
+                f"refused {item['refused']:>5}  errors {item['errors']:>4}  oversold {item['oversold']:>4}  "
+                f"lost {item['lost_updates']:>4}  p95 {item['p95_ms']} ms\n"
+            )
+    return results
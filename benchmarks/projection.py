@@ -0,0 +1,83 @@
+"""
+List projection benchmark.
+
+Renders the querysets behind the projected list endpoints (blood requests and
+public donors) both ways, through the serializer and through the view's
+RowProjection, and reports rows per second including the query. Outputs are
+compared first so a speedup never comes from rendering something else.
+"""
+import time
+
+from django.test.utils import override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from accounts.models import User
+from accounts.views import PublicDonorListView
+from blood_requests.views import BloodRequestListView
+
+from .api import percentile
+
+ENDPOINTS = {
+    'blood-request-list': BloodRequestListView,
+    'auth:donors': PublicDonorListView,
+}
+
+
+def bound_view(view_class, user):
+    request = APIRequestFactory().get('/')
+    force_authenticate(request, user=user)
+    view = view_class()
+    view.setup(view.initialize_request(request))
+    view.format_kwarg = None
+    return view
+
+
+def serialized(view, rows):
+    queryset = view.get_queryset()[:rows]
+    return list(view.get_serializer(queryset, many=True).data)
+
+
+def projected(view, rows):
+    columns, to_dict = view.get_projection().bind(view.get_serializer_context())
+    return [to_dict(row) for row in view.get_queryset().values(*columns)[:rows]]
+
+
+def measure(render, view, rows, iterations, warmup):
+    for _ in range(warmup):
+        render(view, rows)
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        count = len(render(view, rows))
+        timings.append(time.perf_counter() - start)
+    p50 = percentile(timings, 50)
+    return {
+        'rows': count,
+        'p50_ms': round(p50 * 1000, 3),
+        'p95_ms': round(percentile(timings, 95) * 1000, 3),
+        'rows_per_s': round(count / p50) if p50 else None,
+    }
+
+
+def run(rows=1000, iterations=20, warmup=3, stdout=None):
+    # Any user who isn't a requester sees every active blood request
+    user = User.objects.filter(role='donor').order_by('pk').first()
+    results = {}
+    with override_settings(PROFILE_PICTURE_UPLOAD_BACKEND='accounts.uploads.LocalStubUploadBackend'):
+        for label, view_class in ENDPOINTS.items():
+            view = bound_view(view_class, user)
+            if serialized(view, rows) != projected(view, rows):
+                raise AssertionError(f'{label}: projection output differs from the serializer')
+            serializer = measure(serialized, view, rows, iterations, warmup)
+            projection = measure(projected, view, rows, iterations, warmup)
+            results[label] = {
+                'serializer': serializer,
+                'projection': projection,
+                'speedup': round(serializer['p50_ms'] / projection['p50_ms'], 2) if projection['p50_ms'] else None,
+            }
+            if stdout:
+                stdout.write(
+                    f"{label:<20} serializer {serializer['rows_per_s']:>9} rows/s  "
+                    f"projection {projection['rows_per_s']:>9} rows/s  x{results[label]['speedup']}\n"
+                )
+    return results
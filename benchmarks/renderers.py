@@ -0,0 +1,84 @@
+"""
+Renderer benchmark.
+
+Encodes payloads shaped like the list endpoints' (serializer output for
+blood requests, donors and notifications, plus raw ``.values()`` rows with
+Decimal and datetime columns) with every available renderer and reports
+encode time and payload size.
+"""
+import gzip
+import time
+
+from django.test.utils import override_settings
+from rest_framework.renderers import JSONRenderer
+
+from accounts.models import User
+from accounts.serializers import DonorProfileSerializer
+from blood_requests.models import BloodRequest
+from blood_requests.serializers import BloodRequestSerializer
+from donation.models import Donation
+from hemogrid import renderers
+from notifications.models import Notification
+from notifications.serializers import NotificationSerializer
+
+from .api import percentile
+
+
+def available_renderers():
+    found = {'drf-json': JSONRenderer()}
+    if renderers.orjson:
+        found['orjson'] = renderers.ORJSONRenderer()
+    if renderers.msgpack:
+        found['msgpack'] = renderers.MessagePackRenderer()
+    return found
+
+
+def payloads(rows):
+    """Payloads of ``rows`` items each, keyed by name."""
+    if not Donation.objects.exists():
+        Donation.objects.bulk_create([
+            Donation(donor_name=f'Donor {i}', donor_email=f'donor{i}@example.com', amount=f'{100 + i}.50',
+                     status='paid', paid=True)
+            for i in range(rows)
+        ])
+    return {
+        'blood_requests': list(BloodRequestSerializer(
+            BloodRequest.objects.select_related('requester').order_by('pk')[:rows], many=True,
+        ).data),
+        'donors': list(DonorProfileSerializer(User.objects.filter(role='donor').order_by('pk')[:rows], many=True).data),
+        'notifications': list(NotificationSerializer(Notification.objects.order_by('pk')[:rows], many=True).data),
+        'donations_values': list(
+            Donation.objects.order_by('pk').values('id', 'donor_name', 'amount', 'status', 'created_at')[:rows]
+        ),
+    }
+
+
+def measure(renderer, data, iterations, warmup):
+    for _ in range(warmup):
+        renderer.render(data)
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        body = renderer.render(data)
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        'p50_ms': round(percentile(timings, 50), 3),
+        'p95_ms': round(percentile(timings, 95), 3),
+        'bytes': len(body),
+        'gzip_bytes': len(gzip.compress(body)),
+    }
+
+
+def run(rows=1000, iterations=50, warmup=5, stdout=None):
+    results = {}
+    with override_settings(PROFILE_PICTURE_UPLOAD_BACKEND='accounts.uploads.LocalStubUploadBackend'):
+        data = payloads(rows)
+        for payload, items in data.items():
+            for name, renderer in available_renderers().items():
+                label = f'{payload}:{name}'
+                results[label] = {'items': len(items), **measure(renderer, items, iterations, warmup)}
+                if stdout:
+                    stdout.write(
+                        f"{label:<32} p50 {results[label]['p50_ms']:8.3f}ms  {results[label]['bytes']:>9} bytes\n"
+                    )
+    return results
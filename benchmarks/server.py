@@ -0,0 +1,195 @@
+"""
+Gunicorn throughput benchmark.
+
+Starts gunicorn with gunicorn.conf.py once per worker profile (sync,
+gthread, uvicorn) against the benchmark database and drives a mix of
+authenticated read endpoints from concurrent keep-alive clients for a fixed
+time, recording throughput, latency percentiles and errors per profile.
+"""
+import importlib.util
+import itertools
+import os
+import runpy
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .api import Context, percentile, scenarios
+from .startup import ROOT
+
+CONFIG = os.path.join(ROOT, 'gunicorn.conf.py')
+PROFILES = ('sync', 'gthread', 'uvicorn')
+# Module each profile's worker class needs besides gunicorn
+PROFILE_REQUIRES = {'uvicorn': 'uvicorn_worker'}
+
+# Read scenarios (labels from benchmarks.api) making up the request mix
+WORKLOAD = (
+    'api-home',
+    'auth:donors',
+    'auth:donors:search',
+    'auth:donor-profile',
+    'auth:dashboard',
+    'blood-request-list',
+    'blood-request-list:search',
+    'my-requests',
+    'user-donation-history',
+    'notification-list',
+)
+
+
+def build_workload(ctx):
+    """[(label, path, headers)] for WORKLOAD, with a bearer token per user."""
+    tokens = {}
+    workload = []
+    for scenario in scenarios():
+        if scenario.label not in WORKLOAD:
+            continue
+        headers = {}
+        user = scenario.user(ctx, {}) if scenario.user else None
+        if user is not None:
+            if user.pk not in tokens:
+                tokens[user.pk] = str(RefreshToken.for_user(user).access_token)
+            headers['Authorization'] = f'Bearer {tokens[user.pk]}'
+        workload.append((scenario.label, scenario.path(ctx, {}), headers))
+    return workload
+
+
+def tuned(profile):
+    """The worker settings gunicorn.conf.py picks for ``profile`` on this machine."""
+    env = {**os.environ, 'GUNICORN_PROFILE': profile}
+    config = runpy.run_path(CONFIG)
+    return config['tune'](profile, config['available_cpus'](), config['available_memory_mb'](), env)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class Server:
+    """A gunicorn process for one profile, stopped on exit."""
+
+    def __init__(self, profile, env, startup_timeout=60):
+        self.profile = profile
+        self.port = free_port()
+        self.base_url = f'http://127.0.0.1:{self.port}'
+        self.env = {**os.environ, **env, 'GUNICORN_PROFILE': profile}
+        self.startup_timeout = startup_timeout
+
+    def __enter__(self):
+        self.log = tempfile.TemporaryFile(mode='w+')
+        self.process = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '--config', CONFIG, '--bind', f'127.0.0.1:{self.port}'],
+            cwd=ROOT, env=self.env, stdout=self.log, stderr=subprocess.STDOUT,
+        )
+        deadline = time.monotonic() + self.startup_timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                break
+            try:
+                if requests.get(self.base_url + '/api/', timeout=1).status_code == 200:
+                    return self
+            except requests.RequestException:
+                pass
+            time.sleep(0.2)
+        self.__exit__()
+        raise RuntimeError(f'gunicorn ({self.profile}) did not start:\n{self.output()[-2000:]}')
+
+    def output(self):
+        self.log.seek(0)
+        return self.log.read()
+
+    def __exit__(self, *exc):
+        if self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+        self.log.close()
+
+
+def load(base_url, workload, concurrency, duration):
+    """Drive ``workload`` round-robin from ``concurrency`` clients for ``duration`` seconds."""
+    deadline = time.monotonic() + duration
+    latencies, statuses, errors = [], {}, []
+    lock = threading.Lock()
+
+    def client(offset):
+        session = requests.Session()
+        mine, codes, failures = [], {}, 0
+        for label, path, headers in itertools.islice(itertools.cycle(workload), offset, None):
+            if time.monotonic() >= deadline:
+                break
+            start = time.perf_counter()
+            try:
+                response = session.get(base_url + path, headers=headers, timeout=30)
+                response.content
+            except requests.RequestException:
+                failures += 1
+                continue
+            mine.append((time.perf_counter() - start) * 1000)
+            codes[str(response.status_code)] = codes.get(str(response.status_code), 0) + 1
+        with lock:
+            latencies.extend(mine)
+            errors.append(failures)
+            for code, count in codes.items():
+                statuses[code] = statuses.get(code, 0) + count
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return {
+        'requests': len(latencies),
+        'throughput_rps': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 50), 2) if latencies else None,
+        'p95_ms': round(percentile(latencies, 95), 2) if latencies else None,
+        'p99_ms': round(percentile(latencies, 99), 2) if latencies else None,
+        'connection_errors': sum(errors),
+        'status_codes': statuses,
+    }
+
+
+def run(database_name, profiles=PROFILES, concurrency=16, duration=10.0, warmup=2.0, stdout=None):
+    """Benchmark each profile against the already populated ``database_name``."""
+    workload = build_workload(Context())
+    results = {}
+    with tempfile.TemporaryDirectory() as metrics_dir:
+        env = {
+            'DJANGO_SETTINGS_MODULE': 'benchmarks.settings',
+            'BENCHMARK_DATABASE_NAME': str(database_name),
+            'PROMETHEUS_MULTIPROC_DIR': metrics_dir,
+        }
+        for profile in profiles:
+            required = PROFILE_REQUIRES.get(profile)
+            if required and importlib.util.find_spec(required) is None:
+                results[profile] = {'skipped': f'{required} is not installed'}
+                continue
+            config = tuned(profile)
+            with Server(profile, env) as server:
+                load(server.base_url, workload, concurrency, warmup)
+                result = load(server.base_url, workload, concurrency, duration)
+            results[profile] = {
+                'worker_class': config['worker_class'],
+                'workers': config['workers'],
+                'threads': config['threads'],
+                **result,
+            }
+            if stdout:
+                stdout.write(
+                    f"{profile:<8} {config['workers']} worker(s) x {config['threads']} thread(s): "
+                    f"{result['throughput_rps']:8.1f} req/s  p95 {result['p95_ms']}ms\n"
+                )
+    return results
@@ -0,0 +1,20 @@
+"""
+Project settings for benchmark servers.
+
+Gunicorn workers run in their own processes, so they are pointed at the
+benchmark database by name (BENCHMARK_DATABASE_NAME) and, on SQLite, that
+database is a file rather than the in-memory test default.
+"""
+import os
+
+from hemogrid.settings import *  # noqa: F401,F403
+from hemogrid.settings import BASE_DIR, DATABASES
+
+if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+    DATABASES['default']['TEST'] = {'NAME': str(BASE_DIR / 'benchmark.sqlite3')}
+if os.getenv('BENCHMARK_DATABASE_NAME'):
+    DATABASES['default']['NAME'] = os.environ['BENCHMARK_DATABASE_NAME']
+
+EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+PROFILE_PICTURE_UPLOAD_BACKEND = 'accounts.uploads.LocalStubUploadBackend'
+PAYMENT_GATEWAY_BACKEND = 'donation.gateway.StubGateway'
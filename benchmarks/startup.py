@@ -0,0 +1,146 @@
+"""
+Cold-start benchmark.
+
+Each target runs in a fresh interpreter under ``python -X importtime``: a
+gunicorn worker (load the WSGI app and its URLConf, as the first request
+does) and the periodic management commands, loaded and system-checked the
+way ``manage.py`` does before ``handle()``. Reports wall time and import time
+per target, the packages that take longest to import, and any LAZY_MODULES
+that were imported anyway.
+"""
+import os
+import re
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+from benchmarks.api import percentile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SETUP = (
+    "import os, django\n"
+    "os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'hemogrid.settings')\n"
+)
+
+COMMAND = SETUP + (
+    "django.setup()\n"
+    "from django.core.management import get_commands, load_command_class\n"
+    "command = load_command_class(get_commands()[{name!r}], {name!r})\n"
+    "command.check()\n"
+)
+
+TARGETS = {
+    'worker': SETUP + (
+        "import hemogrid.wsgi\n"
+        "from django.urls import get_resolver\n"
+        "get_resolver().url_patterns\n"
+    ),
+    'run_dispatch': COMMAND.format(name='run_dispatch'),
+    'send_notification_digests': COMMAND.format(name='send_notification_digests'),
+    'reconcile_payments': COMMAND.format(name='reconcile_payments'),
+    'release_deferred_donors': COMMAND.format(name='release_deferred_donors'),
+    'expire_blood_requests': COMMAND.format(name='expire_blood_requests'),
+}
+
+# Only needed by a few requests or in DEBUG; importing them at startup is a regression
+LAZY_MODULES = (
+    'drf_yasg.views',
+    'rest_framework.test',
+    'debug_toolbar',
+)
+
+IMPORT_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+
+def parse_importtime(stderr):
+    """[(module, self_us, cumulative_us, depth)] from ``-X importtime`` output."""
+    imports = []
+    for line in stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            imports.append((module, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return imports
+
+
+# -X importtime only logs import statements, not importlib.import_module()
+# (settings, apps, URLConfs, commands), so the loaded modules are listed separately
+LIST_MODULES = "\nimport sys\nprint(' '.join(sorted(sys.modules)))\n"
+
+
+def run_target(code):
+    """(wall ms, parsed importtime lines, names of every module loaded) for one fresh run."""
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code + LIST_MODULES],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    wall_ms = (time.perf_counter() - start) * 1000
+    if proc.returncode:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else 'target failed')
+    return wall_ms, parse_importtime(proc.stderr), set(proc.stdout.strip().splitlines()[-1].split())
+
+
+def measure(code, iterations=5, top=10):
+    walls, totals, runs = [], [], []
+    for _ in range(iterations):
+        wall_ms, imports, modules = run_target(code)
+        walls.append(wall_ms)
+        totals.append(sum(cumulative for _, _, cumulative, depth in imports if depth == 0) / 1000)
+        runs.append(imports)
+
+    # Per-package import time from the median run, so one noisy run doesn't decide it
+    median_run = runs[sorted(range(iterations), key=totals.__getitem__)[iterations // 2]]
+    packages = defaultdict(int)
+    for module, self_us, _, _ in median_run:
+        packages[module.split('.')[0]] += self_us
+    slowest = sorted(packages.items(), key=lambda item: -item[1])[:top]
+    return {
+        'wall_p50_ms': round(percentile(walls, 50), 1),
+        'wall_min_ms': round(min(walls), 1),
+        'import_p50_ms': round(percentile(totals, 50), 1),
+        'modules': len(modules),
+        'slowest_packages': [{'package': package, 'ms': round(self_us / 1000, 1)} for package, self_us in slowest],
+        'eager': [module for module in LAZY_MODULES if module in modules],
+    }
+
+
+def run(iterations=5, only=None, top=10, stdout=None):
+    results = {}
+    for name, code in TARGETS.items():
+        if only and only not in name:
+            continue
+        results[name] = measure(code, iterations, top)
+        if stdout:
+            stdout.write(
+                f"{name:<28} wall p50 {results[name]['wall_p50_ms']:8.1f}ms  "
+                f"imports p50 {results[name]['import_p50_ms']:8.1f}ms  {results[name]['modules']} modules\n"
+            )
+    return results
+
+
+def compare(results, baseline, tolerance=0.2, min_delta_ms=10.0, budget_ms=None):
+    """
+    A target regresses when its median import time grows by more than
+    ``tolerance`` (and at least ``min_delta_ms``), exceeds ``budget_ms``, or
+    imports one of LAZY_MODULES.
+    """
+    regressions = []
+    for name, current in results.items():
+        previous = (baseline or {}).get(name)
+        if previous:
+            delta = current['import_p50_ms'] - previous['import_p50_ms']
+            if delta > previous['import_p50_ms'] * tolerance and delta >= min_delta_ms:
+                regressions.append({
+                    'target': name, 'metric': 'import_p50_ms',
+                    'baseline': previous['import_p50_ms'], 'current': current['import_p50_ms'],
+                })
+        if budget_ms is not None and current['import_p50_ms'] > budget_ms:
+            regressions.append({
+                'target': name, 'metric': 'budget_ms', 'baseline': budget_ms, 'current': current['import_p50_ms'],
+            })
+        for module in current['eager']:
+            regressions.append({'target': name, 'metric': 'eager_import', 'baseline': None, 'current': module})
+    return regressions
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import BloodRequest, DonationHistory
+from .models import BloodRequest, BloodRequestDailyStats, BloodRequestEvent, DonationHistory
 
 # Register your models here.
 
@@ -16,4 +16,25 @@ class DonationHistoryAdmin(admin.ModelAdmin):
     list_display = ('id', 'donor', 'blood_request', 'status', 'accepted_at')  
     search_fields = ('donor__email', 'blood_request__location')
     list_filter = ('status', 'accepted_at')  
-    ordering = ('-accepted_at',)  
\ No newline at end of file
+    ordering = ('-accepted_at',)  
+
+
+@admin.register(BloodRequestEvent)
+class BloodRequestEventAdmin(admin.ModelAdmin):
+    list_display = ('id', 'blood_request_id', 'kind', 'from_status', 'to_status', 'blood_group', 'actor', 'created_at')
+    list_filter = ('kind', 'blood_group', 'created_at')
+    ordering = ('-id',)
+
+    # Append-only
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(BloodRequestDailyStats)
+class BloodRequestDailyStatsAdmin(admin.ModelAdmin):
+    list_display = ('day', 'blood_group', 'created', 'accepted', 'completed', 'cancelled', 'expired', 'reopened')
+    list_filter = ('blood_group',)
+    ordering = ('-day', 'blood_group')
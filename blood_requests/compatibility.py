@@ -0,0 +1,161 @@
+"""
+Compatible-request feed: the open requests a donor's blood can serve.
+
+Donors are grouped into buckets by blood group and region (the last part of
+their address, usually the city). A bucket's ranked request IDs come from one
+query on the request_open_group_idx partial index and are cached for
+COMPATIBLE_FEED_CACHE_SECONDS in the COMPATIBLE_FEED_CACHE cache, so every
+donor in the bucket shares them. Per donor there is one more query: it loads
+those rows and anti-joins away the donor's own requests and the ones they
+already accepted. It also re-checks that each request is still open, so a
+stale bucket never shows a closed one.
+
+New requests invalidate the buckets of every donor blood group that can serve
+them (invalidate_buckets, called once the creating transaction commits).
+Buckets can't be listed in a portable way, so each donor blood group has a
+version number in the cache that is part of its bucket keys; bumping it
+orphans all of that group's buckets, which then expire on their own.
+
+Ranking: urgency, then requests whose location mentions the region, then
+soonest expiry (requests with no expiry last), then newest.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Case, Exists, F, IntegerField, OuterRef, Q, Value, When
+from django.utils import timezone
+
+from .dispatch import location_terms
+from .models import BloodRequest, DonationHistory
+
+DEFAULT_CACHE_SECONDS = 60
+DEFAULT_FEED_SIZE = 100
+
+# Donor blood group -> recipient blood groups it can be given to (red cells)
+COMPATIBLE_RECIPIENTS = {
+    'O-': ['O-', 'O+', 'A-', 'A+', 'B-', 'B+', 'AB-', 'AB+'],
+    'O+': ['O+', 'A+', 'B+', 'AB+'],
+    'A-': ['A-', 'A+', 'AB-', 'AB+'],
+    'A+': ['A+', 'AB+'],
+    'B-': ['B-', 'B+', 'AB-', 'AB+'],
+    'B+': ['B+', 'AB+'],
+    'AB-': ['AB-', 'AB+'],
+    'AB+': ['AB+'],
+}
+
+# Recipient blood group -> donor blood groups that can serve it
+COMPATIBLE_DONORS = {
+    recipient: [donor for donor, recipients in COMPATIBLE_RECIPIENTS.items() if recipient in recipients]
+    for recipient in COMPATIBLE_RECIPIENTS
+}
+
+URGENCY_RANK = Case(
+    When(urgency='high', then=Value(0)),
+    When(urgency='medium', then=Value(1)),
+    default=Value(2),
+    output_field=IntegerField(),
+)
+
+
+def get_cache():
+    return caches[getattr(settings, 'COMPATIBLE_FEED_CACHE', 'default')]
+
+
+def get_cache_seconds():
+    return getattr(settings, 'COMPATIBLE_FEED_CACHE_SECONDS', DEFAULT_CACHE_SECONDS)
+
+
+def get_feed_size():
+    return getattr(settings, 'COMPATIBLE_FEED_SIZE', DEFAULT_FEED_SIZE)
+
+
+def region_of(address):
+    """'House 2, Mirpur, Dhaka' -> 'dhaka'; '' when the address has no usable part."""
+    terms = location_terms(address)
+    return terms[-1].casefold() if terms else ''
+
+
+def version_key(blood_group):
+    return f'compatible:version:{blood_group}'
+
+
+def bucket_key(blood_group, region, version):
+    return f'compatible:{blood_group}:{version}:{hashlib.sha1(region.encode()).hexdigest()[:16]}'
+
+
+def invalidate_buckets(blood_requests):
+    """
+    After the current transaction commits, drop the cached buckets of every
+    donor blood group that can serve one of ``blood_requests``.
+    """
+    donor_groups = {
+        donor for blood_request in blood_requests for donor in COMPATIBLE_DONORS.get(blood_request.blood_group, ())
+    }
+    if not donor_groups:
+        return
+
+    def bump():
+        cache = get_cache()
+        for blood_group in donor_groups:
+            key = version_key(blood_group)
+            if not cache.add(key, 1, timeout=None):
+                try:
+                    cache.incr(key)
+                except ValueError:
+                    cache.add(key, 1, timeout=None)
+
+    transaction.on_commit(bump)
+
+
+def open_requests(now=None):
+    now = now or timezone.now()
+    return BloodRequest.objects.filter(
+        Q(expires_at__isnull=True) | Q(expires_at__gt=now),
+        is_active=True,
+        status='pending',
+    )
+
+
+def ranked_request_ids(blood_group, region):
+    """IDs of the open requests ``blood_group`` can serve, best first, for donors in ``region``."""
+    proximity = Value(0, output_field=IntegerField())
+    if region:
+        proximity = Case(When(location__icontains=region, then=Value(1)), default=proximity)
+    return list(
+        open_requests()
+        .filter(blood_group__in=COMPATIBLE_RECIPIENTS[blood_group])
+        .annotate(urgency_rank=URGENCY_RANK, proximity=proximity)
+        .order_by('urgency_rank', '-proximity', F('expires_at').asc(nulls_last=True), '-created_at', '-pk')
+        .values_list('pk', flat=True)[:get_feed_size()]
+    )
+
+
+def bucket_request_ids(blood_group, region):
+    cache = get_cache()
+    version = cache.get(version_key(blood_group), 0)
+    return cache.get_or_set(
+        bucket_key(blood_group, region, version),
+        lambda: ranked_request_ids(blood_group, region),
+        get_cache_seconds(),
+    )
+
+
+def compatible_requests(user):
+    """The feed for ``user``: their bucket's requests minus their own and the ones they accepted."""
+    if user.blood_group not in COMPATIBLE_RECIPIENTS:
+        return []
+    ids = bucket_request_ids(user.blood_group, region_of(user.address))
+    if not ids:
+        return []
+    accepted = DonationHistory.objects.filter(donor=user, blood_request=OuterRef('pk'))
+    rows = (
+        open_requests()
+        .filter(pk__in=ids)
+        .exclude(requester=user)
+        .exclude(Exists(accepted))
+        .select_related('requester')
+    )
+    rank = {pk: position for position, pk in enumerate(ids)}
+    return sorted(rows, key=lambda blood_request: rank[blood_request.pk])
@@ -0,0 +1,212 @@
+"""
+Wave-based donor dispatch.
+
+Rather than notifying every matching donor the moment a request is posted,
+donors are notified in waves: the best-ranked few first, then more each time
+a wave's window closes without anyone accepting. Donors whose address mentions
+the request's location rank first, then those who have gone longest since
+their last donation. Windows are shorter for more urgent requests.
+
+Progress is kept per request in DispatchState. The first wave goes out when
+the request is created; later ones are sent by ``manage.py run_dispatch``.
+Donors over their notification budget are passed over (notifications.throttle).
+
+A batch of waves is matched in one pass: one query loads the eligible donors
+of every blood group in the batch, already ordered by last donation, and each
+request re-sorts its group's donors by proximity in memory. When nobody is
+left to ask the request isn't finished; it's checked again every
+DISPATCH_RECHECK_INTERVAL seconds for donors who have become eligible since
+(a deferral ended, a new sign-up) until it's accepted, closed or expires.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Q, When
+from django.utils import timezone
+
+from accounts.models import User
+from notifications import throttle
+from notifications.models import Notification
+from sync.log import record_notifications
+from .models import DispatchState
+
+# Donors per wave; the last entry repeats, None means "everyone left"
+DEFAULT_WAVE_SIZES = (10, 25, 50, None)
+# Seconds to wait for an acceptance before the next wave, by urgency
+DEFAULT_WAVE_WINDOWS = {'high': 5 * 60, 'medium': 15 * 60, 'low': 30 * 60}
+DEFAULT_DONATION_INTERVAL_DAYS = 90
+DEFAULT_RECHECK_INTERVAL = 6 * 60 * 60
+
+URGENCY_ORDER = Case(
+    When(blood_request__urgency='high', then=0),
+    When(blood_request__urgency='medium', then=1),
+    default=2,
+    output_field=IntegerField(),
+)
+
+
+def wave_size(wave):
+    sizes = getattr(settings, 'DISPATCH_WAVE_SIZES', DEFAULT_WAVE_SIZES)
+    return sizes[min(wave, len(sizes) - 1)]
+
+
+def wave_window(urgency):
+    windows = getattr(settings, 'DISPATCH_WAVE_WINDOWS', DEFAULT_WAVE_WINDOWS)
+    return timedelta(seconds=windows.get(urgency, windows['medium']))
+
+
+def recheck_interval():
+    return timedelta(seconds=getattr(settings, 'DISPATCH_RECHECK_INTERVAL', DEFAULT_RECHECK_INTERVAL))
+
+
+def notification_message(blood_request):
+    return f"New blood request for {blood_request.blood_group} near you!"
+
+
+def location_terms(location):
+    """'Square Hospital, Panthapath, Dhaka' -> ['Square Hospital', 'Panthapath', 'Dhaka']"""
+    return [part.strip() for part in (location or '').split(',') if len(part.strip()) >= 3]
+
+
+def eligible_donors(blood_groups):
+    interval = getattr(settings, 'DONATION_INTERVAL_DAYS', DEFAULT_DONATION_INTERVAL_DAYS)
+    cutoff = timezone.localdate() - timedelta(days=interval)
+    return User.objects.filter(
+        Q(last_donation_date__isnull=True) | Q(last_donation_date__lte=cutoff),
+        role='donor',
+        is_active=True,
+        is_verified=True,
+        availability_status='available',
+        blood_group__in=blood_groups,
+    )
+
+
+def donor_pool(blood_requests):
+    """
+    {blood group: [(pk, address), ...]}: the eligible donors for every blood
+    group in ``blood_requests``, longest since their last donation first.
+    """
+    groups = {blood_request.blood_group for blood_request in blood_requests}
+    if not groups:
+        return {}
+    pool = {}
+    donors = (
+        eligible_donors(groups)
+        .order_by(F('last_donation_date').asc(nulls_first=True), 'pk')
+        .values_list('pk', 'blood_group', 'address')
+    )
+    for pk, blood_group, address in donors:
+        pool.setdefault(blood_group, []).append((pk, (address or '').casefold()))
+    return pool
+
+
+def notified_donors(blood_request_ids):
+    """{request id: {donor ids already notified}} for the given requests."""
+    notified = {}
+    if blood_request_ids:
+        pairs = Notification.objects.filter(blood_request_id__in=blood_request_ids).values_list(
+            'blood_request_id', 'recipient_id',
+        )
+        for blood_request_id, recipient_id in pairs:
+            notified.setdefault(blood_request_id, set()).add(recipient_id)
+    return notified
+
+
+def ranked_donors(blood_request, pool, notified=()):
+    """
+    IDs of the donors in ``pool`` (one blood group's, from donor_pool) not yet
+    notified about ``blood_request``, best first: the more of the request's
+    location their address mentions the better, then the pool's order.
+    """
+    terms = [term.casefold() for term in location_terms(blood_request.location)]
+    candidates = [
+        (pk, address) for pk, address in pool
+        if pk != blood_request.requester_id and pk not in notified
+    ]
+    # sorted() is stable, so equally close donors keep the pool's order
+    candidates.sort(key=lambda donor: -sum(term in donor[1] for term in terms))
+    return [pk for pk, _ in candidates]
+
+
+def pick_donors(blood_request, candidates, size):
+    """
+    The next ``size`` of the ranked ``candidates`` (all if None) that the
+    notification throttle lets through, and whether the candidates ran out.
+    """
+    if size is None:
+        return throttle.claim(blood_request, candidates), True
+    picked, offset, page = [], 0, size * 2
+    while True:
+        batch = candidates[offset:offset + page]
+        picked += throttle.claim(blood_request, batch, limit=size - len(picked))
+        if len(picked) >= size:
+            return picked, False
+        if len(batch) < page:
+            return picked, True
+        offset += page
+
+
+def send_waves(states, now=None):
+    """Send the next wave for each DispatchState; returns the number of notifications."""
+    now = now or timezone.now()
+    active = []
+    for state in states:
+        blood_request = state.blood_request
+        if not blood_request.is_active or blood_request.status != 'pending':
+            state.finished = True
+            state.next_wave_at = None
+        else:
+            active.append(state)
+
+    pool = donor_pool([state.blood_request for state in active])
+    # A first wave has notified nobody yet
+    notified = notified_donors([state.blood_request_id for state in active if state.wave])
+    notifications = []
+    for state in active:
+        blood_request = state.blood_request
+        candidates = ranked_donors(
+            blood_request, pool.get(blood_request.blood_group, ()), notified.get(blood_request.pk, ()),
+        )
+        donor_ids, exhausted = pick_donors(blood_request, candidates, wave_size(state.wave))
+        message = notification_message(blood_request)
+        notifications += [
+            Notification(recipient_id=pk, blood_request=blood_request, message=message) for pk in donor_ids
+        ]
+
+        state.wave += 1
+        state.notified_count += len(donor_ids)
+        # Nobody left to ask for now: look again later rather than stop for good
+        state.next_wave_at = now + (recheck_interval() if exhausted else wave_window(blood_request.urgency))
+
+    Notification.objects.bulk_create(notifications, batch_size=1000)
+    # bulk_create skips post_save
+    record_notifications(notifications)
+    DispatchState.objects.bulk_update(states, ['wave', 'notified_count', 'next_wave_at', 'finished'])
+    return len(notifications)
+
+
+def start_dispatch(blood_requests, now=None):
+    """Create dispatch state for new requests and send their first wave."""
+    now = now or timezone.now()
+    states = DispatchState.objects.bulk_create([
+        DispatchState(blood_request=blood_request, next_wave_at=now) for blood_request in blood_requests
+    ])
+    return send_waves(states, now)
+
+
+def run_due_waves(now=None, limit=100):
+    """
+    Send the next wave of up to ``limit`` requests whose window has closed,
+    most urgent first. Safe to run from several workers on PostgreSQL: rows
+    another runner holds are skipped. Returns (requests processed, notifications).
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        states = list(
+            DispatchState.objects.select_for_update(skip_locked=True, of=('self',))
+            .select_related('blood_request')
+            .filter(finished=False, next_wave_at__lte=now)
+            .order_by(URGENCY_ORDER, 'next_wave_at')[:limit]
+        )
+        return len(states), send_waves(states, now)
@@ -0,0 +1,110 @@
+"""
+Blood request event log.
+
+Every transition appends a BloodRequestEvent in the transaction that makes
+it: created, accepted, completed, cancelled, reopened (back to pending) and
+expired. Single transitions save their event directly; paths that move many
+requests at once (bulk create, the expiry sweep, stock allocation) collect
+them in an EventBuffer, which inserts them in batches of
+BLOOD_REQUEST_EVENT_BATCH_SIZE when it fills up and when the block ends.
+
+Analytics are rebuilt offline from the log: rebuild_daily_stats (run by
+the rebuild_request_stats command) turns events into per-day, per-blood-group
+counts with one GROUP BY, and readers query that table instead of
+aggregating live over blood requests, whose rows only show current state.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import BloodRequestDailyStats, BloodRequestEvent
+
+DEFAULT_BATCH_SIZE = 500
+
+# Event kind -> BloodRequestDailyStats column
+STATS_COLUMNS = {
+    BloodRequestEvent.CREATED: 'created',
+    'accepted': 'accepted',
+    'completed': 'completed',
+    'cancelled': 'cancelled',
+    BloodRequestEvent.EXPIRED: 'expired',
+    'pending': 'reopened',
+}
+
+
+def get_batch_size():
+    return getattr(settings, 'BLOOD_REQUEST_EVENT_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+
+
+def record(blood_request, kind, to_status=None, from_status=None, actor=None):
+    """Save one event for ``blood_request``; call it before the request's status changes."""
+    event = BloodRequestEvent.for_request(blood_request, kind, to_status, from_status, actor)
+    event.save()
+    return event
+
+
+class EventBuffer:
+    """
+    Collects events and bulk-inserts them; use it as a context manager
+    inside the transaction making the transitions. Nothing is written if the
+    block raises.
+    """
+
+    def __init__(self, batch_size=None):
+        self.batch_size = batch_size or get_batch_size()
+        self.pending = []
+
+    def add(self, blood_request, kind, to_status=None, from_status=None, actor=None):
+        self.pending.append(BloodRequestEvent.for_request(blood_request, kind, to_status, from_status, actor))
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.pending:
+            BloodRequestEvent.objects.bulk_create(self.pending, batch_size=self.batch_size)
+            self.pending = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.flush()
+        else:
+            self.pending = []
+
+
+def rebuild_daily_stats(days=None):
+    """
+    Recompute BloodRequestDailyStats from the event log, for the last
+    ``days`` days or all of it. Returns the number of rows written.
+    """
+    events = BloodRequestEvent.objects.all()
+    stats = BloodRequestDailyStats.objects.all()
+    if days is not None:
+        start = timezone.localdate() - timedelta(days=days - 1)
+        events = events.filter(created_at__date__gte=start)
+        stats = stats.filter(day__gte=start)
+
+    rows = {}
+    counts = (
+        events.annotate(day=TruncDate('created_at'))
+        .values('day', 'blood_group', 'kind')
+        .annotate(total=Count('pk'))
+        .order_by()
+    )
+    for item in counts:
+        row = rows.setdefault(
+            (item['day'], item['blood_group']),
+            BloodRequestDailyStats(day=item['day'], blood_group=item['blood_group']),
+        )
+        setattr(row, STATS_COLUMNS[item['kind']], item['total'])
+
+    with transaction.atomic():
+        stats.delete()
+        BloodRequestDailyStats.objects.bulk_create(rows.values(), batch_size=get_batch_size())
+    return len(rows)
@@ -0,0 +1,53 @@
+"""
+Closing expired blood requests.
+
+expire_requests (run by the expire_blood_requests command) closes requests
+whose ``expires_at`` has passed the way BloodRequest.mark_expired() does
+(inactive, status EXPIRED_STATUS), in batches: each batch locks its
+rows with SELECT ... FOR UPDATE SKIP LOCKED, so concurrent runs take
+disjoint rows, and the UPDATE only touches rows still active. Only the rows
+that UPDATE closed get an EXPIRED event, a sync change and their stock
+released, so no request is logged as expired twice.
+
+Between runs the request list hides expired rows itself (see
+BloodRequestListView), so the interval only delays the bookkeeping.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from inventory.stock import release_for_requests
+from sync.log import record
+from sync.models import Change
+from .events import EventBuffer
+from .models import BloodRequest, BloodRequestEvent
+
+DEFAULT_BATCH_SIZE = 500
+
+
+def expire_requests(now=None, batch_size=DEFAULT_BATCH_SIZE):
+    """Close every active request that expired before ``now``; returns how many were closed."""
+    now = now or timezone.now()
+    expired_total = 0
+    while True:
+        with transaction.atomic(), EventBuffer() as events:
+            locked = list(
+                BloodRequest.objects.select_for_update(skip_locked=True)
+                .filter(expires_at__lt=now, is_active=True)
+                .order_by('pk')
+                .only('pk', 'status', 'blood_group')[:batch_size]
+            )
+            ids = [blood_request.pk for blood_request in locked]
+            closed = locked
+            if ids and BloodRequest.objects.filter(pk__in=ids, is_active=True).update(
+                is_active=False, status=BloodRequest.EXPIRED_STATUS, updated_at=now,
+            ) < len(ids):
+                # Without row locks (SQLite) another run closed some of them first
+                mine = set(BloodRequest.objects.filter(pk__in=ids, updated_at=now).values_list('pk', flat=True))
+                closed = [blood_request for blood_request in locked if blood_request.pk in mine]
+            for blood_request in closed:
+                events.add(blood_request, BloodRequestEvent.EXPIRED, to_status=BloodRequest.EXPIRED_STATUS)
+            record(Change.BLOOD_REQUEST, [blood_request.pk for blood_request in closed])
+        release_for_requests([blood_request.pk for blood_request in closed])
+        expired_total += len(closed)
+        if len(locked) < batch_size:
+            return expired_total
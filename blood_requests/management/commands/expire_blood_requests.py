@@ -0,0 +1,25 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from blood_requests.expiry import DEFAULT_BATCH_SIZE, expire_requests
+
+
+class Command(BaseCommand):
+    help = 'Close blood requests whose expiry time has passed and log their EXPIRED events'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Close expired requests once and exit')
+        parser.add_argument('--interval', type=float, default=None, help='Seconds between runs')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='Requests per UPDATE')
+
+    def handle(self, *args, **options):
+        interval = options['interval'] or getattr(settings, 'BLOOD_REQUEST_EXPIRY_INTERVAL', 60)
+        while True:
+            expired = expire_requests(batch_size=options['batch_size'])
+            if expired:
+                self.stdout.write(self.style.SUCCESS(f'Closed {expired} expired requests'))
+            if options['once']:
+                break
+            time.sleep(interval)
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from blood_requests.events import rebuild_daily_stats
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the daily blood request statistics from the event log'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None, help='Only rebuild the last N days (default: all)')
+
+    def handle(self, *args, **options):
+        rows = rebuild_daily_stats(days=options['days'])
+        self.stdout.write(self.style.SUCCESS(f'Wrote {rows} daily stats rows'))
@@ -0,0 +1,34 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from blood_requests.dispatch import run_due_waves
+
+
+class Command(BaseCommand):
+    help = 'Send the next donor notification wave for requests nobody has accepted yet'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Process due waves once and exit')
+        parser.add_argument('--interval', type=float, default=None, help='Seconds between polls')
+        parser.add_argument('--batch-size', type=int, default=100, help='Requests per transaction')
+
+    def handle(self, *args, **options):
+        interval = options['interval'] or getattr(settings, 'DISPATCH_POLL_INTERVAL', 30)
+        while True:
+            processed = self.drain(options['batch_size'])
+            if options['once']:
+                break
+            if not processed:
+                time.sleep(interval)
+
+    def drain(self, batch_size):
+        total = 0
+        while True:
+            processed, notified = run_due_waves(limit=batch_size)
+            if processed:
+                self.stdout.write(f'Processed {processed} requests, notified {notified} donors')
+            total += processed
+            if processed < batch_size:
+                return total
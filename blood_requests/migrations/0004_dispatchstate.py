@@ -0,0 +1,29 @@
+# Generated by Django 4.2.25 on 2026-10-19 16:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blood_requests', '0003_alter_donationhistory_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DispatchState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('wave', models.PositiveSmallIntegerField(default=0, help_text='Waves sent so far')),
+                ('notified_count', models.PositiveIntegerField(default=0)),
+                ('next_wave_at', models.DateTimeField(blank=True, null=True)),
+                ('finished', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('blood_request', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='dispatch', to='blood_requests.bloodrequest')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['finished', 'next_wave_at'], name='dispatch_due_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.25 on 2026-10-19 17:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blood_requests', '0006_bloodrequestevent_bloodrequestdailystats'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bloodrequest',
+            index=models.Index(condition=models.Q(('is_active', True), ('status', 'pending')), fields=['blood_group', 'urgency'], name='request_open_group_idx'),
+        ),
+    ]
@@ -0,0 +1,86 @@
+# Generated by Django 4.2.25 on 2026-10-19 18:30
+
+from django.db import migrations
+
+TABLE = 'blood_requests_bloodrequest'
+FTS_TABLE = f'{TABLE}_fts'
+
+# PostgreSQL: a generated tsvector column (location weighted above details)
+# with a GIN index; the database keeps it in sync on every write.
+PG_FORWARD = [
+    f"""
+    ALTER TABLE {TABLE} ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(location, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(details, '')), 'B')
+    ) STORED
+    """,
+    f"CREATE INDEX IF NOT EXISTS {TABLE}_search_gin ON {TABLE} USING GIN (search_vector)",
+]
+PG_REVERSE = [
+    f"DROP INDEX IF EXISTS {TABLE}_search_gin",
+    f"ALTER TABLE {TABLE} DROP COLUMN IF EXISTS search_vector",
+]
+
+# SQLite: an external-content FTS5 table kept in sync by triggers, then
+# filled from the existing rows.
+SQLITE_FORWARD = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        location, details, content='{TABLE}', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON {TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, location, details) VALUES (new.id, new.location, new.details);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON {TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, location, details) VALUES ('delete', old.id, old.location, old.details);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF location, details ON {TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, location, details) VALUES ('delete', old.id, old.location, old.details);
+        INSERT INTO {FTS_TABLE}(rowid, location, details) VALUES (new.id, new.location, new.details);
+    END
+    """,
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+SQLITE_REVERSE = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ai",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_au",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+STATEMENTS = {
+    'postgresql': (PG_FORWARD, PG_REVERSE),
+    'sqlite': (SQLITE_FORWARD, SQLITE_REVERSE),
+}
+
+
+def run(direction):
+    def operation(apps, schema_editor):
+        from blood_requests.search import forget_search_index
+
+        statements = STATEMENTS.get(schema_editor.connection.vendor)
+        if statements is None:
+            return
+        for sql in statements[direction]:
+            schema_editor.execute(sql)
+        forget_search_index(schema_editor.connection.alias)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blood_requests', '0007_bloodrequest_open_group_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(run(0), run(1)),
+    ]
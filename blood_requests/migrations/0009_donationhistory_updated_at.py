@@ -0,0 +1,27 @@
+# Generated by Django 4.2.25 on 2026-10-19 19:05
+
+from django.db import migrations, models
+from django.db.models import F
+import django.utils.timezone
+
+
+def copy_accepted_at(apps, schema_editor):
+    DonationHistory = apps.get_model('blood_requests', 'DonationHistory')
+    DonationHistory.objects.update(updated_at=F('accepted_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blood_requests', '0008_bloodrequest_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='donationhistory',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(copy_accepted_at, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
 from django.utils import timezone
 
@@ -17,6 +17,9 @@ class BloodRequest(models.Model):
         ('cancelled', 'Cancelled')
     ]
 
+    # What an expired request is closed as, by mark_expired() and the expiry sweep
+    EXPIRED_STATUS = 'cancelled'
+
     URGENCY_CHOICES = [
         ('low', 'Low'),
         ('medium', 'Medium'),
@@ -36,26 +39,44 @@ class BloodRequest(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     urgency = models.CharField(max_length=10, choices=URGENCY_CHOICES, default='medium')
     created_at = models.DateTimeField(auto_now_add=True)
+    # Bumped by save(); queryset.update() callers must set it themselves
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     is_active = models.BooleanField(default=True)
     expires_at = models.DateTimeField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            # Open requests by blood group for the compatible-request feed (compatibility.py)
+            models.Index(
+                fields=['blood_group', 'urgency'],
+                condition=models.Q(is_active=True, status='pending'),
+                name='request_open_group_idx',
+            ),
+        ]
+
     def __str__(self):
         return f"Request by {self.requester.email} for {self.blood_group} ({self.quantity} units)"
 
     def mark_expired(self):
         """Check if the request has expired and deactivate it."""
         if self.expires_at and timezone.now() >= self.expires_at:
-            self.is_active = False
-            self.status = 'cancelled'
-            self.save()
+            with transaction.atomic():
+                event = BloodRequestEvent.for_request(self, BloodRequestEvent.EXPIRED, to_status=self.EXPIRED_STATUS)
+                self.is_active = False
+                self.status = self.EXPIRED_STATUS
+                self.save()
+                event.save()
 
     def update_status(self, new_status):
         """Update the status of the request."""
         if new_status in dict(self.STATUS_CHOICES).keys():
-            self.status = new_status
-            if new_status in ['completed', 'cancelled']:
-                self.is_active = False
-            self.save()
+            with transaction.atomic():
+                event = BloodRequestEvent.for_request(self, new_status, to_status=new_status)
+                self.status = new_status
+                if new_status in ['completed', 'cancelled']:
+                    self.is_active = False
+                self.save()
+                event.save()
 
 
 class DonationHistory(models.Model):
@@ -77,7 +98,121 @@ class DonationHistory(models.Model):
         related_name='donations'
     )
     accepted_at = models.DateTimeField(auto_now_add=True)
+    # Bumped by save(); queryset.update() callers must set it themselves
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='accepted')
 
     def __str__(self):
         return f"{self.donor.email} donation for request {self.blood_request.id} ({self.status})"
+
+
+class DispatchState(models.Model):
+    """Progress of the wave-based donor notification for one request (see dispatch.py)."""
+    blood_request = models.OneToOneField(
+        BloodRequest,
+        on_delete=models.CASCADE,
+        related_name='dispatch'
+    )
+    wave = models.PositiveSmallIntegerField(default=0, help_text="Waves sent so far")
+    notified_count = models.PositiveIntegerField(default=0)
+    next_wave_at = models.DateTimeField(null=True, blank=True)
+    finished = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['finished', 'next_wave_at'], name='dispatch_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"Dispatch for request {self.blood_request_id} (wave {self.wave})"
+
+
+class BloodRequestEvent(models.Model):
+    """
+    Append-only history of blood request transitions (see events.py). Rows
+    are written in the transaction that changes the request and never
+    updated; they outlive the request, so the reference isn't a constraint.
+    """
+    CREATED = 'created'
+    EXPIRED = 'expired'
+    KIND_CHOICES = [
+        (CREATED, 'Created'),
+        ('pending', 'Reopened'),
+        ('accepted', 'Accepted'),
+        ('completed', 'Completed'),
+        ('cancelled', 'Cancelled'),
+        (EXPIRED, 'Expired'),
+    ]
+
+    blood_request = models.ForeignKey(
+        BloodRequest,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='events'
+    )
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    from_status = models.CharField(max_length=20, blank=True)
+    to_status = models.CharField(max_length=20)
+    # Copied from the request so analytics never join back to it
+    blood_group = models.CharField(max_length=3, choices=BloodRequest.BLOOD_GROUP_CHOICES)
+    actor = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at'], name='event_created_idx'),
+            models.Index(fields=['blood_request', 'id'], name='event_request_idx'),
+        ]
+
+    def __str__(self):
+        return f"Request {self.blood_request_id} {self.kind} ({self.from_status or '-'} -> {self.to_status})"
+
+    @classmethod
+    def for_request(cls, blood_request, kind, to_status=None, from_status=None, actor=None):
+        """
+        An unsaved event for ``blood_request``. Call it before changing the
+        request: ``from_status`` defaults to its status at that point.
+        """
+        return cls(
+            blood_request_id=blood_request.pk,
+            kind=kind,
+            from_status=blood_request.status if from_status is None else from_status,
+            to_status=to_status or blood_request.status,
+            blood_group=blood_request.blood_group,
+            actor=actor,
+        )
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Blood request events are append-only.")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError("Blood request events are append-only.")
+
+
+class BloodRequestDailyStats(models.Model):
+    """Per-day, per-blood-group transition counts, rebuilt from the event log by events.rebuild_daily_stats."""
+    day = models.DateField()
+    blood_group = models.CharField(max_length=3, choices=BloodRequest.BLOOD_GROUP_CHOICES)
+    created = models.PositiveIntegerField(default=0)
+    accepted = models.PositiveIntegerField(default=0)
+    completed = models.PositiveIntegerField(default=0)
+    cancelled = models.PositiveIntegerField(default=0)
+    expired = models.PositiveIntegerField(default=0)
+    reopened = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'blood_group'], name='dailystats_day_group_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.blood_group}"
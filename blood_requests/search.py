@@ -0,0 +1,138 @@
+import re
+
+from django.db import connection, connections, models
+from django.db.models import Case, F, Value, When
+from django.db.models.expressions import RawSQL
+from rest_framework import filters
+
+from .models import BloodRequest
+
+# Relevance is multiplied by this factor so urgent requests float to the top
+# when several requests match the search equally well.
+URGENCY_BOOST = {
+    'high': 1.5,
+    'medium': 1.2,
+    'low': 1.0,
+}
+
+TABLE = BloodRequest._meta.db_table
+FTS_TABLE = f'{TABLE}_fts'
+PG_COLUMN = 'search_vector'
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+# -------------------------
+# Index
+# -------------------------
+# The index is installed by migration 0008_bloodrequest_search_index:
+# PostgreSQL gets a generated tsvector column with a GIN index, SQLite an
+# external-content FTS5 table kept in sync by triggers. SQLite drops a
+# table's triggers whenever Django rebuilds it, so a later migration that
+# rebuilds this table on SQLite has to create the triggers again.
+SQLITE_TRIGGERS = (f'{FTS_TABLE}_ai', f'{FTS_TABLE}_ad', f'{FTS_TABLE}_au')
+
+# Aliases known to have the index. Only found indexes are remembered, so a
+# process that looked before the migration ran picks the index up once it
+# exists; the migration forgets it when it drops the index.
+_available = set()
+
+
+def forget_search_index(alias):
+    _available.discard(alias)
+
+
+def _index_exists(conn):
+    if conn.vendor == 'postgresql':
+        with conn.cursor() as cursor:
+            columns = [col.name for col in conn.introspection.get_table_description(cursor, TABLE)]
+        return PG_COLUMN in columns
+    if conn.vendor == 'sqlite':
+        # Without its triggers the FTS table goes stale, so don't use it
+        with conn.cursor() as cursor:
+            cursor.execute(
+                "SELECT count(*) FROM sqlite_master "
+                "WHERE type = 'trigger' AND tbl_name = %s AND name IN (%s, %s, %s)",
+                [TABLE, *SQLITE_TRIGGERS],
+            )
+            triggers = cursor.fetchone()[0]
+        return FTS_TABLE in conn.introspection.table_names() and triggers == len(SQLITE_TRIGGERS)
+    return False
+
+
+def search_index_available(conn=connection):
+    """Whether the vendor-specific index exists (and is being kept in sync) on this connection."""
+    if conn.alias not in _available and _index_exists(conn):
+        _available.add(conn.alias)
+    return conn.alias in _available
+
+
+# -------------------------
+# Querying
+# -------------------------
+def tokenize(text):
+    return _TOKEN_RE.findall((text or '').lower())
+
+
+def search_blood_requests(queryset, text):
+    """
+    Filter ``queryset`` down to requests matching every word of ``text``
+    (prefix match) and order them by relevance boosted by urgency.
+    Returns None when the index cannot be used so callers can fall back.
+    Runs on the queryset's database.
+    """
+    conn = connections[queryset.db]
+    tokens = tokenize(text)
+    if not tokens or not search_index_available(conn):
+        return None
+
+    if conn.vendor == 'postgresql':
+        query = ' & '.join(f'{token}:*' for token in tokens)
+        matches = RawSQL(
+            f"{TABLE}.{PG_COLUMN} @@ to_tsquery('simple', %s)",
+            [query], output_field=models.BooleanField(),
+        )
+        rank = RawSQL(
+            f"ts_rank({TABLE}.{PG_COLUMN}, to_tsquery('simple', %s))",
+            [query], output_field=models.FloatField(),
+        )
+    else:
+        query = ' '.join(f'"{token}"*' for token in tokens)
+        matches = RawSQL(
+            f"{TABLE}.id IN (SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s)",
+            [query], output_field=models.BooleanField(),
+        )
+        # bm25() is lower-is-better; negate it so both backends sort descending
+        rank = RawSQL(
+            f"(SELECT -bm25({FTS_TABLE}, 2.0, 1.0) FROM {FTS_TABLE} "
+            f"WHERE {FTS_TABLE} MATCH %s AND rowid = {TABLE}.id)",
+            [query], output_field=models.FloatField(),
+        )
+
+    urgency_boost = Case(
+        *[When(urgency=level, then=Value(boost)) for level, boost in URGENCY_BOOST.items()],
+        default=Value(1.0),
+        output_field=models.FloatField(),
+    )
+    return (
+        queryset.filter(matches)
+        .annotate(search_rank=rank)
+        .annotate(search_score=F('search_rank') * urgency_boost)
+        .order_by('-search_score', '-created_at')
+    )
+
+
+class FullTextSearchFilter(filters.SearchFilter):
+    """
+    Drop-in replacement for SearchFilter on BloodRequest querysets that uses
+    the full-text index. Falls back to the plain icontains search when the
+    index is not installed on the current database.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        if not self.get_search_fields(view, request):
+            return queryset
+        text = ' '.join(self.get_search_terms(request))
+        results = search_blood_requests(queryset, text)
+        if results is None:
+            return super().filter_queryset(request, queryset, view)
+        return results
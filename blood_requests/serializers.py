@@ -1,13 +1,17 @@
 from rest_framework import serializers
-from .models import BloodRequest, DonationHistory
+from .events import EventBuffer
+from .models import BloodRequest, BloodRequestEvent, DonationHistory
 from django.utils import timezone
+from django.conf import settings
 from accounts.models import User
+from hemogrid.fieldsets import SparseFieldsetMixin
+from sync.log import record_blood_requests
 
 
 # -------------------------
 # Blood Request Serializer
 # -------------------------
-class BloodRequestSerializer(serializers.ModelSerializer):
+class BloodRequestSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     requester_email = serializers.ReadOnlyField(source='requester.email')
     is_expired = serializers.SerializerMethodField()
 
@@ -15,9 +19,37 @@ class BloodRequestSerializer(serializers.ModelSerializer):
         model = BloodRequest
         fields = '__all__'
         read_only_fields = ['requester', 'created_at', 'is_active']
+        method_field_sources = {'is_expired': ['expires_at']}
 
     def get_is_expired(self, obj):
         return obj.expires_at and obj.expires_at < timezone.now()
+
+
+# -------------------------
+# Bulk Create (hospitals)
+# -------------------------
+class BloodRequestBulkCreateSerializer(serializers.Serializer):
+    requests = BloodRequestSerializer(many=True, allow_empty=False)
+
+    def validate_requests(self, value):
+        limit = getattr(settings, 'BLOOD_REQUEST_BULK_MAX', 100)
+        if len(value) > limit:
+            raise serializers.ValidationError(f"At most {limit} requests per batch.")
+        return value
+
+    def create(self, validated_data):
+        requester = validated_data['requester']
+        blood_requests = BloodRequest.objects.bulk_create([
+            BloodRequest(requester=requester, **item) for item in validated_data['requests']
+        ])
+        # bulk_create skips post_save
+        record_blood_requests(blood_requests)
+        with EventBuffer() as events:
+            for blood_request in blood_requests:
+                events.add(blood_request, BloodRequestEvent.CREATED, from_status='', actor=requester)
+        return blood_requests
+
+
 # -------------------------
 # Blood Request Status Update Serializer
 # -------------------------
@@ -34,7 +66,7 @@ class BloodRequestStatusSerializer(serializers.ModelSerializer):
 # -------------------------
 # Donation History Serializer
 # -------------------------
-class DonationHistorySerializer(serializers.ModelSerializer):
+class DonationHistorySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     donor_email = serializers.ReadOnlyField(source='donor.email')
     blood_request_detail = BloodRequestSerializer(source='blood_request', read_only=True)
 
@@ -46,7 +78,7 @@ class DonationHistorySerializer(serializers.ModelSerializer):
 # -------------------------
 # Admin view of blood requests
 # -------------------------
-class AdminBloodRequestSerializer(serializers.ModelSerializer):
+class AdminBloodRequestSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     requester_email = serializers.ReadOnlyField(source='requester.email')
 
     class Meta:
@@ -1,3 +1,576 @@
-from django.test import TestCase
+import io
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from django.utils.http import http_date
+
+from notifications.models import Notification
+from . import compatibility
+from .dispatch import run_due_waves
+from .expiry import expire_requests
+from .models import BloodRequest, BloodRequestDailyStats, BloodRequestEvent, DispatchState, DonationHistory
+from .search import forget_search_index, search_index_available
+from .views import BloodRequestListView, MyRequestsView
+
+User = get_user_model()
+
+
+def create_user(email, **extra):
+    extra.setdefault("is_active", True)
+    extra.setdefault("is_verified", True)
+    return User.objects.create_user(email=email, password="StrongPass!234", **extra)
+
+
+def create_request(requester, **extra):
+    data = {
+        "blood_group": "O+",
+        "quantity": 1,
+        "location": "Dhaka Medical College",
+        "contact_info": "01700000000",
+        "details": "",
+        "urgency": "medium",
+    }
+    data.update(extra)
+    return BloodRequest.objects.create(requester=requester, **data)
+
+
+class BloodRequestSearchTests(APITestCase):
+    def setUp(self):
+        self.requester = create_user("requester@example.com")
+        self.viewer = create_user("viewer@example.com")
+        self.client.force_authenticate(self.viewer)
+
+    def search(self, term):
+        response = self.client.get(reverse("blood-request-list"), {"search": term})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [row["id"] for row in response.data["results"]]
+
+    def test_search_matches_location_and_details_by_prefix(self):
+        chittagong = create_request(self.requester, location="Chittagong General Hospital")
+        surgery = create_request(self.requester, location="Sylhet", details="Needed for cardiac surgery")
+        create_request(self.requester, location="Khulna")
+
+        self.assertTrue(search_index_available())
+        self.assertEqual(self.search("chitta"), [chittagong.id])
+        self.assertEqual(self.search("cardiac surg"), [surgery.id])
+        self.assertEqual(self.search("rajshahi"), [])
+
+    def test_index_follows_updates_and_deletes(self):
+        blood_request = create_request(self.requester, location="Barisal")
+        blood_request.location = "Rangpur"
+        blood_request.save()
+
+        self.assertEqual(self.search("barisal"), [])
+        self.assertEqual(self.search("rangpur"), [blood_request.id])
+
+        blood_request.delete()
+        self.assertEqual(self.search("rangpur"), [])
+
+    def test_urgency_boosts_equally_relevant_matches(self):
+        low = create_request(self.requester, location="Comilla", urgency="low")
+        high = create_request(self.requester, location="Comilla", urgency="high")
+        medium = create_request(self.requester, location="Comilla", urgency="medium")
+
+        self.assertEqual(self.search("comilla"), [high.id, medium.id, low.id])
+
+    def test_missing_index_is_checked_again(self):
+        chittagong = create_request(self.requester, location="Chittagong General Hospital")
+
+        class Rollback(Exception):
+            pass
+
+        # As seen by a process that looked before the migration ran
+        with self.assertRaises(Rollback), transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute("DROP TRIGGER blood_requests_bloodrequest_fts_au")
+            forget_search_index(connection.alias)
+            self.assertFalse(search_index_available())
+            self.assertEqual(self.search("Chittagong"), [chittagong.id])
+            raise Rollback
+
+        self.assertTrue(search_index_available())
+        self.assertEqual(self.search("chitta"), [chittagong.id])
+
+
+class BloodRequestBulkCreateTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.hospital = create_user("hospital@example.com", role="hospital")
+        self.o_pos = [create_user(f"opos{i}@example.com", blood_group="O+", availability_status="available") for i in range(3)]
+        self.a_neg = create_user("aneg@example.com", blood_group="A-", availability_status="available")
+        create_user("busy@example.com", blood_group="O+", availability_status="busy")
+        create_user("unverified@example.com", blood_group="O+", availability_status="available", is_verified=False)
+        self.client.force_authenticate(self.hospital)
+
+    def payload(self, *groups):
+        return {"requests": [
+            {"blood_group": group, "quantity": 1, "location": "Square Hospital", "contact_info": "01700000000"}
+            for group in groups
+        ]}
+
+    def test_bulk_create_sends_first_wave_for_every_request(self):
+        url = reverse("blood-request-bulk-create")
+        # Events, stock and donors are each looked up or inserted once for the
+        # whole batch, however many requests it has
+        with self.assertNumQueries(9):
+            response = self.client.post(url, self.payload("O+", "O+", "A-", "B+"), format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["created"], 4)
+        # Each O+ request is a different patient, so its donors hear about both
+        self.assertEqual(response.data["notified"], 7)
+        self.assertEqual(BloodRequest.objects.filter(requester=self.hospital).count(), 4)
+        self.assertEqual(Notification.objects.filter(recipient=self.o_pos[0]).count(), 2)
+        self.assertEqual(Notification.objects.filter(recipient=self.a_neg).count(), 1)
+        self.assertTrue(all(item["id"] for item in response.data["requests"]))
+
+    def test_invalid_item_rejects_whole_batch(self):
+        payload = self.payload("O+", "Z+")
+        response = self.client.post(reverse("blood-request-bulk-create"), payload, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("blood_group", response.data["requests"][1])
+        self.assertFalse(BloodRequest.objects.exists())
+
+    @override_settings(BLOOD_REQUEST_BULK_MAX=2)
+    def test_batch_size_is_limited(self):
+        response = self.client.post(reverse("blood-request-bulk-create"), self.payload("O+", "O+", "O+"), format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_only_hospitals_can_bulk_create(self):
+        self.client.force_authenticate(self.a_neg)
+        response = self.client.post(reverse("blood-request-bulk-create"), self.payload("O+"), format="json")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_single_create_notifies_matching_donors(self):
+        self.client.force_authenticate(self.a_neg)
+        response = self.client.post(reverse("blood-request-create"), self.payload("O+")["requests"][0], format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Notification.objects.count(), 3)
+
+
+@override_settings(
+    DISPATCH_WAVE_SIZES=[2, 3],
+    DISPATCH_WAVE_WINDOWS={"high": 60, "medium": 600, "low": 1800},
+    NOTIFICATION_DAILY_LIMIT=None,
+    NOTIFICATION_DEDUP_WINDOW=None,
+)
+class DispatchWaveTests(APITestCase):
+    def setUp(self):
+        self.requester = create_user("requester@example.com", role="requester")
+        today = timezone.localdate()
+        self.near = create_user("near@example.com", blood_group="B+", address="House 2, Mirpur, Dhaka",
+                                last_donation_date=today - timedelta(days=200))
+        self.never = create_user("never@example.com", blood_group="B+", address="Sylhet")
+        self.long_ago = create_user("longago@example.com", blood_group="B+", address="Khulna",
+                                    last_donation_date=today - timedelta(days=400))
+        self.recent = create_user("recent@example.com", blood_group="B+", address="Mirpur, Dhaka",
+                                  last_donation_date=today - timedelta(days=10))
+        self.others = [create_user(f"b{i}@example.com", blood_group="B+", address="Rajshahi") for i in range(3)]
+        self.client.force_authenticate(self.requester)
+
+    def create(self, urgency="medium"):
+        response = self.client.post(reverse("blood-request-create"), {
+            "blood_group": "B+", "quantity": 1, "location": "Mirpur, Dhaka",
+            "contact_info": "01700000000", "urgency": urgency,
+        }, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return BloodRequest.objects.get(pk=response.data["id"])
+
+    def notified(self, blood_request):
+        return set(Notification.objects.filter(blood_request=blood_request).values_list("recipient_id", flat=True))
+
+    def test_first_wave_prefers_nearby_then_longest_since_donation(self):
+        blood_request = self.create()
+
+        # Recently donated donors are not eligible at all
+        self.assertEqual(self.notified(blood_request), {self.near.pk, self.never.pk})
+        state = DispatchState.objects.get(blood_request=blood_request)
+        self.assertEqual((state.wave, state.finished), (1, False))
+
+    def test_waves_widen_after_window_and_urgency_shortens_it(self):
+        high = self.create("high")
+        medium = self.create("medium")
+
+        # Only the high-urgency window (60s) has closed
+        self.assertEqual(run_due_waves(now=timezone.now() + timedelta(seconds=61)), (1, 3))
+        self.assertEqual(len(self.notified(high)), 5)
+        self.assertEqual(len(self.notified(medium)), 2)
+
+        call_command("run_dispatch", "--once", stdout=io.StringIO())
+        self.assertEqual(len(self.notified(medium)), 2)
+
+        # Last wave finds one donor left for the high request; it's checked
+        # again later instead of being finished
+        processed, notified = run_due_waves(now=timezone.now() + timedelta(hours=1))
+        self.assertEqual((processed, notified), (2, 4))
+        self.assertEqual(len(self.notified(high)), 6)
+        state = DispatchState.objects.get(blood_request=high)
+        self.assertFalse(state.finished)
+        self.assertGreater(state.next_wave_at, timezone.now() + timedelta(hours=5))
+
+    def test_exhausted_dispatch_reaches_donors_eligible_later(self):
+        blood_request = self.create("high")
+        for hours in (1, 2):
+            run_due_waves(now=timezone.now() + timedelta(hours=hours))
+        self.assertEqual(len(self.notified(blood_request)), 6)
+
+        # The recent donor's deferral ends
+        User.objects.filter(pk=self.recent.pk).update(last_donation_date=timezone.localdate() - timedelta(days=100))
+        self.assertEqual(run_due_waves(now=timezone.now() + timedelta(hours=3)), (0, 0))
+        self.assertEqual(run_due_waves(now=timezone.now() + timedelta(hours=9)), (1, 1))
+        self.assertIn(self.recent.pk, self.notified(blood_request))
+
+    def test_accepted_request_stops_dispatch(self):
+        blood_request = self.create()
+        self.client.force_authenticate(self.near)
+        self.client.post(reverse("blood-request-accept", args=[blood_request.pk]))
+
+        self.assertEqual(run_due_waves(now=timezone.now() + timedelta(hours=1)), (1, 0))
+        self.assertTrue(DispatchState.objects.get(blood_request=blood_request).finished)
+        self.assertEqual(len(self.notified(blood_request)), 2)
+
+
+class ProjectedListTests(APITestCase):
+    """The .values() fast path must render exactly what BloodRequestSerializer does."""
+
+    def setUp(self):
+        self.requester = create_user("requester@example.com")
+        self.viewer = create_user("viewer@example.com")
+        now = timezone.now()
+        create_request(self.requester, details="রক্ত দরকার, O+ \u2028 urgent", urgency="high")
+        create_request(self.requester, blood_group="AB-", location="Sylhet Osmani Hospital",
+                       expires_at=now + timedelta(days=2), status="accepted")
+        create_request(self.requester, location="Khulna", quantity=3, expires_at=now - timedelta(hours=1))
+        create_request(self.viewer, location="Rajshahi")
+        for i in range(12):
+            create_request(self.requester, location=f"Dhaka Clinic {i}", details="Needed for surgery")
+
+    def assert_identical(self, view, url, params=None, queries=None):
+        if queries is None:
+            fast = self.client.get(url, params)
+        else:
+            with self.assertNumQueries(queries):
+                fast = self.client.get(url, params)
+        with mock.patch.object(view, "use_projection", False):
+            slow = self.client.get(url, params)
+        self.assertEqual(fast.status_code, status.HTTP_200_OK)
+        self.assertEqual(fast.content, slow.content)
+        return fast
+
+    def test_blood_request_list_is_byte_identical(self):
+        self.client.force_authenticate(self.viewer)
+        url = reverse("blood-request-list")
+        # ETag state, count and one SELECT with the requester joined in; the
+        # expired request is left out without being closed here
+        response = self.assert_identical(BloodRequestListView, url, queries=3)
+        self.assertEqual(response.data["count"], 14)
+        self.assert_identical(BloodRequestListView, url, {"page": 2})
+        self.assert_identical(BloodRequestListView, url, {"blood_group": "AB-", "status": "accepted"})
+        self.assert_identical(BloodRequestListView, url, {"search": "surgery", "ordering": "-created_at"})
+        self.assert_identical(BloodRequestListView, url, {"ordering": "created_at"})
+
+    def test_my_requests_is_byte_identical(self):
+        self.client.force_authenticate(self.requester)
+        first = self.assert_identical(MyRequestsView, reverse("my-requests"), queries=3)
+        self.assertEqual(first.data["count"], 15)
+        second = self.assert_identical(MyRequestsView, reverse("my-requests"), {"page": 2})
+        expired = [row["is_expired"] for row in first.data["results"] + second.data["results"]]
+        self.assertIn(True, expired)
+        self.assertIn(False, expired)
+
+
+class SparseFieldsetTests(APITestCase):
+    def setUp(self):
+        self.requester = create_user("requester@example.com")
+        self.viewer = create_user("viewer@example.com")
+        create_request(self.requester, details="Needed for surgery", expires_at=timezone.now() + timedelta(days=1))
+        create_request(self.requester, location="Khulna")
+
+    def test_fields_trims_list(self):
+        self.client.force_authenticate(self.viewer)
+        url = reverse("blood-request-list")
+        params = {"fields": "id,location,is_expired"}
+        fast = self.client.get(url, params)
+        with mock.patch.object(BloodRequestListView, "use_projection", False):
+            slow = self.client.get(url, params)
+        self.assertEqual(fast.status_code, status.HTTP_200_OK)
+        self.assertEqual([list(row) for row in fast.data["results"]], [["id", "is_expired", "location"]] * 2)
+        self.assertEqual(fast.content, slow.content)
+
+    def test_exclude(self):
+        self.client.force_authenticate(self.requester)
+        response = self.client.get(reverse("my-requests"), {"exclude": "details, contact_info"})
+        row = response.data["results"][0]
+        self.assertNotIn("details", row)
+        self.assertNotIn("contact_info", row)
+        self.assertIn("requester_email", row)
+
+    def test_unknown_field_is_rejected(self):
+        self.client.force_authenticate(self.viewer)
+        response = self.client.get(reverse("blood-request-list"), {"fields": "id,password"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("password", response.data["fields"][0])
+
+    def test_only_requested_columns_are_read(self):
+        admin = create_user("admin@example.com", is_staff=True)
+        self.client.force_authenticate(admin)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("admin-requests-list"), {"fields": "id,status,requester_email"})
+        self.assertEqual(response.data["results"][0]["requester_email"], "requester@example.com")
+        select = next(q["sql"] for q in queries.captured_queries if 'FROM "blood_requests_bloodrequest"' in q["sql"]
+                      and "COUNT" not in q["sql"])
+        self.assertIn('"status"', select)
+        self.assertNotIn('"details"', select)
+        self.assertNotIn('"contact_info"', select)
+
+    def test_writes_ignore_fields(self):
+        self.client.force_authenticate(self.viewer)
+        response = self.client.post(
+            reverse("blood-request-create") + "?fields=id",
+            {"blood_group": "A+", "quantity": 1, "location": "Dhaka", "contact_info": "017", "urgency": "low"},
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertIn("location", response.data)
+
+
+class ConditionalGetTests(APITestCase):
+    def setUp(self):
+        self.requester = create_user("requester@example.com")
+        self.viewer = create_user("viewer@example.com")
+        self.first = create_request(self.requester, expires_at=timezone.now() + timedelta(hours=1))
+        create_request(self.requester, location="Khulna")
+        self.url = reverse("blood-request-list")
+
+    def test_unchanged_list_is_not_modified(self):
+        self.client.force_authenticate(self.viewer)
+        response = self.client.get(self.url)
+        etag = response["ETag"]
+        self.assertTrue(etag.startswith('W/"'))
+        self.assertNotIn("Last-Modified", response)
+        self.assertIn("no-cache", response["Cache-Control"])
+
+        # Only the ETag state; nothing is fetched or serialized
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b"")
+        self.assertEqual(response["ETag"], etag)
+
+    def test_list_ignores_if_modified_since(self):
+        self.client.force_authenticate(self.viewer)
+        since = http_date((timezone.now() + timedelta(hours=1)).timestamp())
+        # A row leaving the list doesn't move any remaining updated_at forward
+        BloodRequest.objects.filter(location="Khulna").update(is_active=False)
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=since)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["count"], 1)
+
+    def test_etag_follows_rows_and_request(self):
+        self.client.force_authenticate(self.viewer)
+        etag = self.client.get(self.url)["ETag"]
+        self.assertEqual(self.client.get(self.url, {"page": 1}, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        self.first.urgency = "high"
+        self.first.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+        etag = response["ETag"]
+        BloodRequest.objects.filter(location="Khulna").delete()
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_expiry_changes_etag(self):
+        self.client.force_authenticate(self.requester)
+        url = reverse("my-requests")
+        etag = self.client.get(url)["ETag"]
+        later = timezone.now() + timedelta(hours=2)
+        with mock.patch("hemogrid.conditional.timezone.now", return_value=later):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class EventLogTests(APITestCase):
+    def setUp(self):
+        self.requester = create_user("requester@example.com")
+        self.donor = create_user("donor@example.com")
+        self.admin = create_user("admin@example.com", role="admin")
+
+    def events(self, blood_request):
+        return list(
+            BloodRequestEvent.objects.filter(blood_request_id=blood_request.pk)
+            .order_by("id").values_list("kind", "from_status", "to_status", "actor")
+        )
+
+    def create(self):
+        self.client.force_authenticate(self.requester)
+        response = self.client.post(reverse("blood-request-create"), {
+            "blood_group": "A+", "quantity": 1, "location": "Dhaka", "contact_info": "017",
+        }, format="json")
+        return BloodRequest.objects.get(pk=response.data["id"])
+
+    def test_transitions_are_logged(self):
+        blood_request = self.create()
+        self.client.force_authenticate(self.donor)
+        self.client.post(reverse("blood-request-accept", args=[blood_request.pk]))
+        self.client.force_authenticate(self.requester)
+        self.client.patch(reverse("blood-request-update-status", args=[blood_request.pk]), {"status": "pending"})
+        self.client.patch(reverse("blood-request-update-status", args=[blood_request.pk]), {"status": "pending"})
+        self.client.post(reverse("blood-request-cancel", args=[blood_request.pk]))
+
+        requester, donor = self.requester.pk, self.donor.pk
+        self.assertEqual(self.events(blood_request), [
+            ("created", "", "pending", requester),
+            ("accepted", "pending", "accepted", donor),
+            ("pending", "accepted", "pending", requester),
+            ("cancelled", "pending", "cancelled", requester),
+        ])
+
+        other = create_request(self.requester, expires_at=timezone.now() - timedelta(minutes=1))
+        call_command("expire_blood_requests", "--once", stdout=io.StringIO())
+        self.assertEqual(self.events(other), [("expired", "pending", "cancelled", None)])
+
+        other.refresh_from_db()
+        other.update_status("completed")
+        self.assertEqual(self.events(other)[-1], ("completed", "cancelled", "completed", None))
+
+    def test_expiry_closes_each_request_once(self):
+        now = timezone.now()
+        expired = [create_request(self.requester, expires_at=now - timedelta(minutes=i + 1)) for i in range(3)]
+        create_request(self.requester, expires_at=now + timedelta(hours=1))
+
+        self.assertEqual(expire_requests(batch_size=2), 3)
+        # A second run, or one that read the rows before the first closed them, logs nothing
+        self.assertEqual(expire_requests(), 0)
+        with mock.patch("blood_requests.expiry.BloodRequest.objects.select_for_update") as stale_read:
+            stale_read.return_value.filter.return_value.order_by.return_value.only.return_value = expired
+            self.assertEqual(expire_requests(now=now + timedelta(seconds=1)), 0)
+
+        self.assertEqual(BloodRequestEvent.objects.filter(kind=BloodRequestEvent.EXPIRED).count(), 3)
+        self.assertFalse(BloodRequest.objects.filter(pk__in=[r.pk for r in expired], is_active=True).exists())
+
+    def test_sweep_and_mark_expired_close_requests_alike(self):
+        past = timezone.now() - timedelta(minutes=1)
+        swept = create_request(self.requester, expires_at=past)
+        marked = create_request(self.requester, expires_at=past)
+        marked.mark_expired()
+        expire_requests()
+
+        rows = BloodRequest.objects.filter(pk__in=[swept.pk, marked.pk]).values_list("is_active", "status")
+        self.assertEqual(set(rows), {(False, BloodRequest.EXPIRED_STATUS)})
+        self.assertEqual(self.events(swept), self.events(marked))
+        self.assertEqual(self.events(swept)[-1], ("expired", "pending", "cancelled", None))
+
+    def test_events_are_append_only_and_outlive_requests(self):
+        blood_request = self.create()
+        event = BloodRequestEvent.objects.get(blood_request_id=blood_request.pk)
+        event.kind = "cancelled"
+        with self.assertRaises(ValueError):
+            event.save()
+        with self.assertRaises(ValueError):
+            event.delete()
+
+        blood_request.delete()
+        self.assertTrue(BloodRequestEvent.objects.filter(pk=event.pk).exists())
+
+    def test_daily_stats_are_rebuilt_from_events(self):
+        completed = self.create()
+        completed.update_status("completed")
+        self.create().update_status("cancelled")
+        BloodRequestEvent.objects.bulk_create([BloodRequestEvent(
+            blood_request_id=999, kind="created", to_status="pending", blood_group="A+",
+            created_at=timezone.now() - timedelta(days=40),
+        )])
+
+        out = io.StringIO()
+        call_command("rebuild_request_stats", "--days", "7", stdout=out)
+        self.assertIn("Wrote 1 daily stats rows", out.getvalue())
+        row = BloodRequestDailyStats.objects.get()
+        self.assertEqual((row.day, row.blood_group), (timezone.localdate(), "A+"))
+        self.assertEqual((row.created, row.completed, row.cancelled, row.accepted), (2, 1, 1, 0))
+
+        self.client.force_authenticate(self.admin)
+        url = reverse("admin-request-analytics")
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["totals"]["created"], 2)
+        self.assertEqual(len(response.data["daily"]), 1)
+        self.assertEqual(self.client.get(url, {"blood_group": "O+"}).data["totals"]["created"], 0)
+
+        call_command("rebuild_request_stats", stdout=out)
+        self.assertEqual(BloodRequestDailyStats.objects.count(), 2)
+
+
+class CompatibleFeedTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.requester = create_user("requester@example.com")
+        self.donor = create_user("donor@example.com", blood_group="O+", address="House 2, Mirpur, Dhaka")
+        self.neighbour = create_user("neighbour@example.com", blood_group="O+", address="Gulshan, Dhaka")
+        self.url = reverse("blood-request-compatible")
+
+    def feed(self, user):
+        self.client.force_authenticate(user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [row["id"] for row in response.data["results"]]
+
+    def test_only_compatible_open_requests_ranked(self):
+        now = timezone.now()
+        far_high = create_request(self.requester, blood_group="AB+", location="Sylhet", urgency="high")
+        near_high = create_request(self.requester, blood_group="A+", location="Square Hospital, Dhaka", urgency="high")
+        soon = create_request(self.requester, location="Khulna", expires_at=now + timedelta(hours=1))
+        later = create_request(self.requester, location="Khulna", expires_at=now + timedelta(days=1))
+        no_expiry = create_request(self.requester, location="Khulna")
+        create_request(self.requester, blood_group="O-", location="Dhaka")
+        create_request(self.requester, location="Dhaka", status="accepted")
+        create_request(self.requester, location="Dhaka", expires_at=now - timedelta(minutes=1))
+        create_request(self.donor, location="Dhaka")
+
+        self.assertEqual(self.feed(self.donor), [near_high.pk, far_high.pk, soon.pk, later.pk, no_expiry.pk])
+
+    def test_bucket_is_shared_and_accepted_requests_are_anti_joined(self):
+        first = create_request(self.requester, location="Dhaka")
+        second = create_request(self.requester, location="Dhaka")
+        DonationHistory.objects.create(donor=self.neighbour, blood_request=second)
+
+        self.assertEqual(self.feed(self.donor), [second.pk, first.pk])
+        # Same (blood group, region) bucket: only the per-donor query runs
+        self.client.force_authenticate(self.neighbour)
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertEqual([row["id"] for row in response.data["results"]], [first.pk])
+
+        # A request closed since the bucket was cached drops out at once
+        first.update_status("cancelled")
+        self.assertEqual(self.feed(self.donor), [second.pk])
+
+    def test_new_request_invalidates_compatible_buckets(self):
+        first = create_request(self.requester, location="Dhaka")
+        self.assertEqual(self.feed(self.donor), [first.pk])
+
+        self.client.force_authenticate(self.requester)
+        payload = {"blood_group": "A+", "quantity": 1, "location": "Dhaka", "contact_info": "017", "urgency": "high"}
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse("blood-request-create"), payload, format="json")
+        # O+ donors can serve A+, so their cached bucket is dropped at once
+        self.assertEqual(self.feed(self.donor), [response.data["id"], first.pk])
+        self.assertEqual(cache.get(compatibility.version_key("O+")), 1)
+        # A+ can't be served by B- donors; theirs is kept
+        self.assertIsNone(cache.get(compatibility.version_key("B-")))
+
+    def test_donor_without_blood_group_sees_nothing(self):
+        create_request(self.requester)
+        self.assertEqual(self.feed(create_user("unknown@example.com")), [])
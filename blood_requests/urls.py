@@ -1,7 +1,9 @@
 from django.urls import path
 from .views import (
     BloodRequestCreateView,
+    BloodRequestBulkCreateView,
     BloodRequestListView,
+    CompatibleRequestListView,
     AcceptBloodRequestView,
     UserDonationHistoryView,
     MyRequestsView, 
@@ -18,9 +20,15 @@ urlpatterns = [
     # List all active blood requests (excluding own)
     path('', BloodRequestListView.as_view(), name='blood-request-list'),
 
+    # Active requests the donor's blood group can serve
+    path('compatible/', CompatibleRequestListView.as_view(), name='blood-request-compatible'),
+
     # Create a new blood request
     path('create/', BloodRequestCreateView.as_view(), name='blood-request-create'),
 
+    # Hospitals: create many requests in one call
+    path('bulk-create/', BloodRequestBulkCreateView.as_view(), name='blood-request-bulk-create'),
+
     # Accept a blood request
     path('<int:pk>/accept/', AcceptBloodRequestView.as_view(), name='blood-request-accept'),
 
@@ -3,17 +3,29 @@ from rest_framework import generics, permissions, status, filters
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from django.utils import timezone
-from django.db.models import Count
-from .models import BloodRequest, DonationHistory
+from django.db import transaction
+from django.db.models import Q
+from .models import BloodRequest, BloodRequestEvent, DonationHistory
+from .compatibility import compatible_requests, invalidate_buckets
+from .dispatch import start_dispatch
+from .events import record as record_event
+from .search import FullTextSearchFilter
 from .serializers import (
     BloodRequestSerializer,
     DonationHistorySerializer,
     BloodRequestStatusSerializer,
     AdminBloodRequestSerializer,
-    AcceptBloodRequestSerializer
+    AcceptBloodRequestSerializer,
+    BloodRequestBulkCreateSerializer
 )
+from accounts.availability import complete_donations
+from accounts.counters import record_acceptance
 from accounts.models import User
-from notifications.models import Notification
+from accounts.permissions import IsRole
+from hemogrid.conditional import ConditionalListMixin
+from hemogrid.fieldsets import SparseQuerysetMixin
+from hemogrid.projection import ProjectedListMixin
+from inventory.stock import allocate, fulfil_for_requests, release_for_requests
 from django_filters.rest_framework import DjangoFilterBackend
 from django.core.mail import send_mail
 from django.conf import settings
@@ -42,38 +54,74 @@ class BloodRequestCreateView(generics.CreateAPIView):
             user.availability_status = 'available'
             user.save()
 
-        blood_request = serializer.save(requester=user)
+        with transaction.atomic():
+            blood_request = serializer.save(requester=user)
+            record_event(blood_request, BloodRequestEvent.CREATED, from_status='', actor=user)
+            invalidate_buckets([blood_request])
+
+        # Units held by the requester or a nearby hospital come first; only
+        # requests they can't cover go out to donors
+        allocate([blood_request])
+        # Notify the first wave of nearby donors; run_dispatch widens it later
+        start_dispatch([blood_request])
+
+
+class BloodRequestBulkCreateView(generics.GenericAPIView):
+    """
+    Hospitals post up to BLOOD_REQUEST_BULK_MAX requests at once:
+    {"requests": [{...}, ...]}. The batch is all-or-nothing and the first
+    dispatch wave for all of them is inserted in one pass.
+    """
+    serializer_class = BloodRequestBulkCreateSerializer
+    permission_classes = [IsRole.with_roles('hospital')]
+
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            blood_requests = serializer.save(requester=request.user)
+            invalidate_buckets(blood_requests)
+            reserved = allocate(blood_requests)
+            notified = start_dispatch(blood_requests)
 
-        # Trigger notification to nearby donors
-        nearby_donors = User.objects.filter(
-            role='donor',
-            is_verified=True,
-            availability_status=True,
-            blood_group=blood_request.blood_group
-        )
-        for donor in nearby_donors:
-            Notification.objects.create(
-                user=donor,
-                message=f"New blood request for {blood_request.blood_group} near you!"
-            )
+        return Response({
+            "created": len(blood_requests),
+            "reserved_from_stock": len(reserved),
+            "notified": notified,
+            "requests": BloodRequestSerializer(blood_requests, many=True, context=self.get_serializer_context()).data,
+        }, status=status.HTTP_201_CREATED)
 
 
-class BloodRequestListView(generics.ListAPIView):
+class BloodRequestListView(ConditionalListMixin, ProjectedListMixin, SparseQuerysetMixin, generics.ListAPIView):
     serializer_class = BloodRequestSerializer
     permission_classes = [permissions.IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter, filters.OrderingFilter]
     filterset_fields = ['blood_group', 'urgency', 'status']
+    # Served by the full-text index (see search.py); ranked by relevance and urgency
     search_fields = ['location', 'details']
     ordering_fields = ['created_at']
+    expiry_field = 'expires_at'
+
+    def get_queryset(self):
+        if getattr(self, 'swagger_fake_view', False):
+            return BloodRequest.objects.none()
+        # Expired requests are closed by the expire_blood_requests command;
+        # until it gets to them they're left out here
+        return (
+            BloodRequest.objects.filter(Q(expires_at__isnull=True) | Q(expires_at__gte=timezone.now()), is_active=True)
+            .exclude(requester=self.request.user)
+        )
+
+class CompatibleRequestListView(generics.ListAPIView):
+    """Open requests the donor's blood group can serve, best first (see compatibility.py)."""
+    serializer_class = BloodRequestSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    filter_backends = []
 
     def get_queryset(self):
-        # Avoid DB side effects during schema generation
         if getattr(self, 'swagger_fake_view', False):
             return BloodRequest.objects.none()
-        now = timezone.now()
-        # Auto-close expired requests
-        BloodRequest.objects.filter(expires_at__lt=now, is_active=True).update(is_active=False)
-        return BloodRequest.objects.filter(is_active=True).exclude(requester=self.request.user)
+        return compatible_requests(self.request.user)
 
 class AcceptBloodRequestView(generics.GenericAPIView):
     queryset = BloodRequest.objects.all()
@@ -90,12 +138,15 @@ class AcceptBloodRequestView(generics.GenericAPIView):
         if DonationHistory.objects.filter(donor=request.user, blood_request=blood_request).exists():
             return Response({"detail": "You have already accepted this request."}, status=status.HTTP_409_CONFLICT)
 
-        DonationHistory.objects.create(donor=request.user, blood_request=blood_request)
+        with transaction.atomic():
+            DonationHistory.objects.create(donor=request.user, blood_request=blood_request)
+            record_acceptance(request.user.pk)
+            record_event(blood_request, 'accepted', to_status='accepted', actor=request.user)
 
-        # Optionally mark request as inactive if fully accepted
-        blood_request.is_active = False
-        blood_request.status = 'accepted'
-        blood_request.save()
+            # Optionally mark request as inactive if fully accepted
+            blood_request.is_active = False
+            blood_request.status = 'accepted'
+            blood_request.save()
 
         # Phase 1 communication: notify donor and requester via email
         try:
@@ -146,6 +197,19 @@ class UpdateBloodRequestStatusView(generics.UpdateAPIView):
     def get_object(self):
         return get_object_or_404(BloodRequest, pk=self.kwargs['pk'], requester=self.request.user)
 
+    def perform_update(self, serializer):
+        new_status = serializer.validated_data.get('status', serializer.instance.status)
+        with transaction.atomic():
+            if new_status != serializer.instance.status:
+                record_event(serializer.instance, new_status, to_status=new_status, actor=self.request.user)
+            blood_request = serializer.save()
+        # Keep units reserved from hospital stock in step with the request
+        if blood_request.status == 'cancelled':
+            release_for_requests([blood_request.pk])
+        elif blood_request.status == 'completed':
+            fulfil_for_requests([blood_request.pk])
+            complete_donations([blood_request.pk])
+
 
 class CompleteBloodRequestView(generics.GenericAPIView):
     queryset = BloodRequest.objects.all()
@@ -164,9 +228,15 @@ class CompleteBloodRequestView(generics.GenericAPIView):
         if blood_request.status != 'accepted':
             return Response({"detail": "Request must be accepted before completion."}, status=status.HTTP_400_BAD_REQUEST)
         
-        blood_request.status = 'completed'
-        blood_request.is_active = False
-        blood_request.save()
+        with transaction.atomic():
+            record_event(blood_request, 'completed', to_status='completed', actor=request.user)
+            blood_request.status = 'completed'
+            blood_request.is_active = False
+            blood_request.save()
+        # Units reserved from hospital stock have been used; donors who gave
+        # are deferred until they may donate again
+        fulfil_for_requests([blood_request.pk])
+        complete_donations([blood_request.pk])
         
         return Response({"detail": "Request completed successfully."}, status=status.HTTP_200_OK)
 
@@ -188,13 +258,16 @@ class CancelBloodRequestView(generics.GenericAPIView):
         if blood_request.status in ['completed', 'cancelled']:
             return Response({"detail": "Request is already completed or cancelled."}, status=status.HTTP_400_BAD_REQUEST)
         
-        blood_request.status = 'cancelled'
-        blood_request.is_active = False
-        blood_request.save()
+        with transaction.atomic():
+            record_event(blood_request, 'cancelled', to_status='cancelled', actor=request.user)
+            blood_request.status = 'cancelled'
+            blood_request.is_active = False
+            blood_request.save()
+        release_for_requests([blood_request.pk])
         
         return Response({"detail": "Request cancelled successfully."}, status=status.HTTP_200_OK)
 
-class UserDonationHistoryView(generics.ListAPIView):
+class UserDonationHistoryView(SparseQuerysetMixin, generics.ListAPIView):
     serializer_class = DonationHistorySerializer
     permission_classes = [permissions.IsAuthenticated]
 
@@ -203,18 +276,20 @@ class UserDonationHistoryView(generics.ListAPIView):
             return DonationHistory.objects.none()
         return DonationHistory.objects.filter(donor=self.request.user)
 
-class MyRequestsView(generics.ListAPIView):
+class MyRequestsView(ConditionalListMixin, ProjectedListMixin, SparseQuerysetMixin, generics.ListAPIView):
     serializer_class = BloodRequestSerializer
     permission_classes = [permissions.IsAuthenticated]
+    expiry_field = 'expires_at'
 
     def get_queryset(self):
         if getattr(self, 'swagger_fake_view', False):
             return BloodRequest.objects.none()
         return BloodRequest.objects.filter(requester=self.request.user)
 
-class DonationHistoryView(generics.ListAPIView):
+class DonationHistoryView(ConditionalListMixin, SparseQuerysetMixin, generics.ListAPIView):
     serializer_class = BloodRequestSerializer
     permission_classes = [permissions.IsAuthenticated]
+    expiry_field = 'expires_at'
 
     def get_queryset(self):
         if getattr(self, 'swagger_fake_view', False):
@@ -224,7 +299,7 @@ class DonationHistoryView(generics.ListAPIView):
 # -------------------------
 # Admin Endpoints
 # -------------------------
-class AdminBloodRequestListView(generics.ListAPIView):
+class AdminBloodRequestListView(ConditionalListMixin, SparseQuerysetMixin, generics.ListAPIView):
     queryset = BloodRequest.objects.all().order_by('-created_at')
     serializer_class = AdminBloodRequestSerializer
     permission_classes = [IsAdminUser]
@@ -237,19 +312,21 @@ class AdminStatsView(APIView):
         total_users = User.objects.count()
         total_requests = BloodRequest.objects.count()
         fulfilled_requests = BloodRequest.objects.filter(status='completed').count()
-        active_donors = DonationHistory.objects.values('donor').distinct().count()
+        active_donors = User.objects.filter(accepted_count__gt=0).count()
 
-        # Most active donors
-        most_active_donors = User.objects.filter(donationhistory__isnull=False) \
-            .annotate(donation_count=Count('donationhistory')) \
-            .order_by('-donation_count')[:5] \
-            .values('id', 'email', 'donation_count')
+        # Most active donors, by requests accepted (denormalized, see accounts.counters)
+        most_active_donors = [
+            {'id': pk, 'email': email, 'donation_count': accepted}
+            for pk, email, accepted in User.objects.filter(accepted_count__gt=0)
+            .order_by('-accepted_count', 'id')
+            .values_list('id', 'email', 'accepted_count')[:5]
+        ]
 
         stats = {
             'total_users': total_users,
             'total_requests': total_requests,
             'fulfilled_requests': fulfilled_requests,
             'active_donors': active_donors,
-            'most_active_donors': list(most_active_donors),
+            'most_active_donors': most_active_donors,
         }
         return Response(stats)
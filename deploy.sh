@@ -34,8 +34,23 @@ else:
     print('Admin user already exists!')
 "
 
+# Schedule background jobs (expiry sweep, dispatch waves, deferral release,
+# payment reconciliation, digests, change-log pruning)
+echo "⏱️ Scheduling background jobs..."
+if command -v systemctl >/dev/null 2>&1 && [ -w /etc/systemd/system ] && [ -d /etc/cron.d ]; then
+    cp hemogrid-worker@.service /etc/systemd/system/
+    systemctl daemon-reload
+    for job in expire_blood_requests run_dispatch release_deferred_donors; do
+        systemctl enable --now "hemogrid-worker@${job}"
+    done
+    cp hemogrid.cron /etc/cron.d/hemogrid
+else
+    echo "⚠️ Not root or no systemd: install hemogrid-worker@.service and hemogrid.cron by hand,"
+    echo "   otherwise expired requests are never closed and dispatch waves never go out."
+fi
+
 # Start Gunicorn server
 echo "🌐 Starting Gunicorn server..."
-gunicorn --config gunicorn.conf.py hemogrid.wsgi:application
+gunicorn --config gunicorn.conf.py
 
 echo "✅ Deployment completed successfully!"
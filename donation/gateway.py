@@ -0,0 +1,121 @@
+"""
+Payment gateway clients.
+
+SSLCommerzGateway talks to SSLCommerz over one pooled keep-alive
+requests.Session with connect/read timeouts, instead of opening a new
+connection per call. StubGateway answers locally and is what tests and
+offline development use (PAYMENT_GATEWAY_BACKEND).
+"""
+import threading
+from functools import lru_cache
+
+import requests
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class GatewayError(Exception):
+    pass
+
+
+class SSLCommerzGateway:
+    SANDBOX_HOST = 'https://sandbox.sslcommerz.com'
+    LIVE_HOST = 'https://securepay.sslcommerz.com'
+    SESSION_PATH = '/gwprocess/v4/api.php'
+    VALIDATION_PATH = '/validator/api/validationserverAPI.php'
+    TRANSACTION_PATH = '/validator/api/merchantTransIDvalidationAPI.php'
+
+    def __init__(self):
+        self.store_id = settings.SSLCOMMERZ_STORE_ID
+        self.store_pass = settings.SSLCOMMERZ_STORE_PASS
+        self.host = self.SANDBOX_HOST if settings.SSLCOMMERZ_SANDBOX else self.LIVE_HOST
+        self.timeout = getattr(settings, 'PAYMENT_GATEWAY_TIMEOUT', (3.05, 15))
+        self.session = requests.Session()
+        # Only idempotent lookups are retried; creating a session is not
+        retry = Retry(total=2, backoff_factor=0.3, status_forcelist=(502, 503, 504), allowed_methods=('GET',))
+        self.session.mount('https://', HTTPAdapter(pool_connections=2, pool_maxsize=20, max_retries=retry))
+
+    def _request(self, method, path, **kwargs):
+        try:
+            response = self.session.request(method, self.host + path, timeout=self.timeout, **kwargs)
+            response.raise_for_status()
+            return response.json()
+        except (requests.RequestException, ValueError) as exc:
+            raise GatewayError(str(exc)) from exc
+
+    def create_session(self, post_body):
+        data = {**post_body, 'store_id': self.store_id, 'store_passwd': self.store_pass}
+        return self._request('POST', self.SESSION_PATH, data=data)
+
+    def validate(self, val_id):
+        return self._request('GET', self.VALIDATION_PATH, params={
+            'val_id': val_id, 'store_id': self.store_id, 'store_passwd': self.store_pass, 'format': 'json',
+        })
+
+    def query_transaction(self, tran_id):
+        return self._request('GET', self.TRANSACTION_PATH, params={
+            'tran_id': tran_id, 'store_id': self.store_id, 'store_passwd': self.store_pass, 'format': 'json',
+        })
+
+
+class StubGateway:
+    """
+    In-process stand-in for SSLCommerz. ``calls`` counts round trips per
+    method; ``pay()`` simulates the donor completing (or failing) a payment.
+    """
+
+    BASE_URL = 'https://gateway.invalid'
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.sessions = {}
+        self.payments = {}
+
+    def _count(self, name):
+        with self.lock:
+            self.calls[name] = self.calls.get(name, 0) + 1
+
+    def create_session(self, post_body):
+        self._count('create_session')
+        tran_id = post_body['tran_id']
+        with self.lock:
+            self.sessions[tran_id] = post_body
+        return {
+            'status': 'SUCCESS',
+            'sessionkey': f'stub-{tran_id}',
+            'GatewayPageURL': f'{self.BASE_URL}/pay/{tran_id}/',
+        }
+
+    def pay(self, tran_id, amount=None, status='VALID'):
+        """Record a payment for a session; returns its val_id."""
+        val_id = f'val-{tran_id}'
+        with self.lock:
+            amount = amount if amount is not None else self.sessions[tran_id]['total_amount']
+            self.payments[val_id] = {'status': status, 'tran_id': tran_id, 'val_id': val_id, 'amount': str(amount)}
+        return val_id
+
+    def validate(self, val_id):
+        self._count('validate')
+        payment = self.payments.get(val_id)
+        return dict(payment) if payment else {'status': 'INVALID_TRANSACTION'}
+
+    def query_transaction(self, tran_id):
+        self._count('query_transaction')
+        elements = [dict(p) for p in self.payments.values() if p['tran_id'] == tran_id]
+        return {'APIConnect': 'DONE', 'no_of_trans_found': len(elements), 'element': elements}
+
+
+@lru_cache(maxsize=None)
+def get_gateway():
+    return import_string(settings.PAYMENT_GATEWAY_BACKEND)()
+
+
+@receiver(setting_changed)
+def reset_gateway(setting, **kwargs):
+    if setting.startswith(('PAYMENT_', 'SSLCOMMERZ_')):
+        get_gateway.cache_clear()
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from donation.payments import reconcile
+
+
+class Command(BaseCommand):
+    help = 'Validate open payment sessions with the gateway and mark paid/failed/expired ones in bulk'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8, help='Concurrent gateway calls')
+        parser.add_argument('--batch-size', type=int, default=200, help='Sessions per UPDATE batch')
+
+    def handle(self, *args, **options):
+        totals = reconcile(batch_size=options['batch_size'], workers=options['workers'])
+        self.stdout.write(self.style.SUCCESS(
+            'Checked {checked}: {paid} paid, {failed} failed, {expired} expired.'.format(**totals)
+        ))
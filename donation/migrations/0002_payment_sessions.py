@@ -0,0 +1,50 @@
+# Generated by Django 4.2.25 on 2026-10-19 16:07
+
+from django.db import migrations, models
+
+
+def set_legacy_status(apps, schema_editor):
+    # Rows from before sessions were persisted: paid ones are paid, the rest never will be
+    Donation = apps.get_model('donation', 'Donation')
+    Donation.objects.filter(paid=True).update(status='paid')
+    Donation.objects.filter(paid=False).update(status='expired')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('donation', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='donation',
+            name='gateway_url',
+            field=models.URLField(blank=True, default='', max_length=500),
+        ),
+        migrations.AddField(
+            model_name='donation',
+            name='idempotency_key',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=128),
+        ),
+        migrations.AddField(
+            model_name='donation',
+            name='session_key',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+        migrations.AddField(
+            model_name='donation',
+            name='status',
+            field=models.CharField(choices=[('initiated', 'Initiated'), ('paid', 'Paid'), ('failed', 'Failed'), ('expired', 'Expired')], default='initiated', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='donation',
+            name='tran_id',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+        migrations.RunPython(set_legacy_status, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='donation',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'initiated'), models.Q(('idempotency_key', ''), _negated=True)), fields=('idempotency_key',), name='donation_live_idempotency_key'),
+        ),
+    ]
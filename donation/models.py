@@ -1,11 +1,43 @@
 from django.db import models
+from django.db.models import Q
 
 class Donation(models.Model):
+    STATUS_CHOICES = [
+        ('initiated', 'Initiated'),
+        ('paid', 'Paid'),
+        ('failed', 'Failed'),
+        ('expired', 'Expired'),
+    ]
+
     donor_name = models.CharField(max_length=255)
     donor_email = models.EmailField()
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     paid = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Payment session (see payments.py)
+    tran_id = models.CharField(max_length=64, unique=True, null=True, blank=True)
+    idempotency_key = models.CharField(max_length=128, blank=True, default='', db_index=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='initiated')
+    gateway_url = models.URLField(max_length=500, blank=True, default='')
+    session_key = models.CharField(max_length=100, blank=True, default='')
+    # Set by the IPN; reconcile_payments validates it with the gateway
+    val_id = models.CharField(max_length=100, blank=True, default='')
+    ipn_received_at = models.DateTimeField(null=True, blank=True)
+    paid_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='donation_status_created_idx'),
+        ]
+        constraints = [
+            # One live session per idempotency key; retries reuse it
+            models.UniqueConstraint(
+                fields=['idempotency_key'],
+                condition=Q(status='initiated') & ~Q(idempotency_key=''),
+                name='donation_live_idempotency_key',
+            ),
+        ]
+
     def __str__(self):
-        return f"{self.donor_name} - {self.amount}"
\ No newline at end of file
+        return f"{self.donor_name} - {self.amount}"
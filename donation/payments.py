@@ -0,0 +1,240 @@
+"""
+Persisted, idempotent payment sessions.
+
+Each call to initiate_payment is tied to an idempotency key: the client's
+Idempotency-Key header, or a hash of the donor details and amount. While a
+session for that key is still open (PAYMENT_SESSION_TTL), retries get the
+stored gateway URL back without calling the gateway again. A key reused
+with different donor details or amount is refused (IdempotencyKeyReused)
+rather than handing back a session for the original payment.
+
+The gateway's IPN only records the val_id it reports (record_ipn); whether a
+donation is actually paid is decided by ``reconcile()``, which validates open
+sessions with the gateway itself. A donor can still complete the gateway
+page after their session expired here, so sessions that expired within
+PAYMENT_EXPIRED_RECHECK_WINDOW keep taking IPNs and being checked; if the
+gateway reports them paid they're marked paid like any other.
+"""
+import hashlib
+import logging
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import timedelta
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .gateway import GatewayError, get_gateway
+from .models import Donation
+
+logger = logging.getLogger(__name__)
+
+
+class SessionInProgress(Exception):
+    """Another request with the same key is still talking to the gateway."""
+
+
+class IdempotencyKeyReused(Exception):
+    """The key's open session was created for a different name, email or amount."""
+
+
+def derive_idempotency_key(name, email, amount):
+    raw = f'{email.strip().lower()}|{name.strip()}|{amount}'
+    return 'auto:' + hashlib.sha256(raw.encode()).hexdigest()
+
+
+def new_tran_id():
+    return f'DON{uuid.uuid4().hex[:20].upper()}'
+
+
+def build_post_body(donation, extra):
+    return {
+        'total_amount': str(donation.amount),
+        'currency': "BDT",
+        'tran_id': donation.tran_id,
+        'success_url': settings.PAYMENT_SUCCESS_URL,
+        'fail_url': settings.PAYMENT_FAIL_URL,
+        'cancel_url': settings.PAYMENT_CANCEL_URL,
+        'emi_option': 0,
+        'cus_name': donation.donor_name,
+        'cus_email': donation.donor_email,
+        'cus_phone': extra.get('phone', "01700000000"),
+        'cus_add1': extra.get('address', ""),
+        'cus_city': extra.get('city', "Dhaka"),
+        'cus_country': extra.get('country', "Bangladesh"),
+        'shipping_method': "NO",
+        'num_of_item': 1,
+        'product_name': "Donation",
+        'product_category': "Charity",
+        'product_profile': "general",
+    }
+
+
+def get_recheck_window():
+    return timedelta(seconds=getattr(settings, 'PAYMENT_EXPIRED_RECHECK_WINDOW', 24 * 60 * 60))
+
+
+def _live_session(idempotency_key):
+    return Donation.objects.filter(idempotency_key=idempotency_key, status='initiated').first()
+
+
+def _check_same_payment(donation, name, email, amount):
+    if (donation.donor_name, donation.donor_email, donation.amount) != (name, email, Decimal(str(amount))):
+        raise IdempotencyKeyReused()
+
+
+def get_or_create_session(name, email, amount, idempotency_key, extra=None):
+    """
+    Return (donation, created). Raises GatewayError if the gateway refuses the
+    session, SessionInProgress while a concurrent call is still creating it
+    and IdempotencyKeyReused if the key's open session is for another payment.
+    """
+    ttl = timedelta(seconds=getattr(settings, 'PAYMENT_SESSION_TTL', 30 * 60))
+    existing = _live_session(idempotency_key)
+    if existing is not None:
+        if existing.created_at >= timezone.now() - ttl:
+            _check_same_payment(existing, name, email, amount)
+            if not existing.gateway_url:
+                raise SessionInProgress()
+            return existing, False
+        Donation.objects.filter(pk=existing.pk, status='initiated').update(status='expired')
+
+    try:
+        with transaction.atomic():
+            donation = Donation.objects.create(
+                donor_name=name, donor_email=email, amount=amount,
+                tran_id=new_tran_id(), idempotency_key=idempotency_key,
+            )
+    except IntegrityError:
+        # Lost the race with an identical request
+        existing = _live_session(idempotency_key)
+        if existing is None:
+            raise SessionInProgress()
+        _check_same_payment(existing, name, email, amount)
+        if not existing.gateway_url:
+            raise SessionInProgress()
+        return existing, False
+
+    try:
+        response = get_gateway().create_session(build_post_body(donation, extra or {}))
+    except Exception:
+        # Whatever went wrong, don't leave a URL-less session blocking retries
+        Donation.objects.filter(pk=donation.pk).update(status='failed')
+        raise
+    if not response.get('GatewayPageURL'):
+        Donation.objects.filter(pk=donation.pk).update(status='failed')
+        raise GatewayError(response.get('failedreason') or 'Failed to create payment session')
+
+    donation.gateway_url = response['GatewayPageURL']
+    donation.session_key = response.get('sessionkey', '')
+    donation.save(update_fields=['gateway_url', 'session_key'])
+    return donation, True
+
+
+# -------------------------
+# Reconciliation
+# -------------------------
+PAID_STATUSES = {'VALID', 'VALIDATED'}
+FAILED_STATUSES = {'FAILED', 'CANCELLED', 'EXPIRED'}
+
+
+def _outcome(results, donation):
+    outcome = None
+    for result in results:
+        status = str(result.get('status', '')).upper()
+        if status in PAID_STATUSES:
+            if result.get('tran_id') != donation.tran_id:
+                continue
+            try:
+                amount_matches = Decimal(str(result.get('amount'))) == donation.amount
+            except InvalidOperation:
+                amount_matches = False
+            if amount_matches:
+                return 'paid'
+        elif status in FAILED_STATUSES:
+            outcome = 'failed'
+    return outcome
+
+
+def check_payment(gateway, donation):
+    """
+    Ask the gateway about one session; returns 'paid', 'failed' or None
+    (undecided). Runs in a worker thread, so it must not touch the database.
+    The IPN's val_id is tried first; an unknown or forged one falls back to
+    looking the transaction up by tran_id.
+    """
+    if donation.val_id:
+        outcome = _outcome([gateway.validate(donation.val_id)], donation)
+        if outcome:
+            return outcome
+    return _outcome(gateway.query_transaction(donation.tran_id).get('element') or [], donation)
+
+
+def reconcile(batch_size=200, workers=8, now=None):
+    """
+    Check every open session, and those that expired within
+    PAYMENT_EXPIRED_RECHECK_WINDOW, against the gateway, at most ``workers``
+    calls in flight, and record the outcomes with one UPDATE per batch and
+    status. Open sessions older than PAYMENT_SESSION_TTL with no payment are
+    expired; expired ones can only turn paid. A session whose check fails
+    in any way (gateway error, malformed reply) is logged and left for the
+    next run. Returns {'checked', 'paid', 'failed', 'expired'}.
+    """
+    now = now or timezone.now()
+    ttl = timedelta(seconds=getattr(settings, 'PAYMENT_SESSION_TTL', 30 * 60))
+    checked = Q(status='initiated') | Q(status='expired', created_at__gte=now - get_recheck_window())
+    gateway = get_gateway()
+    totals = {'checked': 0, 'paid': 0, 'failed': 0, 'expired': 0}
+    last_pk = 0
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while True:
+            donations = list(
+                Donation.objects.filter(checked, pk__gt=last_pk)
+                .exclude(tran_id=None)
+                .only('pk', 'tran_id', 'val_id', 'amount', 'status', 'created_at')
+                .order_by('pk')[:batch_size]
+            )
+            if not donations:
+                break
+            last_pk = donations[-1].pk
+
+            futures = {pool.submit(check_payment, gateway, donation): donation for donation in donations}
+            outcomes = {'paid': [], 'failed': [], 'expired': []}
+            for future in as_completed(futures):
+                donation = futures[future]
+                try:
+                    outcome = future.result()
+                except Exception:
+                    logger.exception("Payment check failed for %s", donation.tran_id)
+                    continue
+                if donation.status == 'expired' and outcome != 'paid':
+                    continue
+                if outcome is None and donation.created_at < now - ttl:
+                    outcome = 'expired'
+                if outcome:
+                    outcomes[outcome].append(donation.pk)
+
+            payable = Donation.objects.filter(status__in=['initiated', 'expired'])
+            totals['paid'] += payable.filter(pk__in=outcomes['paid']).update(status='paid', paid=True, paid_at=now)
+            pending = Donation.objects.filter(status='initiated')
+            totals['failed'] += pending.filter(pk__in=outcomes['failed']).update(status='failed')
+            totals['expired'] += pending.filter(pk__in=outcomes['expired']).update(status='expired')
+            totals['checked'] += len(donations)
+    return totals
+
+
+def record_ipn(tran_id, val_id, now=None):
+    """
+    Remember an IPN's val_id for the next reconcile run; one UPDATE, no
+    gateway call. Expired sessions still take it: the payment may have gone
+    through after they expired here.
+    """
+    now = now or timezone.now()
+    return Donation.objects.filter(
+        Q(status='initiated') | Q(status='expired', created_at__gte=now - get_recheck_window()),
+        tran_id=tran_id,
+    ).update(val_id=val_id, ipn_received_at=now)
@@ -1,3 +1,210 @@
-from django.test import TestCase
+import io
+from datetime import timedelta
 
-# Create your tests here.
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from .gateway import GatewayError, StubGateway, get_gateway
+from .models import Donation
+from .payments import reconcile
+
+
+@override_settings(PAYMENT_GATEWAY_BACKEND="donation.gateway.StubGateway", PAYMENT_SESSION_TTL=600)
+class InitiatePaymentTests(APITestCase):
+    url = reverse("initiate-payment")
+    payload = {"amount": "500", "name": "Karim", "email": "karim@example.com"}
+
+    def setUp(self):
+        get_gateway.cache_clear()
+
+    def test_session_is_persisted(self):
+        response = self.client.post(self.url, self.payload, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        donation = Donation.objects.get()
+        self.assertEqual(response.data["tran_id"], donation.tran_id)
+        self.assertEqual(response.data["payment_url"], donation.gateway_url)
+        self.assertEqual((donation.status, donation.paid), ("initiated", False))
+        self.assertEqual(get_gateway().sessions[donation.tran_id]["total_amount"], "500.00")
+
+    def test_retries_reuse_open_session(self):
+        first = self.client.post(self.url, self.payload, format="json")
+        second = self.client.post(self.url, self.payload, format="json")
+
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(Donation.objects.count(), 1)
+        self.assertEqual(get_gateway().calls["create_session"], 1)
+
+    def test_explicit_idempotency_keys(self):
+        self.client.post(self.url, self.payload, format="json", HTTP_IDEMPOTENCY_KEY="a")
+        self.client.post(self.url, self.payload, format="json", HTTP_IDEMPOTENCY_KEY="b")
+        self.client.post(self.url, self.payload, format="json", HTTP_IDEMPOTENCY_KEY="a")
+
+        self.assertEqual(Donation.objects.count(), 2)
+        self.assertEqual(get_gateway().calls["create_session"], 2)
+
+    def test_reused_key_with_different_payload_is_refused(self):
+        first = self.client.post(self.url, self.payload, format="json", HTTP_IDEMPOTENCY_KEY="a")
+        for change in ({"amount": "5000"}, {"email": "rahim@example.com"}, {"name": "Rahim"}):
+            response = self.client.post(self.url, {**self.payload, **change}, format="json", HTTP_IDEMPOTENCY_KEY="a")
+            self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+        # The same payload still gets its session back
+        same = {**self.payload, "amount": "500.00"}
+        again = self.client.post(self.url, same, format="json", HTTP_IDEMPOTENCY_KEY="a")
+        self.assertEqual(again.data, first.data)
+        self.assertEqual(Donation.objects.count(), 1)
+        self.assertEqual(get_gateway().calls["create_session"], 1)
+
+    def test_stale_session_is_replaced(self):
+        first = self.client.post(self.url, self.payload, format="json")
+        Donation.objects.update(created_at=Donation.objects.get().created_at - timedelta(minutes=11))
+
+        second = self.client.post(self.url, self.payload, format="json")
+
+        self.assertNotEqual(first.data["tran_id"], second.data["tran_id"])
+        self.assertEqual(Donation.objects.get(tran_id=first.data["tran_id"]).status, "expired")
+
+    def test_gateway_failure_marks_session_failed(self):
+        def refuse(post_body):
+            raise GatewayError("store inactive")
+
+        get_gateway().create_session = refuse
+        response = self.client.post(self.url, self.payload, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Donation.objects.get().status, "failed")
+
+    def test_unexpected_error_marks_session_failed(self):
+        def crash(post_body):
+            raise RuntimeError("boom")
+
+        get_gateway().create_session = crash
+        with self.assertRaises(RuntimeError):
+            self.client.post(self.url, self.payload, format="json")
+        self.assertEqual(Donation.objects.get().status, "failed")
+
+        # The retry isn't blocked by the broken session
+        del get_gateway().create_session
+        self.assertEqual(self.client.post(self.url, self.payload, format="json").status_code, status.HTTP_200_OK)
+
+    def test_validation(self):
+        self.assertEqual(self.client.post(self.url, {"amount": "abc", "name": "x", "email": "x@y.z"}).status_code, 400)
+        self.assertEqual(self.client.post(self.url, {"amount": "-1", "name": "x", "email": "x@y.z"}).status_code, 400)
+        for amount in ("NaN", "sNaN", "Infinity", "1e20", "100000000", "1e40"):
+            response = self.client.post(self.url, {"amount": amount, "name": "x", "email": "x@y.z"})
+            self.assertEqual(response.status_code, 400, amount)
+        self.assertEqual(
+            self.client.post(self.url, {"amount": "99999999.99", "name": "x", "email": "x@y.z"}).status_code, 200,
+        )
+        Donation.objects.all().delete()
+        self.assertFalse(Donation.objects.exists())
+
+    def test_backend_is_pooled_client(self):
+        with override_settings(PAYMENT_GATEWAY_BACKEND="donation.gateway.SSLCommerzGateway"):
+            gateway = get_gateway()
+            self.assertIs(gateway, get_gateway())
+            self.assertEqual(gateway.session.get_adapter("https://sandbox.sslcommerz.com")._pool_maxsize, 20)
+        self.assertIsInstance(get_gateway(), StubGateway)
+
+
+@override_settings(PAYMENT_GATEWAY_BACKEND="donation.gateway.StubGateway", PAYMENT_SESSION_TTL=600)
+class PaymentReconciliationTests(APITestCase):
+    def setUp(self):
+        get_gateway.cache_clear()
+        self.gateway = get_gateway()
+
+    def start(self, email, amount="250"):
+        response = self.client.post(
+            reverse("initiate-payment"), {"amount": amount, "name": "Donor", "email": email}, format="json"
+        )
+        return Donation.objects.get(tran_id=response.data["tran_id"])
+
+    def test_ipn_only_records_val_id(self):
+        donation = self.start("a@example.com")
+        val_id = self.gateway.pay(donation.tran_id)
+
+        with self.assertNumQueries(1):
+            response = self.client.post(reverse("payment-ipn"), {"tran_id": donation.tran_id, "val_id": val_id})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        donation.refresh_from_db()
+        self.assertEqual((donation.val_id, donation.paid), (val_id, False))
+        self.assertNotIn("validate", self.gateway.calls)
+
+    def test_reconcile_marks_outcomes_in_bulk(self):
+        via_ipn = self.start("ipn@example.com")
+        no_ipn = self.start("noipn@example.com")
+        forged = self.start("forged@example.com")
+        short = self.start("short@example.com")
+        cancelled = self.start("cancelled@example.com")
+        waiting = self.start("waiting@example.com")
+        stale = self.start("stale@example.com")
+        Donation.objects.filter(pk=stale.pk).update(created_at=stale.created_at - timedelta(hours=1))
+
+        self.client.post(reverse("payment-ipn"), {"tran_id": via_ipn.tran_id, "val_id": self.gateway.pay(via_ipn.tran_id)})
+        self.gateway.pay(no_ipn.tran_id)
+        self.client.post(reverse("payment-ipn"), {"tran_id": forged.tran_id, "val_id": "made-up"})
+        self.gateway.pay(short.tran_id, amount="1.00")
+        self.gateway.pay(cancelled.tran_id, status="CANCELLED")
+
+        out = io.StringIO()
+        call_command("reconcile_payments", "--workers", "3", "--batch-size", "4", stdout=out)
+
+        statuses = dict(Donation.objects.values_list("donor_email", "status"))
+        self.assertEqual(statuses, {
+            "ipn@example.com": "paid",
+            "noipn@example.com": "paid",
+            "forged@example.com": "initiated",
+            "short@example.com": "initiated",
+            "cancelled@example.com": "failed",
+            "waiting@example.com": "initiated",
+            "stale@example.com": "expired",
+        })
+        self.assertTrue(Donation.objects.get(pk=via_ipn.pk).paid)
+        self.assertIsNotNone(Donation.objects.get(pk=no_ipn.pk).paid_at)
+        self.assertIn("Checked 7: 2 paid, 1 failed, 1 expired.", out.getvalue())
+
+        # Paid and failed sessions aren't checked again; the recently expired one is
+        self.assertEqual(reconcile()["checked"], 4)
+
+    def test_malformed_reply_skips_only_that_session(self):
+        broken, paid = self.start("broken@example.com"), self.start("paid@example.com")
+        self.gateway.pay(paid.tran_id)
+        query_transaction = self.gateway.query_transaction
+
+        def malformed(tran_id):
+            if tran_id == broken.tran_id:
+                return ["not", "a", "dict"]
+            return query_transaction(tran_id)
+
+        self.gateway.query_transaction = malformed
+        with self.assertLogs("donation.payments", "ERROR"):
+            totals = reconcile()
+
+        self.assertEqual(totals, {"checked": 2, "paid": 1, "failed": 0, "expired": 0})
+        self.assertEqual(Donation.objects.get(pk=broken.pk).status, "initiated")
+        self.assertTrue(Donation.objects.get(pk=paid.pk).paid)
+
+    def test_payment_after_expiry_is_recorded(self):
+        late = self.start("late@example.com")
+        old = self.start("old@example.com")
+        Donation.objects.filter(pk=late.pk).update(created_at=late.created_at - timedelta(hours=1))
+        Donation.objects.filter(pk=old.pk).update(created_at=old.created_at - timedelta(days=2))
+        reconcile()
+        self.assertEqual(set(Donation.objects.values_list("status", flat=True)), {"expired"})
+
+        # The donors finish on the gateway page after the sessions expired here
+        for donation in (late, old):
+            val_id = self.gateway.pay(donation.tran_id)
+            self.client.post(reverse("payment-ipn"), {"tran_id": donation.tran_id, "val_id": val_id})
+        self.assertEqual(Donation.objects.get(pk=late.pk).val_id, f"val-{late.tran_id}")
+        self.assertEqual(Donation.objects.get(pk=old.pk).val_id, "")
+
+        self.assertEqual(reconcile(), {"checked": 1, "paid": 1, "failed": 0, "expired": 0})
+        late.refresh_from_db()
+        self.assertEqual((late.status, late.paid), ("paid", True))
+        self.assertEqual(Donation.objects.get(pk=old.pk).status, "expired")
@@ -3,4 +3,5 @@ from . import views
 
 urlpatterns = [
     path('initiate-payment/', views.initiate_payment, name='initiate-payment'),
+    path('ipn/', views.payment_ipn, name='payment-ipn'),
 ]
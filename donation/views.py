@@ -1,53 +1,70 @@
-from rest_framework.decorators import api_view
+from decimal import Decimal, InvalidOperation
+
+from rest_framework.decorators import api_view, authentication_classes, permission_classes
+from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 
+from .gateway import GatewayError
+from .models import Donation
+from .payments import (
+    IdempotencyKeyReused, SessionInProgress, derive_idempotency_key, get_or_create_session, record_ipn,
+)
+
+# Largest amount Donation.amount can store (max_digits / decimal_places)
+_amount_field = Donation._meta.get_field('amount')
+MAX_AMOUNT = Decimal(10) ** (_amount_field.max_digits - _amount_field.decimal_places) - Decimal('0.01')
+
 @api_view(['POST'])
 def initiate_payment(request):
-    # Lazy import to avoid import-time errors during schema generation
-    try:
-        from sslcommerz_lib import SSLCOMMERZ
-    except Exception:
-        return Response({'error': 'Payment gateway unavailable'}, status=503)
     amount = request.data.get('amount')
     donor_name = request.data.get('name')
     donor_email = request.data.get('email')
 
     if not amount or not donor_name or not donor_email:
         return Response({'error': 'Amount, name, and email are required'}, status=400)
+    try:
+        amount = Decimal(str(amount)).quantize(Decimal('0.01'))
+    except InvalidOperation:
+        return Response({'error': 'Amount must be a number'}, status=400)
+    if not amount.is_finite():
+        return Response({'error': 'Amount must be a number'}, status=400)
+    if amount <= 0:
+        return Response({'error': 'Amount must be positive'}, status=400)
+    if amount > MAX_AMOUNT:
+        return Response({'error': f'Amount must be at most {MAX_AMOUNT}'}, status=400)
+
+    # Retries with the same key (or the same details) reuse the open session
+    idempotency_key = (
+        request.headers.get('Idempotency-Key', '').strip()[:128]
+        or derive_idempotency_key(donor_name, donor_email, amount)
+    )
+    try:
+        donation, _ = get_or_create_session(
+            donor_name, donor_email, amount, idempotency_key, extra=request.data,
+        )
+    except SessionInProgress:
+        return Response({'error': 'Payment session is being created, retry shortly'}, status=409)
+    except IdempotencyKeyReused:
+        return Response(
+            {'error': 'Idempotency-Key was already used for a different name, email or amount'}, status=422,
+        )
+    except GatewayError as exc:
+        return Response({'error': 'Failed to create payment session', 'details': str(exc)}, status=400)
 
-    settings = {
-        'store_id': 'hemog68c429fc47f4e',
-        'store_pass': 'hemog68c429fc47f4e@ssl',
-        'issandbox': True
-    }
-    sslcz = SSLCOMMERZ(settings)
-
-    post_body = {
-        'total_amount': float(amount),
-        'currency': "BDT",
-        'tran_id': f"donation_{donor_email.replace('@','_')}_{int(float(amount)*100)}",
-        'success_url': "https://yourdomain.com/donation/success/",
-        'fail_url': "https://yourdomain.com/donation/fail/",
-        'cancel_url': "https://yourdomain.com/donation/cancel/",
-        'emi_option': 0,
-        'cus_name': donor_name,
-        'cus_email': donor_email,
-        'cus_phone': request.data.get('phone', "01700000000"),
-        'cus_add1': request.data.get('address', ""),
-        'cus_city': request.data.get('city', "Dhaka"),
-        'cus_country': request.data.get('country', "Bangladesh"),
-        'shipping_method': "NO",
-        'num_of_item': 1,
-        'product_name': "Donation",
-        'product_category': "Charity",
-        'product_profile': "general"
-    }
-
-    response = sslcz.createSession(post_body)
-
-    if response.get('GatewayPageURL'):
-        return Response({'payment_url': response['GatewayPageURL']})
-    else:
-        return Response({'error': 'Failed to create payment session', 'details': response}, status=400)
+    return Response({'payment_url': donation.gateway_url, 'tran_id': donation.tran_id})
 
 
+@api_view(['POST'])
+@authentication_classes([])
+@permission_classes([AllowAny])
+def payment_ipn(request):
+    """
+    SSLCommerz instant payment notification. The payload isn't trusted: its
+    val_id is stored and checked against the gateway by reconcile_payments.
+    """
+    tran_id = request.data.get('tran_id')
+    val_id = request.data.get('val_id', '')
+    if not tran_id:
+        return Response({'error': 'tran_id is required'}, status=400)
+    record_ipn(tran_id, str(val_id)[:100])
+    return Response({'status': 'received'})
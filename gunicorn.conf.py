@@ -1,13 +1,136 @@
 # Gunicorn configuration file
+"""
+The worker model is picked with GUNICORN_PROFILE:
+
+* sync (default): one request at a time per worker, 2 x CPUs + 1 workers;
+* gthread: CPUs + 1 workers with GUNICORN_THREADS (default 4) threads each,
+  for traffic that waits on the database, SMTP or the payment gateway;
+* uvicorn: one ASGI worker per CPU serving hemogrid.asgi (needs the
+  uvicorn-worker package).
+
+Worker counts follow the CPUs this process may use (affinity and cgroup
+quota), capped so workers x GUNICORN_WORKER_MEMORY_MB fits in the memory
+limit. GUNICORN_WORKERS (or WEB_CONCURRENCY) and GUNICORN_THREADS override
+the computed values. `python -m benchmarks server` compares the profiles.
+"""
+import math
+import os
+import shutil
+
+PROFILES = {
+    "sync": {"worker_class": "sync", "wsgi_app": "hemogrid.wsgi:app"},
+    "gthread": {"worker_class": "gthread", "wsgi_app": "hemogrid.wsgi:app"},
+    "uvicorn": {"worker_class": "uvicorn_worker.UvicornWorker", "wsgi_app": "hemogrid.asgi:application"},
+}
+DEFAULT_THREADS = 4
+# Resident size of one worker after a few thousand requests
+DEFAULT_WORKER_MEMORY_MB = 150
+# Left for the master, the OS and anything else in the container
+RESERVED_MEMORY_MB = 256
+
+
+def _read(path):
+    try:
+        with open(path) as fh:
+            return fh.read().strip()
+    except OSError:
+        return None
+
+
+def available_cpus():
+    """CPUs this process may run on, limited by a cgroup CPU quota if there is one."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    quota = _read("/sys/fs/cgroup/cpu.max")  # cgroup v2: "<quota> <period>" or "max <period>"
+    if quota:
+        limit, _, period = quota.partition(" ")
+    else:  # cgroup v1
+        limit, period = _read("/sys/fs/cgroup/cpu/cpu.cfs_quota_us"), _read("/sys/fs/cgroup/cpu/cpu.cfs_period_us")
+    if limit and period and limit not in ("max", "-1"):
+        cpus = min(cpus, max(1, math.ceil(int(limit) / int(period))))
+    return cpus
+
+
+def available_memory_mb():
+    """Physical memory, or the cgroup memory limit if that is lower."""
+    try:
+        memory = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (AttributeError, ValueError, OSError):
+        return None
+    for path in ("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory/memory.limit_in_bytes"):
+        limit = _read(path)
+        if limit and limit.isdigit():
+            memory = min(memory, int(limit))
+    return memory // (1024 * 1024)
+
+
+def tune(profile, cpus, memory_mb, env):
+    """Worker settings for ``profile`` on a machine with ``cpus`` and ``memory_mb``."""
+    if profile not in PROFILES:
+        raise ValueError(f"GUNICORN_PROFILE must be one of {', '.join(PROFILES)}, not {profile!r}")
+
+    if profile == "sync":
+        workers, threads = 2 * cpus + 1, 1
+    elif profile == "gthread":
+        workers, threads = cpus + 1, int(env.get("GUNICORN_THREADS") or DEFAULT_THREADS)
+    else:
+        workers, threads = cpus, 1
+    if memory_mb:
+        per_worker = int(env.get("GUNICORN_WORKER_MEMORY_MB") or DEFAULT_WORKER_MEMORY_MB)
+        workers = min(workers, max(1, (memory_mb - RESERVED_MEMORY_MB) // per_worker))
+    override = env.get("GUNICORN_WORKERS") or env.get("WEB_CONCURRENCY")
+    if override:
+        workers = int(override)
+    return {**PROFILES[profile], "workers": max(1, workers), "threads": max(1, threads)}
+
+
+profile = os.environ.get("GUNICORN_PROFILE", "sync")
+_tuned = tune(profile, available_cpus(), available_memory_mb(), os.environ)
+
 bind = "0.0.0.0:8000"
-workers = 3
-worker_class = "sync"
-worker_connections = 1000
+wsgi_app = _tuned["wsgi_app"]
+worker_class = _tuned["worker_class"]
+workers = _tuned["workers"]
+# Gunicorn turns sync workers into gthread ones when threads > 1
+threads = _tuned["threads"]
 timeout = 30
-keepalive = 2
+keepalive = 5 if profile != "sync" else 2
 max_requests = 1000
 max_requests_jitter = 100
 preload_app = True
 accesslog = "-"
 errorlog = "-"
 loglevel = "info"
+
+# Workers dump their request metrics here; /metrics sums every file
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/hemogrid-metrics")
+
+
+def on_starting(server):
+    # Start each server run with empty metrics. Files of workers recycled by
+    # max_requests are flushed by worker_exit and folded into one by
+    # child_exit, so their counts stay in the totals.
+    metrics_dir = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir, exist_ok=True)
+    server.log.info(
+        "Profile %s: %s x %s worker(s), %s thread(s) each", profile, workers, worker_class, threads,
+    )
+
+
+def worker_exit(server, worker):
+    # Runs in the worker as it exits: write out the counts gathered since
+    # its last (throttled) flush before child_exit folds the file in
+    from hemogrid.metrics import flush
+
+    flush(force=True)
+
+
+def child_exit(server, worker):
+    # Runs in the master: fold the exited worker's metrics file into the
+    # retired totals so dead pids don't leave a file each
+    from hemogrid.metrics import retire
+
+    retire(os.environ["PROMETHEUS_MULTIPROC_DIR"], worker.pid)
@@ -0,0 +1,85 @@
+"""
+Conditional GET for list and detail endpoints.
+
+Validators come from ``updated_at``. A list's ETag covers the newest
+updated_at and the row count of the filtered queryset, read in one aggregate
+query (the count catches deletions), plus everything else the body depends
+on: path and query string, user and renderer. Lists send no Last-Modified:
+when rows are deleted or leave the filter the newest updated_at stays the
+same or goes back, and an If-Modified-Since alone would get a 304 for a
+stale body. Details send their row's updated_at. A request whose validators
+still match gets a 304 before any row is fetched or serialized.
+
+Only the rows' own updated_at is tracked, so a change that only shows
+through a relation (a requester's new email in requester_email) waits for
+the row itself to change. Rows rendering differently once a datetime passes
+(``is_expired``) name that field in ``expiry_field``.
+"""
+import hashlib
+
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+UPDATED_FIELD = 'updated_at'
+
+
+def make_etag(request, *state):
+    user = getattr(request, 'user', None)
+    renderer = getattr(request, 'accepted_renderer', None)
+    parts = (request.get_full_path(), getattr(user, 'pk', None), getattr(renderer, 'format', None), *state)
+    return 'W/"%s"' % hashlib.sha256('|'.join(map(str, parts)).encode()).hexdigest()[:32]
+
+
+def timestamp(updated_at):
+    return int(updated_at.timestamp()) if updated_at else None
+
+
+def not_modified(request, etag, updated_at=None):
+    """A 304 response if the request's validators still match, else None."""
+    return get_conditional_response(request, etag=etag, last_modified=timestamp(updated_at))
+
+
+def add_validators(response, etag, updated_at=None):
+    if response.status_code in (200, 304):
+        response['ETag'] = etag
+        if updated_at:
+            response['Last-Modified'] = http_date(timestamp(updated_at))
+        # Per-user bodies that change any time: clients keep them but revalidate
+        patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+class ConditionalListMixin:
+    """``list()`` answering 304 when the filtered queryset hasn't changed."""
+
+    expiry_field = None
+
+    def get_list_state(self, queryset):
+        aggregates = {'last': Max(UPDATED_FIELD), 'count': Count('pk')}
+        if self.expiry_field:
+            aggregates['expired'] = Count('pk', filter=Q(**{f'{self.expiry_field}__lt': timezone.now()}))
+        return queryset.order_by().aggregate(**aggregates)
+
+    def list(self, request, *args, **kwargs):
+        state = self.get_list_state(self.filter_queryset(self.get_queryset()))
+        etag = make_etag(request, *(state[key] for key in sorted(state)))
+        response = not_modified(request, etag)
+        if response is None:
+            response = super().list(request, *args, **kwargs)
+        return add_validators(response, etag)
+
+
+class ConditionalRetrieveMixin:
+    """``retrieve()`` answering 304 when the object's updated_at hasn't changed."""
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        updated_at = getattr(instance, UPDATED_FIELD)
+        etag = make_etag(request, instance.pk, updated_at)
+        response = not_modified(request, etag, updated_at)
+        if response is None:
+            response = Response(self.get_serializer(instance).data)
+        return add_validators(response, etag, updated_at)
@@ -0,0 +1,97 @@
+"""
+Sparse fieldsets for read endpoints.
+
+GET requests may name the fields they want with ``?fields=a,b`` or the ones
+they don't with ``?exclude=c,d``. Serializers with SparseFieldsetMixin drop
+the rest of their top-level fields (nested serializers are left whole), and
+views with SparseQuerysetMixin also load only the columns the remaining
+fields read, via ``.only()``.
+
+Column pruning needs to know what every field reads. Plain model fields and
+relations are worked out from their source; SerializerMethodFields must be
+listed in ``Meta.method_field_sources`` with the attributes their method
+reads. When any field can't be resolved the queryset is left unpruned.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+FIELDS_PARAM = 'fields'
+EXCLUDE_PARAM = 'exclude'
+
+
+def parse_names(value):
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+def requested_fields(request, available):
+    """
+    The names out of ``available`` (in order) that ``request`` asks for, or
+    None when it doesn't narrow them. Unknown names are a validation error.
+    """
+    if request is None or request.method not in SAFE_METHODS:
+        return None
+    params = getattr(request, 'query_params', request.GET)
+    wanted = parse_names(params.get(FIELDS_PARAM, ''))
+    unwanted = parse_names(params.get(EXCLUDE_PARAM, ''))
+    if not wanted and not unwanted:
+        return None
+    errors = {}
+    for param, names in ((FIELDS_PARAM, wanted), (EXCLUDE_PARAM, unwanted)):
+        unknown = [name for name in names if name not in available]
+        if unknown:
+            errors[param] = [f"Unknown field(s): {', '.join(unknown)}."]
+    if errors:
+        raise serializers.ValidationError(errors)
+    return [name for name in available if (not wanted or name in wanted) and name not in unwanted]
+
+
+def only_columns(serializer):
+    """Model fields to pass to ``.only()`` for ``serializer``'s fields, or None if unknown."""
+    model = serializer.Meta.model
+    method_sources = getattr(serializer.Meta, 'method_field_sources', {})
+    columns = []
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+        if isinstance(field, serializers.SerializerMethodField):
+            if field.field_name not in method_sources:
+                return None
+            columns.extend(method_sources[field.field_name])
+            continue
+        if field.source == '*':
+            return None
+        try:
+            model_field = model._meta.get_field(field.source_attrs[0])
+        except FieldDoesNotExist:
+            return None
+        if not model_field.concrete or model_field.many_to_many:
+            return None
+        # A relation's own columns are loaded when it's accessed, as without pruning
+        columns.append(model_field.name)
+    return list(dict.fromkeys(columns))
+
+
+class SparseFieldsetMixin:
+    """Serializer mixin dropping the fields a GET request's ?fields= / ?exclude= leave out."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        readable = [name for name, field in self.fields.items() if not field.write_only]
+        keep = requested_fields(self.context.get('request'), readable)
+        self.sparse = keep is not None
+        if self.sparse:
+            for name in set(readable) - set(keep):
+                self.fields.pop(name)
+
+
+class SparseQuerysetMixin:
+    """Generic view mixin loading only the columns of a sparse fieldset."""
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        serializer = self.get_serializer()
+        if not getattr(serializer, 'sparse', False):
+            return queryset
+        columns = only_columns(serializer)
+        return queryset if columns is None else queryset.only(*columns)
@@ -0,0 +1,361 @@
+"""
+Request metrics for Prometheus.
+
+MetricsMiddleware records, per URL name: request latency, response size,
+DB query count and time, and cache hits/misses. Each process keeps its own
+registry; when METRICS_MULTIPROC_DIR is set (gunicorn.conf.py sets it) every
+worker periodically dumps its registry to a JSON file there and /metrics sums
+all files, so the endpoint reports the whole server whichever worker serves it.
+When a worker exits, gunicorn.conf.py folds its file into RETIRED_FILE, so
+recycled workers' counts stay in the totals without a file per dead pid.
+"""
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.backends.memcached import PyMemcacheCache
+from django.core.cache.backends.redis import RedisCache
+from django.db import connections
+from django.http import HttpResponse
+from rest_framework import permissions
+from rest_framework.views import APIView
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+HISTOGRAMS = {
+    'hemogrid_http_request_duration_seconds': ('Request latency by view.', LATENCY_BUCKETS),
+    'hemogrid_http_response_size_bytes': ('Response body size by view.', SIZE_BUCKETS),
+    'hemogrid_db_queries_per_request': ('Database queries per request by view.', QUERY_COUNT_BUCKETS),
+}
+COUNTERS = {
+    'hemogrid_http_requests_total': 'Requests by view, method and status.',
+    'hemogrid_db_queries_total': 'Database queries by view.',
+    'hemogrid_db_query_duration_seconds_total': 'Time spent in the database by view.',
+    'hemogrid_cache_hits_total': 'Cache hits by view.',
+    'hemogrid_cache_misses_total': 'Cache misses by view.',
+}
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+RETIRED_FILE = 'metrics-retired.json'
+
+
+class Registry:
+    """Thread-safe in-process store of counters and histograms."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.last_flush = 0.0
+
+    @staticmethod
+    def _key(name, labels):
+        return (name, tuple(sorted((key, str(value)) for key, value in labels.items())))
+
+    def inc(self, name, labels, amount=1):
+        key = self._key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name, labels, value):
+        buckets = HISTOGRAMS[name][1]
+        key = self._key(name, labels)
+        with self.lock:
+            # [count per bucket..., +Inf count, sum]
+            series = self.histograms.setdefault(key, [0] * (len(buckets) + 1) + [0.0])
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[len(buckets)] += 1
+            series[-1] += value
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'counters': [[name, list(labels), value] for (name, labels), value in self.counters.items()],
+                'histograms': [[name, list(labels), list(series)] for (name, labels), series in self.histograms.items()],
+            }
+
+    def reset(self):
+        with self.lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+
+registry = Registry()
+
+_current_request = contextvars.ContextVar('hemogrid_metrics_request', default=None)
+# Off while an instrumented cache method runs, so lookups it makes through
+# other methods (BaseCache.get_many calls get) aren't counted twice
+_count_cache_access = contextvars.ContextVar('hemogrid_metrics_count_cache', default=True)
+# gthread workers serve several requests at once; one thread flushes at a time
+_flush_lock = threading.Lock()
+
+
+def get_multiproc_dir():
+    return getattr(settings, 'METRICS_MULTIPROC_DIR', None)
+
+
+def flush(force=False):
+    """Write this process's registry to the shared directory (throttled)."""
+    directory = get_multiproc_dir()
+    if not directory:
+        return
+    now = time.monotonic()
+    interval = getattr(settings, 'METRICS_FLUSH_INTERVAL', 1.0)
+    if not force and now - registry.last_flush < interval:
+        return
+    if not _flush_lock.acquire(blocking=force):
+        return
+    try:
+        registry.last_flush = now
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'metrics-{os.getpid()}.json')
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as fh:
+            json.dump(registry.snapshot(), fh)
+        os.replace(tmp_path, path)
+    finally:
+        _flush_lock.release()
+
+
+def read_snapshots(directory):
+    snapshots = []
+    for filename in os.listdir(directory):
+        if not filename.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(directory, filename)) as fh:
+                snapshots.append(json.load(fh))
+        except (OSError, ValueError):
+            continue
+    return snapshots
+
+
+def merge(snapshots):
+    """Sum snapshots into ({(name, labels): value}, {(name, labels): series})."""
+    counters, histograms = {}, {}
+    for snapshot in snapshots:
+        for name, labels, value in snapshot['counters']:
+            key = (name, tuple(tuple(pair) for pair in labels))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, series in snapshot['histograms']:
+            key = (name, tuple(tuple(pair) for pair in labels))
+            total = histograms.setdefault(key, [0] * len(series))
+            for i, value in enumerate(series):
+                total[i] += value
+    return counters, histograms
+
+
+def collect():
+    """Sum the snapshots of every process (or just this one without a shared dir)."""
+    directory = get_multiproc_dir()
+    if not directory:
+        return merge([registry.snapshot()])
+    flush(force=True)
+    return merge(read_snapshots(directory))
+
+
+def retire(directory, pid):
+    """
+    Fold the file of the exited worker ``pid`` into RETIRED_FILE and remove
+    it. Called from the gunicorn master only, so nothing else writes
+    RETIRED_FILE meanwhile.
+    """
+    path = os.path.join(directory, f'metrics-{pid}.json')
+    retired_path = os.path.join(directory, RETIRED_FILE)
+    snapshots = []
+    for source in (retired_path, path):
+        try:
+            with open(source) as fh:
+                snapshots.append(json.load(fh))
+        except (OSError, ValueError):
+            continue
+    if not os.path.exists(path):
+        return
+    counters, histograms = merge(snapshots)
+    tmp_path = f'{retired_path}.tmp'
+    with open(tmp_path, 'w') as fh:
+        json.dump({
+            'counters': [[name, [list(pair) for pair in labels], value] for (name, labels), value in counters.items()],
+            'histograms': [[name, [list(pair) for pair in labels], series]
+                           for (name, labels), series in histograms.items()],
+        }, fh)
+    os.replace(tmp_path, retired_path)
+    os.remove(path)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(pairs, extra=()):
+    pairs = list(pairs) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in pairs) + '}'
+
+
+def render():
+    """Render the aggregated metrics in the Prometheus text exposition format."""
+    counters, histograms = collect()
+    lines = []
+    for name, help_text in COUNTERS.items():
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+        for (series_name, labels), value in sorted(counters.items()):
+            if series_name == name:
+                lines.append(f'{name}{_labels(labels)} {value}')
+    for name, (help_text, buckets) in HISTOGRAMS.items():
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+        for (series_name, labels), series in sorted(histograms.items()):
+            if series_name != name:
+                continue
+            for bound, count in zip(buckets, series):
+                lines.append(f'{name}_bucket{_labels(labels, [("le", bound)])} {count}')
+            lines.append(f'{name}_bucket{_labels(labels, [("le", "+Inf")])} {series[len(buckets)]}')
+            lines.append(f'{name}_sum{_labels(labels)} {series[-1]}')
+            lines.append(f'{name}_count{_labels(labels)} {series[len(buckets)]}')
+    return '\n'.join(lines) + '\n'
+
+
+# -------------------------
+# Instrumentation
+# -------------------------
+class RequestStats:
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def db_wrapper(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_time += time.perf_counter() - start
+
+
+def record_cache_access(hits=0, misses=0):
+    stats = _current_request.get()
+    if stats is not None:
+        stats.cache_hits += hits
+        stats.cache_misses += misses
+        return
+    if hits:
+        registry.inc('hemogrid_cache_hits_total', {'view': '-'}, hits)
+    if misses:
+        registry.inc('hemogrid_cache_misses_total', {'view': '-'}, misses)
+
+
+class MetricsMiddleware:
+    """Should be the first middleware so the latency covers the whole stack."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = RequestStats()
+        token = _current_request.set(stats)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for conn in connections.all():
+                    stack.enter_context(conn.execute_wrapper(stats.db_wrapper))
+                response = self.get_response(request)
+        finally:
+            _current_request.reset(token)
+        duration = time.perf_counter() - start
+
+        match = getattr(request, 'resolver_match', None)
+        view = {'view': match.view_name if match else 'unresolved'}
+        registry.inc('hemogrid_http_requests_total', {**view, 'method': request.method, 'status': response.status_code})
+        registry.observe('hemogrid_http_request_duration_seconds', view, duration)
+        registry.observe('hemogrid_db_queries_per_request', view, stats.queries)
+        registry.inc('hemogrid_db_queries_total', view, stats.queries)
+        registry.inc('hemogrid_db_query_duration_seconds_total', view, stats.db_time)
+        if stats.cache_hits:
+            registry.inc('hemogrid_cache_hits_total', view, stats.cache_hits)
+        if stats.cache_misses:
+            registry.inc('hemogrid_cache_misses_total', view, stats.cache_misses)
+        if not response.streaming:
+            registry.observe('hemogrid_http_response_size_bytes', view, len(response.content))
+        flush()
+        return response
+
+
+class InstrumentedCacheMixin:
+    """
+    Counts hits and misses of a Django cache backend for the current view:
+    get() (and so get_or_set()), get_many() and has_key(). add() and incr()
+    are writes and aren't counted.
+    """
+
+    _missing = object()
+
+    def _uncounted(self, method, *args, **kwargs):
+        token = _count_cache_access.set(False)
+        try:
+            return method(*args, **kwargs)
+        finally:
+            _count_cache_access.reset(token)
+
+    def get(self, key, default=None, version=None):
+        value = self._uncounted(super().get, key, self._missing, version=version)
+        if value is self._missing:
+            self._record(misses=1)
+            return default
+        self._record(hits=1)
+        return value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        found = self._uncounted(super().get_many, keys, version=version)
+        self._record(hits=len(found), misses=len(keys) - len(found))
+        return found
+
+    def has_key(self, key, version=None):
+        present = self._uncounted(super().has_key, key, version=version)
+        self._record(hits=int(present), misses=int(not present))
+        return present
+
+    @staticmethod
+    def _record(hits=0, misses=0):
+        if _count_cache_access.get():
+            record_cache_access(hits, misses)
+
+
+class InstrumentedLocMemCache(InstrumentedCacheMixin, LocMemCache):
+    """Per process: for development and tests only (see CACHES in settings)."""
+
+
+class InstrumentedRedisCache(InstrumentedCacheMixin, RedisCache):
+    pass
+
+
+class InstrumentedPyMemcacheCache(InstrumentedCacheMixin, PyMemcacheCache):
+    pass
+
+
+# -------------------------
+# Endpoint
+# -------------------------
+class IsAdminUser(permissions.BasePermission):
+    def has_permission(self, request, view):
+        return request.user and request.user.is_authenticated and (request.user.is_staff or request.user.role == 'admin')
+
+
+class MetricsView(APIView):
+    permission_classes = [IsAdminUser]
+    swagger_schema = None
+
+    def get(self, request):
+        return HttpResponse(render(), content_type=CONTENT_TYPE)
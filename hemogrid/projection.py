@@ -0,0 +1,149 @@
+"""
+Serializer-free read path for list endpoints.
+
+A RowProjection reads the rows a ModelSerializer would render with
+``.values()`` and turns each one into the serializer's output with a
+function compiled from the serializer's fields, instead of building a model
+instance and running the field machinery per row. The output is the same:
+fields whose value comes back from the database already in its JSON form
+(text, integers, booleans, primary keys, ``ReadOnlyField``) are copied;
+every other field still goes through its own ``to_representation``.
+
+SerializerMethodFields are called with an attribute view of the row, so
+their methods may only read columns of the row itself: the ones named for
+them in the serializer's ``Meta.method_field_sources`` (see
+hemogrid.fieldsets) plus any ``extra_columns``. Nested serializers and other
+``source='*'`` fields aren't supported.
+"""
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework import serializers
+from rest_framework.response import Response
+
+# Exact field types whose to_representation is the identity on database values
+COPIED_FIELDS = (
+    serializers.CharField,
+    serializers.EmailField,
+    serializers.IntegerField,
+    serializers.BooleanField,
+    serializers.ReadOnlyField,
+)
+
+COPY, CONVERT, METHOD = 'copy', 'convert', 'method'
+
+# Sparse fieldsets (?fields=) make the set of plans client-controlled
+MAX_COMPILED_PLANS = 64
+
+
+class RowView:
+    """Read-only attribute access to a ``.values()`` row, for SerializerMethodFields."""
+
+    __slots__ = ('_row',)
+
+    def __init__(self, row):
+        self._row = row
+
+    def __getattr__(self, name):
+        try:
+            return self._row[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+
+def field_plan(field):
+    """(kind, column) describing how ``field`` is read from a row."""
+    if isinstance(field, serializers.SerializerMethodField):
+        return METHOD, None
+    if field.source == '*' or isinstance(field, (serializers.BaseSerializer, serializers.ManyRelatedField)):
+        raise ImproperlyConfigured(f"Field '{field.field_name}' can't be read from a .values() row.")
+    column = '__'.join(field.source_attrs)
+    if type(field) in COPIED_FIELDS:
+        return COPY, column
+    if type(field) is serializers.PrimaryKeyRelatedField and field.pk_field is None:
+        return COPY, column
+    return CONVERT, column
+
+
+def compile_plan(plan):
+    """
+    Build ``make(RowView, *converters) -> to_dict`` for ``plan``, a tuple of
+    (output name, kind, column) in output order.
+    """
+    converters, items = [], []
+    for name, kind, column in plan:
+        if kind == COPY:
+            items.append(f'{name!r}: row[{column!r}]')
+        elif kind == METHOD:
+            converters.append(f'c{len(converters)}')
+            items.append(f'{name!r}: {converters[-1]}(obj)')
+        else:
+            converters.append(f'c{len(converters)}')
+            items.append(f'{name!r}: None if row[{column!r}] is None else {converters[-1]}(row[{column!r}])')
+    body = [f"def make(RowView{''.join(', ' + c for c in converters)}):", '    def to_dict(row):']
+    if any(kind == METHOD for _, kind, _ in plan):
+        body.append('        obj = RowView(row)')
+    body.append('        return {')
+    body += [f'            {item},' for item in items]
+    body += ['        }', '    return to_dict']
+    namespace = {}
+    exec(compile('\n'.join(body), '<projection>', 'exec'), namespace)
+    return namespace['make']
+
+
+class RowProjection:
+    def __init__(self, serializer_class, extra_columns=()):
+        self.serializer_class = serializer_class
+        self.extra_columns = tuple(extra_columns)
+        self._compiled = {}
+
+    def bind(self, context):
+        """
+        Return (columns, to_dict) for a request: the ``.values()`` columns to
+        select and the function turning one such row into the serializer's output.
+        """
+        serializer = self.serializer_class(context=context)
+        fields = [field for field in serializer.fields.values() if not field.write_only]
+        plan = tuple((field.field_name, *field_plan(field)) for field in fields)
+        make = self._compiled.get(plan)
+        if make is None:
+            if len(self._compiled) >= MAX_COMPILED_PLANS:
+                self._compiled.clear()
+            make = self._compiled[plan] = compile_plan(plan)
+        converters = [field.to_representation for field, (_, kind, _) in zip(fields, plan) if kind != COPY]
+        method_sources = getattr(self.serializer_class.Meta, 'method_field_sources', {})
+        columns = [column for _, _, column in plan if column]
+        for name, kind, _ in plan:
+            if kind == METHOD:
+                columns.extend(method_sources.get(name, ()))
+        columns = list(dict.fromkeys(columns + list(self.extra_columns)))
+        return columns, make(RowView, *converters)
+
+
+class ProjectedListMixin:
+    """
+    ``list()`` for generic list views served through a RowProjection of
+    ``serializer_class``. Filtering and pagination are unchanged.
+    """
+
+    projection_extra_columns = ()
+    use_projection = True
+
+    def get_projection(self):
+        cls = type(self)
+        key = (self.get_serializer_class(), tuple(self.projection_extra_columns))
+        cache = cls.__dict__.get('_projections')
+        if cache is None:
+            cache = cls._projections = {}
+        if key not in cache:
+            cache[key] = RowProjection(*key)
+        return cache[key]
+
+    def list(self, request, *args, **kwargs):
+        if not self.use_projection:
+            return super().list(request, *args, **kwargs)
+        columns, to_dict = self.get_projection().bind(self.get_serializer_context())
+        rows = self.filter_queryset(self.get_queryset()).values(*columns)
+
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response([to_dict(row) for row in page])
+        return Response([to_dict(row) for row in rows])
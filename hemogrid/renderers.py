@@ -0,0 +1,130 @@
+"""
+Faster renderers and parsers for DRF.
+
+ORJSONRenderer and ORJSONParser are drop-in replacements for DRF's JSON
+classes (same media type and, for everything DRF's encoder handles, the same
+bytes) backed by orjson. MessagePackRenderer and MessagePackParser serve
+``application/msgpack`` to the mobile app; clients pick it with the Accept
+header or ``?format=msgpack``.
+
+orjson and msgpack are pinned in requirements.txt; settings still only
+installs the classes whose library is importable, so a bare environment
+falls back to DRF's JSON classes. Values neither library knows are converted
+the way DRF's JSONEncoder converts them (datetimes to ISO 8601, Decimal to
+float, ...); Cloudinary resources become their delivery URL.
+"""
+import math
+from decimal import Decimal
+
+from cloudinary import CloudinaryResource
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+_encoder = JSONEncoder()
+
+# DRF escapes these so responses can be embedded in <script> tags
+LINE_SEPARATORS = ((b'\xe2\x80\xa8', b'\\u2028'), (b'\xe2\x80\xa9', b'\\u2029'))
+
+
+def has_non_finite(data):
+    """Whether ``data`` holds a NaN or infinite float or Decimal anywhere."""
+    stack = [data]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, float):
+            if not math.isfinite(value):
+                return True
+        elif isinstance(value, Decimal):
+            if not value.is_finite():
+                return True
+        elif isinstance(value, dict):
+            stack.extend(value.values())
+        elif isinstance(value, (list, tuple)):
+            stack.extend(value)
+    return False
+
+
+def encode_default(obj):
+    if isinstance(obj, CloudinaryResource):
+        from accounts.uploads import image_url
+
+        return image_url(obj)
+    return _encoder.default(obj)
+
+
+# -------------------------
+# orjson
+# -------------------------
+class ORJSONRenderer(JSONRenderer):
+    """
+    Falls back to DRF's renderer for output orjson can't reproduce: indented
+    (browsable API) or ASCII-only JSON, values orjson rejects, and NaN or
+    infinite numbers, which orjson writes as null where DRF raises (or
+    writes NaN with STRICT_JSON off). The data is only searched for those
+    when the output has a null.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        renderer_context = renderer_context or {}
+        if self.get_indent(accepted_media_type, renderer_context) or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=encode_default, option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        if b'null' in ret and has_non_finite(data):
+            return super().render(data, accepted_media_type, renderer_context)
+        for raw, escaped in LINE_SEPARATORS:
+            if raw in ret:
+                ret = ret.replace(raw, escaped)
+        return ret
+
+
+class ORJSONParser(JSONParser):
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', 'utf-8')
+        if encoding.lower().replace('-', '') != 'utf8':
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % exc)
+
+
+# -------------------------
+# MessagePack
+# -------------------------
+class MessagePackRenderer(BaseRenderer):
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=encode_default, use_bin_type=True)
+
+
+class MessagePackParser(BaseParser):
+    media_type = 'application/msgpack'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), raw=False)
+        except (ValueError, msgpack.UnpackException) as exc:
+            raise ParseError('MessagePack parse error - %s' % exc)
@@ -2,8 +2,8 @@ from datetime import timedelta
 from pathlib import Path
 from dotenv import load_dotenv
 import os
-import cloudinary
 import importlib
+import importlib.util
 
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -60,13 +60,17 @@ INSTALLED_APPS = [
     'drf_yasg',
     'rest_framework',
     'rest_framework_simplejwt',
-    'debug_toolbar',
+    # Refresh tokens can be revoked: logout, and suspension (admin_api/moderation.py)
+    'rest_framework_simplejwt.token_blacklist',
     'django_filters',
     'corsheaders',
     'accounts',
     'blood_requests',
     'admin_api',
     'notifications',
+    'donation',
+    'sync',
+    'inventory',
 
 ]
 
@@ -76,11 +80,30 @@ if USE_WHITENOISE:
 AUTH_USER_MODEL = 'accounts.User'
 
 
+# Optional fast encoders (hemogrid.renderers): orjson for JSON, msgpack for the mobile app
+USE_ORJSON = importlib.util.find_spec("orjson") is not None
+USE_MSGPACK = importlib.util.find_spec("msgpack") is not None
+
+RENDERER_CLASSES = [
+    'hemogrid.renderers.ORJSONRenderer' if USE_ORJSON else 'rest_framework.renderers.JSONRenderer',
+    'rest_framework.renderers.BrowsableAPIRenderer',
+]
+PARSER_CLASSES = [
+    'hemogrid.renderers.ORJSONParser' if USE_ORJSON else 'rest_framework.parsers.JSONParser',
+    'rest_framework.parsers.FormParser',
+    'rest_framework.parsers.MultiPartParser',
+]
+if USE_MSGPACK:
+    RENDERER_CLASSES.append('hemogrid.renderers.MessagePackRenderer')
+    PARSER_CLASSES.append('hemogrid.renderers.MessagePackParser')
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework_simplejwt.authentication.JWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
+    'DEFAULT_RENDERER_CLASSES': RENDERER_CLASSES,
+    'DEFAULT_PARSER_CLASSES': PARSER_CLASSES,
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
 }
@@ -96,9 +119,9 @@ SIMPLE_JWT = {
 
 
 MIDDLEWARE = [
+    'hemogrid.metrics.MetricsMiddleware',
     "corsheaders.middleware.CorsMiddleware",
     'django.middleware.security.SecurityMiddleware',
-    'debug_toolbar.middleware.DebugToolbarMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -107,12 +130,114 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# The toolbar is only routed in DEBUG (hemogrid/urls.py); don't load it otherwise
+if DEBUG:
+    INSTALLED_APPS.append('debug_toolbar')
+    MIDDLEWARE.insert(MIDDLEWARE.index('django.middleware.security.SecurityMiddleware') + 1,
+                      'debug_toolbar.middleware.DebugToolbarMiddleware')
+
 if USE_WHITENOISE:
     insertion_index = MIDDLEWARE.index('django.middleware.security.SecurityMiddleware') + 1 if 'django.middleware.security.SecurityMiddleware' in MIDDLEWARE else 1
     MIDDLEWARE.insert(insertion_index, "whitenoise.middleware.WhiteNoiseMiddleware")
 
 ROOT_URLCONF = 'hemogrid.urls'
 
+# Metrics: each gunicorn worker dumps its counters here so /metrics can sum them
+METRICS_MULTIPROC_DIR = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+METRICS_FLUSH_INTERVAL = 1.0
+
+# Admin batch moderation: users per UPDATE, and the most one request may touch
+ADMIN_BATCH_CHUNK_SIZE = 500
+ADMIN_BATCH_MAX_USERS = 10000
+
+# Rows fetched per cursor round trip (and per streamed chunk) by admin exports
+EXPORT_CHUNK_SIZE = 2000
+
+# Most blood requests a hospital may submit in one bulk call
+BLOOD_REQUEST_BULK_MAX = 100
+
+# Donor dispatch waves (blood_requests/dispatch.py): donors per wave (the last
+# size repeats, None = everyone left), seconds to wait between waves, and
+# seconds between looks for newly eligible donors once everyone was asked
+DISPATCH_WAVE_SIZES = [10, 25, 50, None]
+DISPATCH_WAVE_WINDOWS = {'high': 5 * 60, 'medium': 15 * 60, 'low': 30 * 60}
+DISPATCH_RECHECK_INTERVAL = 6 * 60 * 60
+DISPATCH_POLL_INTERVAL = 30
+DONATION_INTERVAL_DAYS = 90
+
+# Blood request events (blood_requests/events.py) inserted per batch by
+# paths that move many requests at once
+BLOOD_REQUEST_EVENT_BATCH_SIZE = 500
+
+# Seconds between runs of expire_blood_requests (blood_requests/expiry.py),
+# which closes requests past their expires_at
+BLOOD_REQUEST_EXPIRY_INTERVAL = 60
+
+# Seconds between runs of release_deferred_donors (accounts/availability.py),
+# which returns donors to available once DONATION_INTERVAL_DAYS have passed
+AVAILABILITY_RELEASE_INTERVAL = 60 * 60
+
+# Compatible-request feed (blood_requests/compatibility.py): requests per
+# (blood group, region) bucket and how long a bucket is cached
+COMPATIBLE_FEED_SIZE = 100
+COMPATIBLE_FEED_CACHE_SECONDS = 60
+COMPATIBLE_FEED_CACHE = 'default'
+
+# Per-donor notification limits (notifications/throttle.py); None disables a rule
+NOTIFICATION_DAILY_LIMIT = 5
+NOTIFICATION_DEDUP_WINDOW = 6 * 60 * 60
+NOTIFICATION_THROTTLE_CACHE = 'default'
+
+# Hospital stock (inventory/): stock rows tried per new request before donors
+# are notified
+INVENTORY_ALLOCATION_CANDIDATES = 5
+
+# Email digests of unread notifications (manage.py send_notification_digests)
+NOTIFICATION_DIGEST_DEFAULT_FREQUENCY = 'daily'
+NOTIFICATION_DIGEST_MAX_ITEMS = 20
+
+# Change feed (sync/): changes per page (and the most a client may ask for),
+# change ids checked for gaps per page, seconds a gap in the change ids is
+# waited on before it's taken as a rolled-back insert, and days of changes
+# kept by manage.py prune_sync_changes
+SYNC_PAGE_SIZE = 200
+SYNC_MAX_PAGE_SIZE = 1000
+SYNC_SCAN_WINDOW = 5000
+SYNC_GAP_SECONDS = 60
+SYNC_RETENTION_DAYS = 30
+
+# Payment gateway (donation/gateway.py). Use donation.gateway.StubGateway offline.
+PAYMENT_GATEWAY_BACKEND = os.getenv('PAYMENT_GATEWAY_BACKEND', 'donation.gateway.SSLCommerzGateway')
+SSLCOMMERZ_STORE_ID = os.getenv('SSLCOMMERZ_STORE_ID', 'hemog68c429fc47f4e')
+SSLCOMMERZ_STORE_PASS = os.getenv('SSLCOMMERZ_STORE_PASS', 'hemog68c429fc47f4e@ssl')
+SSLCOMMERZ_SANDBOX = os.getenv('SSLCOMMERZ_SANDBOX', 'True') == 'True'
+# (connect, read) seconds for gateway calls
+PAYMENT_GATEWAY_TIMEOUT = (3.05, 15)
+# How long an unpaid session's gateway URL is handed back to retries, and
+# for how long after that IPNs and reconcile_payments still look for a late payment
+PAYMENT_SESSION_TTL = 30 * 60
+PAYMENT_EXPIRED_RECHECK_WINDOW = 24 * 60 * 60
+PAYMENT_SUCCESS_URL = os.getenv('PAYMENT_SUCCESS_URL', 'https://yourdomain.com/donation/success/')
+PAYMENT_FAIL_URL = os.getenv('PAYMENT_FAIL_URL', 'https://yourdomain.com/donation/fail/')
+PAYMENT_CANCEL_URL = os.getenv('PAYMENT_CANCEL_URL', 'https://yourdomain.com/donation/cancel/')
+
+# The default cache holds state every process must agree on (notification
+# budgets, compatible-feed buckets), so deployments with more than one
+# process set CACHE_URL to a shared server: redis://host:6379/0 or
+# memcached://host:11211. Without it each process gets its own in-memory
+# cache, which is only right for development and tests. Both are
+# instrumented for /metrics.
+CACHE_URL = os.getenv('CACHE_URL', '')
+if CACHE_URL.startswith(('redis://', 'rediss://')):
+    CACHES = {'default': {'BACKEND': 'hemogrid.metrics.InstrumentedRedisCache', 'LOCATION': CACHE_URL}}
+elif CACHE_URL.startswith('memcached://'):
+    CACHES = {'default': {
+        'BACKEND': 'hemogrid.metrics.InstrumentedPyMemcacheCache',
+        'LOCATION': CACHE_URL[len('memcached://'):],
+    }}
+else:
+    CACHES = {'default': {'BACKEND': 'hemogrid.metrics.InstrumentedLocMemCache'}}
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -193,17 +318,24 @@ AUTH_PASSWORD_VALIDATORS = [
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
 
-# Configuration for cloudinary storage      
-cloudinary.config(
-    cloud_name=os.getenv('cloud_name'),
-    api_key=os.getenv('cloudinary_api_key'),
-    api_secret=os.getenv('api_secret'),
-    secure=True
-)
+# Configuration for cloudinary storage; applied by AccountsConfig.ready() so
+# importing settings doesn't load the SDK
+CLOUDINARY_CONFIG = {
+    'cloud_name': os.getenv('cloud_name'),
+    'api_key': os.getenv('cloudinary_api_key'),
+    'api_secret': os.getenv('api_secret'),
+    'secure': True,
+}
 
 # Media Storage
 DEFAULT_FILE_STORAGE = 'cloudinary_storage.storage.MediaCloudinaryStorage'
 
+# Direct (signed) profile picture uploads; use accounts.uploads.LocalStubUploadBackend offline
+PROFILE_PICTURE_UPLOAD_BACKEND = os.getenv(
+    'PROFILE_PICTURE_UPLOAD_BACKEND', 'accounts.uploads.CloudinaryUploadBackend'
+)
+PROFILE_PICTURE_THUMBNAIL = {'width': 150, 'height': 150, 'crop': 'fill', 'gravity': 'face'}
+
 LANGUAGE_CODE = 'en-us'
 
 TIME_ZONE = 'UTC'
@@ -0,0 +1,219 @@
+import json
+import os
+import runpy
+import tempfile
+import uuid
+from datetime import date, datetime, time, timezone as dt_timezone
+from decimal import Decimal
+from io import BytesIO
+from unittest import mock, skipUnless
+
+from cloudinary import CloudinaryResource
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from django.utils.translation import gettext_lazy
+from rest_framework import status
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+from django.conf import settings
+from django.contrib.auth import get_user_model
+
+from . import metrics, renderers
+
+User = get_user_model()
+
+
+class MetricsTests(APITestCase):
+    def setUp(self):
+        metrics.registry.reset()
+        self.admin = User.objects.create_user(
+            email="admin@example.com", password="StrongPass!234", role="admin", is_active=True, is_verified=True,
+        )
+
+    def test_metrics_require_admin(self):
+        response = self.client.get(reverse("metrics"))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        donor = User.objects.create_user(email="donor@example.com", password="StrongPass!234")
+        self.client.force_authenticate(donor)
+        response = self.client.get(reverse("metrics"))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_records_latency_queries_and_cache_per_view(self):
+        self.client.force_authenticate(self.admin)
+        self.client.get(reverse("my-requests"))
+        cache.get("metrics-test-miss")
+
+        response = self.client.get(reverse("metrics"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response["Content-Type"].startswith("text/plain; version=0.0.4"))
+        body = response.content.decode()
+        self.assertIn('hemogrid_http_requests_total{method="GET",status="200",view="my-requests"} 1', body)
+        self.assertIn('hemogrid_http_request_duration_seconds_count{view="my-requests"} 1', body)
+        self.assertIn('hemogrid_db_queries_total{view="my-requests"}', body)
+        self.assertIn('hemogrid_cache_misses_total{view="-"} 1', body)
+
+    def test_sums_snapshots_from_other_workers(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(METRICS_MULTIPROC_DIR=directory):
+            other_worker = {
+                "counters": [["hemogrid_http_requests_total",
+                              [["method", "GET"], ["status", "200"], ["view", "blood-request-list"]], 4]],
+                "histograms": [],
+            }
+            with open(os.path.join(directory, "metrics-1.json"), "w") as fh:
+                json.dump(other_worker, fh)
+
+            self.client.force_authenticate(self.admin)
+            self.client.get(reverse("blood-request-list"))
+            body = self.client.get(reverse("metrics")).content.decode()
+
+        self.assertIn('hemogrid_http_requests_total{method="GET",status="200",view="blood-request-list"} 5', body)
+
+    def test_counts_every_cache_lookup_once(self):
+        cache.set("metrics-test-hit", 1)
+        cache.get_many(["metrics-test-hit", "metrics-test-miss"])
+        cache.has_key("metrics-test-miss")
+        cache.get_or_set("metrics-test-hit", 2)
+
+        counters, _ = metrics.collect()
+        self.assertEqual(counters[("hemogrid_cache_hits_total", (("view", "-"),))], 2)
+        self.assertEqual(counters[("hemogrid_cache_misses_total", (("view", "-"),))], 2)
+
+    def test_exited_workers_are_folded_into_one_file(self):
+        snapshot = {"counters": [["hemogrid_db_queries_total", [["view", "x"]], 3]], "histograms": []}
+        with tempfile.TemporaryDirectory() as directory:
+            for pid in (101, 102):
+                with open(os.path.join(directory, f"metrics-{pid}.json"), "w") as fh:
+                    json.dump(snapshot, fh)
+                metrics.retire(directory, pid)
+            metrics.retire(directory, 103)
+
+            self.assertEqual(os.listdir(directory), [metrics.RETIRED_FILE])
+            counters, _ = metrics.merge(metrics.read_snapshots(directory))
+        self.assertEqual(counters[("hemogrid_db_queries_total", (("view", "x"),))], 6)
+
+
+class GunicornConfigTests(SimpleTestCase):
+    def load(self, **env):
+        with mock.patch.dict(os.environ, env):
+            return runpy.run_path(os.path.join(settings.BASE_DIR, "gunicorn.conf.py"))
+
+    def test_profiles_size_workers_from_cpus(self):
+        tune = self.load()["tune"]
+        self.assertEqual(tune("sync", 4, None, {}), {
+            "worker_class": "sync", "wsgi_app": "hemogrid.wsgi:app", "workers": 9, "threads": 1,
+        })
+        gthread = tune("gthread", 4, None, {"GUNICORN_THREADS": "8"})
+        self.assertEqual((gthread["workers"], gthread["threads"]), (5, 8))
+        uvicorn = tune("uvicorn", 4, None, {})
+        self.assertEqual((uvicorn["workers"], uvicorn["wsgi_app"]), (4, "hemogrid.asgi:application"))
+
+    def test_memory_caps_workers_and_env_overrides(self):
+        tune = self.load()["tune"]
+        self.assertEqual(tune("sync", 8, 256 + 3 * 150, {})["workers"], 3)
+        self.assertEqual(tune("sync", 8, 100, {})["workers"], 1)
+        self.assertEqual(tune("sync", 8, 256 + 3 * 150, {"WEB_CONCURRENCY": "6"})["workers"], 6)
+        self.assertEqual(tune("sync", 8, None, {"GUNICORN_WORKERS": "2", "WEB_CONCURRENCY": "6"})["workers"], 2)
+        with self.assertRaises(ValueError):
+            tune("gevent", 8, None, {})
+
+    def test_exiting_worker_flushes_unwritten_counts(self):
+        hooks = self.load()
+        with tempfile.TemporaryDirectory() as directory, override_settings(METRICS_MULTIPROC_DIR=directory):
+            metrics.registry.inc("hemogrid_test_exit_total", {"view": "x"})
+            metrics.flush(force=True)
+            # Counted after the last flush, inside the throttle interval
+            metrics.registry.inc("hemogrid_test_exit_total", {"view": "x"})
+            metrics.flush()
+
+            worker = mock.Mock(pid=os.getpid())
+            with mock.patch.dict(os.environ, {"PROMETHEUS_MULTIPROC_DIR": directory}):
+                hooks["worker_exit"](mock.Mock(), worker)
+                hooks["child_exit"](mock.Mock(), worker)
+            counters, _ = metrics.merge(metrics.read_snapshots(directory))
+        self.assertEqual(counters[("hemogrid_test_exit_total", (("view", "x"),))], 2)
+
+    def test_profile_selected_by_env(self):
+        config = self.load(GUNICORN_PROFILE="gthread", GUNICORN_THREADS="3")
+        self.assertEqual((config["worker_class"], config["threads"]), ("gthread", 3))
+        self.assertNotIn("worker_connections", config)
+
+
+class RendererTests(APITestCase):
+    payload = {
+        "created_at": datetime(2024, 5, 1, 9, 30, 15, 123456, tzinfo=dt_timezone.utc),
+        "naive": datetime(2024, 5, 1, 9, 30),
+        "day": date(2024, 5, 1),
+        "at": time(14, 5),
+        "amount": Decimal("500.50"),
+        "id": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+        "label": gettext_lazy("Donation"),
+        "groups": ("O+", "A-"),
+        "counts": {1: 2},
+        "text": "রক্ত\u2028দান",
+        "rows": [{"nested": None, "flag": True, "ratio": 0.25}],
+    }
+
+    @skipUnless(renderers.orjson, "orjson is not installed")
+    def test_orjson_matches_drf_json_bytes(self):
+        self.assertEqual(renderers.ORJSONRenderer().render(self.payload), JSONRenderer().render(self.payload))
+        # Indented output (browsable API) is left to DRF
+        context = {"indent": 4}
+        self.assertEqual(
+            renderers.ORJSONRenderer().render(self.payload, renderer_context=context),
+            JSONRenderer().render(self.payload, renderer_context=context),
+        )
+
+    @skipUnless(renderers.orjson, "orjson is not installed")
+    def test_orjson_rejects_non_finite_numbers_like_drf(self):
+        for value in (float("nan"), float("inf"), Decimal("-Infinity")):
+            payload = {"rows": [{"nested": None, "ratio": value}]}
+            with self.assertRaises(ValueError):
+                JSONRenderer().render(payload)
+            with self.assertRaises(ValueError):
+                renderers.ORJSONRenderer().render(payload)
+
+        lenient_drf, lenient = JSONRenderer(), renderers.ORJSONRenderer()
+        lenient_drf.strict = lenient.strict = False
+        payload = {"ratio": float("nan"), "missing": None}
+        self.assertEqual(lenient.render(payload), lenient_drf.render(payload))
+
+    @skipUnless(renderers.orjson, "orjson is not installed")
+    @override_settings(PROFILE_PICTURE_UPLOAD_BACKEND="accounts.uploads.LocalStubUploadBackend")
+    def test_cloudinary_resources_render_as_urls(self):
+        resource = CloudinaryResource("profile_pictures/user_1_abc", version="3", format="jpg",
+                                      type="upload", resource_type="image")
+        rendered = json.loads(renderers.ORJSONRenderer().render({"picture": resource}))
+        self.assertEqual(rendered, {"picture": "/media/profile_pictures/user_1_abc.jpg"})
+
+    @skipUnless(renderers.orjson, "orjson is not installed")
+    def test_orjson_parser(self):
+        parser = renderers.ORJSONParser()
+        self.assertEqual(parser.parse(BytesIO('{"name": "রক্ত", "n": [1, 2.5]}'.encode())), {"name": "রক্ত", "n": [1, 2.5]})
+        with self.assertRaises(ParseError):
+            parser.parse(BytesIO(b'{"name": '))
+
+    @skipUnless(renderers.msgpack, "msgpack is not installed")
+    def test_msgpack_round_trip(self):
+        # Map keys stay as they are (JSON would turn them into strings)
+        payload = {key: value for key, value in self.payload.items() if key != "counts"}
+        packed = renderers.MessagePackRenderer().render(payload)
+        parsed = renderers.MessagePackParser().parse(BytesIO(packed))
+        self.assertEqual(parsed, json.loads(JSONRenderer().render(payload)))
+        with self.assertRaises(ParseError):
+            renderers.MessagePackParser().parse(BytesIO(b"\xc1"))
+
+    @skipUnless(renderers.msgpack, "msgpack is not installed")
+    def test_msgpack_selected_by_accept_header(self):
+        response = self.client.get(reverse("api-home"), HTTP_ACCEPT="application/msgpack")
+        self.assertEqual(response["Content-Type"], "application/msgpack")
+        self.assertEqual(renderers.msgpack.unpackb(response.content), response.data)
+
+    def test_json_stays_the_default(self):
+        response = self.client.get(reverse("api-home"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertEqual(response.content, JSONRenderer().render(response.data))
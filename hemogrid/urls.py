@@ -5,32 +5,51 @@ from django.conf.urls.static import static
 from rest_framework import permissions
 from django.views.generic import RedirectView
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
-from drf_yasg.views import get_schema_view
-from drf_yasg import openapi
 from django.http import JsonResponse
-from rest_framework.request import Request
-from rest_framework.test import APIRequestFactory
-try:
-   from rest_framework.schemas.openapi import SchemaGenerator as DRFSchemaGenerator
-except Exception:
-   DRFSchemaGenerator = None
+from functools import lru_cache
 import logging
+from .metrics import MetricsView
 
 
 logger = logging.getLogger(__name__)
 
-schema_view = get_schema_view(
-   openapi.Info(
-      title="Hemogird: A Blood Donation & Request Management System",
-      default_version='v1',
-      description=" HemoGrid is a RESTful Blood Donation & Request Management System designed to facilitate seamless communication between blood donors and recipients.",
-      terms_of_service="https://www.google.com/policies/terms/",
-      contact=openapi.Contact(email="m.zaman.djp@gmail.com"),
-      license=openapi.License(name="LICENSE"),
-   ),
-   public=True,
-   permission_classes=(permissions.AllowAny,),
-)
+SCHEMA_TITLE = "Hemogird: A Blood Donation & Request Management System"
+
+
+# The schema/doc tooling (drf-yasg, DRF's OpenAPI generator and its test
+# request factory) is imported on first use rather than with the URLConf,
+# which every worker and management command loads during system checks.
+@lru_cache(maxsize=None)
+def get_yasg_schema_view():
+   from drf_yasg import openapi
+   from drf_yasg.views import get_schema_view
+
+   return get_schema_view(
+      openapi.Info(
+         title=SCHEMA_TITLE,
+         default_version='v1',
+         description=" HemoGrid is a RESTful Blood Donation & Request Management System designed to facilitate seamless communication between blood donors and recipients.",
+         terms_of_service="https://www.google.com/policies/terms/",
+         contact=openapi.Contact(email="m.zaman.djp@gmail.com"),
+         license=openapi.License(name="LICENSE"),
+      ),
+      public=True,
+      permission_classes=(permissions.AllowAny,),
+   )
+
+
+def drf_openapi_schema():
+   """OpenAPI schema from DRF's built-in generator, or None if it is unavailable."""
+   try:
+      from rest_framework.schemas.openapi import SchemaGenerator as DRFSchemaGenerator
+   except Exception:
+      return None
+   from rest_framework.request import Request
+   from rest_framework.test import APIRequestFactory
+
+   drf_req = Request(APIRequestFactory().get('/'))
+   generator = DRFSchemaGenerator(title=SCHEMA_TITLE, version="v1", urlconf='api_schema_urls')
+   return generator.get_schema(request=drf_req, public=True)
 
 
 def safe_swagger_view(request):
@@ -41,24 +60,17 @@ def safe_swagger_view(request):
    if fmt == 'openapi':
       try:
          # Prefer DRF's built-in OpenAPI generator to avoid drf-yasg introspection issues
-         if DRFSchemaGenerator is not None:
-            factory = APIRequestFactory()
-            drf_req = Request(factory.get('/'))
-            generator = DRFSchemaGenerator(
-               title="Hemogird: A Blood Donation & Request Management System",
-               version="v1",
-               urlconf='api_schema_urls',
-            )
-            schema = generator.get_schema(request=drf_req, public=True)
+         schema = drf_openapi_schema()
+         if schema is not None:
             return JsonResponse(schema)
          # Fallback to drf-yasg's generator if DRF one is unavailable
-         return schema_view.without_ui(cache_timeout=0)(request)
+         return get_yasg_schema_view().without_ui(cache_timeout=0)(request)
       except Exception as exc:
          logger.exception("Swagger schema generation failed; returning minimal schema: %s", exc)
          fallback = {
             "openapi": "3.0.0",
             "info": {
-               "title": "Hemogird: A Blood Donation & Request Management System",
+               "title": SCHEMA_TITLE,
                "version": "v1",
                "description": "HemoGrid API schema (fallback)",
                "termsOfService": "https://www.google.com/policies/terms/",
@@ -69,33 +81,26 @@ def safe_swagger_view(request):
          }
          return JsonResponse(fallback)
    # No format param: return the UI page
-   return schema_view.with_ui('swagger', cache_timeout=0)(request)
+   return get_yasg_schema_view().with_ui('swagger', cache_timeout=0)(request)
 
 
 def safe_redoc_view(request):
    fmt = request.GET.get('format')
    if fmt == 'openapi':
       try:
-         if DRFSchemaGenerator is not None:
-            factory = APIRequestFactory()
-            drf_req = Request(factory.get('/'))
-            generator = DRFSchemaGenerator(
-               title="Hemogird: A Blood Donation & Request Management System",
-               version="v1",
-               urlconf='api_schema_urls',
-            )
-            schema = generator.get_schema(request=drf_req, public=True)
+         schema = drf_openapi_schema()
+         if schema is not None:
             return JsonResponse(schema)
-         return schema_view.without_ui(cache_timeout=0)(request)
+         return get_yasg_schema_view().without_ui(cache_timeout=0)(request)
       except Exception as exc:
          logger.exception("ReDoc schema generation failed; returning minimal schema: %s", exc)
          fallback = {
             "openapi": "3.0.0",
-            "info": {"title": "Hemogird: A Blood Donation & Request Management System", "version": "v1"},
+            "info": {"title": SCHEMA_TITLE, "version": "v1"},
             "paths": {},
          }
          return JsonResponse(fallback)
-   return schema_view.with_ui('redoc', cache_timeout=0)(request)
+   return get_yasg_schema_view().with_ui('redoc', cache_timeout=0)(request)
 
 
 urlpatterns = [
@@ -131,6 +136,15 @@ urlpatterns = [
    path('api-auth/', include('rest_framework.urls')),
 
    path('api/donation/', include('donation.urls')),
+
+   # Hospital blood stock
+   path('api/inventory/', include('inventory.urls')),
+
+   # Change feed for incremental client sync
+   path('api/sync/', include('sync.urls')),
+
+   # Prometheus metrics (admin only)
+   path('metrics/', MetricsView.as_view(), name='metrics'),
 ]
 
 if settings.DEBUG:
@@ -0,0 +1,18 @@
+from django.contrib import admin
+from .models import BloodStock, StockReservation
+
+
+@admin.register(BloodStock)
+class BloodStockAdmin(admin.ModelAdmin):
+    list_display = ('id', 'hospital', 'blood_group', 'available', 'reserved', 'updated_at')
+    search_fields = ('hospital__email', 'hospital__full_name')
+    list_filter = ('blood_group',)
+    # Stock changes go through inventory.stock so they stay atomic
+    readonly_fields = ('available', 'reserved')
+
+
+@admin.register(StockReservation)
+class StockReservationAdmin(admin.ModelAdmin):
+    list_display = ('id', 'stock', 'blood_request', 'quantity', 'status', 'created_at', 'closed_at')
+    list_filter = ('status',)
+    ordering = ('-created_at',)
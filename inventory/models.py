@@ -0,0 +1,55 @@
+from django.conf import settings
+from django.db import models
+
+from blood_requests.models import BloodRequest
+
+
+class BloodStock(models.Model):
+    """
+    Units of one blood group held by a hospital. Only changed through
+    inventory.stock, with single conditional UPDATEs.
+    """
+    hospital = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='blood_stock')
+    blood_group = models.CharField(max_length=3, choices=BloodRequest.BLOOD_GROUP_CHOICES)
+    # Free to reserve / held for open requests
+    available = models.PositiveIntegerField(default=0)
+    reserved = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['hospital', 'blood_group'], name='stock_hospital_group_uniq'),
+        ]
+        indexes = [
+            # Stock that can cover a request: blood_group = %s AND available >= %s
+            models.Index(fields=['blood_group', 'available'], name='stock_group_available_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.hospital.email} {self.blood_group}: {self.available} available, {self.reserved} reserved"
+
+
+class StockReservation(models.Model):
+    HELD = 'held'
+    RELEASED = 'released'
+    FULFILLED = 'fulfilled'
+    STATUS_CHOICES = [
+        (HELD, 'Held'),
+        (RELEASED, 'Released'),
+        (FULFILLED, 'Fulfilled'),
+    ]
+
+    stock = models.ForeignKey(BloodStock, on_delete=models.PROTECT, related_name='reservations')
+    blood_request = models.ForeignKey(BloodRequest, on_delete=models.CASCADE, related_name='stock_reservations')
+    quantity = models.PositiveIntegerField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=HELD)
+    created_at = models.DateTimeField(auto_now_add=True)
+    closed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['blood_request', 'status'], name='reservation_request_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity} x {self.stock.blood_group} for request {self.blood_request_id} ({self.status})"
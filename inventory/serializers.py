@@ -0,0 +1,43 @@
+from rest_framework import serializers
+
+from blood_requests.models import BloodRequest
+from .models import BloodStock, StockReservation
+
+# Units moved by one adjustment; keeps stock counts well inside a 32-bit integer column
+MAX_DELTA = 10000
+
+
+class BloodStockSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = BloodStock
+        fields = ['id', 'blood_group', 'available', 'reserved', 'updated_at']
+
+
+class StockAdjustSerializer(serializers.Serializer):
+    blood_group = serializers.ChoiceField(choices=BloodRequest.BLOOD_GROUP_CHOICES)
+    # Positive to add received units, negative to take out used or expired ones
+    delta = serializers.IntegerField(min_value=-MAX_DELTA, max_value=MAX_DELTA)
+
+    def validate_delta(self, value):
+        if value == 0:
+            raise serializers.ValidationError("Must not be zero.")
+        return value
+
+
+class StockAvailabilitySerializer(serializers.ModelSerializer):
+    hospital_id = serializers.ReadOnlyField()
+    hospital_name = serializers.ReadOnlyField(source='hospital.full_name')
+    address = serializers.ReadOnlyField(source='hospital.address')
+
+    class Meta:
+        model = BloodStock
+        fields = ['hospital_id', 'hospital_name', 'address', 'blood_group', 'available']
+
+
+class StockReservationSerializer(serializers.ModelSerializer):
+    blood_group = serializers.ReadOnlyField(source='stock.blood_group')
+    location = serializers.ReadOnlyField(source='blood_request.location')
+
+    class Meta:
+        model = StockReservation
+        fields = ['id', 'blood_request', 'blood_group', 'quantity', 'status', 'location', 'created_at', 'closed_at']
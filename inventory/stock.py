@@ -0,0 +1,175 @@
+"""
+Atomic stock operations.
+
+Every change to a BloodStock row is one UPDATE with F() expressions, guarded
+in its WHERE clause (``available >= n`` before taking units, ``status =
+'held'`` before closing a reservation). Concurrent callers never read a
+count and write it back, so stock can't be oversold or double-released,
+whatever the isolation level. An UPDATE that matches no row means the guard
+failed.
+
+``allocate`` is the entry point for new requests: before any donor is
+notified it tries to reserve the whole quantity from one hospital's stock,
+the requester's own first, then hospitals whose address matches the
+request's location.
+"""
+import operator
+from functools import reduce
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Q, Value, When
+from django.utils import timezone
+
+from blood_requests.dispatch import location_terms
+from blood_requests.events import record as record_event
+from notifications.models import Notification
+from .models import BloodStock, StockReservation
+
+DEFAULT_CANDIDATES = 5
+
+
+def get_candidate_limit():
+    return getattr(settings, 'INVENTORY_ALLOCATION_CANDIDATES', DEFAULT_CANDIDATES)
+
+
+# -------------------------
+# Stock levels
+# -------------------------
+def add_units(hospital, blood_group, units):
+    """Put ``units`` into a hospital's available stock; returns the stock row."""
+    stock, _ = BloodStock.objects.get_or_create(hospital=hospital, blood_group=blood_group)
+    BloodStock.objects.filter(pk=stock.pk).update(available=F('available') + units, updated_at=timezone.now())
+    stock.refresh_from_db(fields=['available', 'reserved', 'updated_at'])
+    return stock
+
+
+def remove_units(hospital, blood_group, units):
+    """Take ``units`` out of available stock (used, expired); False if fewer are available."""
+    return BloodStock.objects.filter(
+        hospital=hospital, blood_group=blood_group, available__gte=units,
+    ).update(available=F('available') - units, updated_at=timezone.now()) == 1
+
+
+# -------------------------
+# Reservations
+# -------------------------
+def reserve(stock_id, blood_request, quantity):
+    """Hold ``quantity`` units of a stock row for ``blood_request``; None if too few are available."""
+    with transaction.atomic():
+        taken = BloodStock.objects.filter(pk=stock_id, available__gte=quantity).update(
+            available=F('available') - quantity,
+            reserved=F('reserved') + quantity,
+            updated_at=timezone.now(),
+        )
+        if not taken:
+            return None
+        return StockReservation.objects.create(stock_id=stock_id, blood_request=blood_request, quantity=quantity)
+
+
+def close(reservation, outcome):
+    """
+    Release a held reservation back to available stock, or mark it fulfilled
+    (the units left with the patient). False if it was no longer held.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        closed = StockReservation.objects.filter(pk=reservation.pk, status=StockReservation.HELD).update(
+            status=outcome, closed_at=now,
+        )
+        if not closed:
+            return False
+        changes = {'reserved': F('reserved') - reservation.quantity, 'updated_at': now}
+        if outcome == StockReservation.RELEASED:
+            changes['available'] = F('available') + reservation.quantity
+        BloodStock.objects.filter(pk=reservation.stock_id).update(**changes)
+    return True
+
+
+def close_for_requests(blood_request_ids, outcome):
+    """Close every held reservation of the given requests; returns how many were closed."""
+    held = StockReservation.objects.filter(blood_request_id__in=blood_request_ids, status=StockReservation.HELD)
+    return sum(close(reservation, outcome) for reservation in held)
+
+
+def release_for_requests(blood_request_ids):
+    return close_for_requests(blood_request_ids, StockReservation.RELEASED)
+
+
+def fulfil_for_requests(blood_request_ids):
+    return close_for_requests(blood_request_ids, StockReservation.FULFILLED)
+
+
+# -------------------------
+# Allocation of new requests
+# -------------------------
+def candidate_stock(blood_requests):
+    """
+    Stock rows that could cover any of ``blood_requests``, grouped by blood
+    group: {blood group: [row, ...]}. One query for the whole batch; each
+    request picks its own candidates from it with ``ranked_candidates``.
+    """
+    own = Q(hospital_id__in={blood_request.requester_id for blood_request in blood_requests})
+    terms = {term for blood_request in blood_requests for term in location_terms(blood_request.location)}
+    nearby = [Q(hospital__address__icontains=term) for term in terms]
+    rows = BloodStock.objects.filter(
+        reduce(operator.or_, nearby, own),
+        blood_group__in={blood_request.blood_group for blood_request in blood_requests},
+        available__gte=min(blood_request.quantity for blood_request in blood_requests),
+        hospital__is_active=True,
+    ).values('pk', 'hospital_id', 'blood_group', 'available', 'hospital__address')
+    grouped = {}
+    for row in rows:
+        grouped.setdefault(row['blood_group'], []).append(row)
+    return grouped
+
+
+def ranked_candidates(blood_request, rows):
+    """Of ``rows`` (one blood group's stock), those that could cover all of ``blood_request``, best first."""
+    terms = [term.casefold() for term in location_terms(blood_request.location)]
+
+    def is_candidate(row):
+        if row['available'] < blood_request.quantity:
+            return False
+        address = (row['hospital__address'] or '').casefold()
+        return row['hospital_id'] == blood_request.requester_id or any(term in address for term in terms)
+
+    return sorted(
+        filter(is_candidate, rows),
+        key=lambda row: (row['hospital_id'] != blood_request.requester_id, -row['available'], row['pk']),
+    )[:get_candidate_limit()]
+
+
+def allocate(blood_requests):
+    """
+    Reserve stock for each pending request that some nearby hospital can
+    cover; those become 'accepted' and inactive so dispatch, the request list
+    and donor acceptance all skip them. Returns the reservations made.
+    """
+    pending = [blood_request for blood_request in blood_requests if blood_request.status == 'pending']
+    if not pending:
+        return []
+    stock = candidate_stock(pending)
+    reservations = []
+    for blood_request in pending:
+        for row in ranked_candidates(blood_request, stock.get(blood_request.blood_group, [])):
+            # Another request may have taken the units since the lookup; try the next
+            with transaction.atomic():
+                reservation = reserve(row['pk'], blood_request, blood_request.quantity)
+                if reservation is None:
+                    row['available'] = 0
+                    continue
+                record_event(blood_request, 'accepted', to_status='accepted')
+                blood_request.status = 'accepted'
+                blood_request.is_active = False
+                blood_request.save(update_fields=['status', 'is_active', 'updated_at'])
+            row['available'] -= blood_request.quantity
+            if row['hospital_id'] != blood_request.requester_id:
+                Notification.objects.create(
+                    recipient_id=row['hospital_id'], blood_request=blood_request,
+                    message=(f"{blood_request.quantity} unit(s) of {blood_request.blood_group} reserved "
+                             f"from your stock for a request at {blood_request.location}."),
+                )
+            reservations.append(reservation)
+            break
+    return reservations
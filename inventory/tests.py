@@ -0,0 +1,174 @@
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from blood_requests.models import BloodRequest
+from notifications.models import Notification
+from .models import BloodStock, StockReservation
+from .stock import add_units, close, reserve
+
+User = get_user_model()
+
+
+def create_user(email, **extra):
+    extra.setdefault("is_active", True)
+    extra.setdefault("is_verified", True)
+    return User.objects.create_user(email=email, password="StrongPass!234", **extra)
+
+
+class StockOperationTests(APITestCase):
+    def setUp(self):
+        self.hospital = create_user("square@example.com", role="hospital", address="Panthapath, Dhaka")
+        self.client.force_authenticate(self.hospital)
+        self.url = reverse("inventory-stock-adjust")
+
+    def stock(self, blood_group="O+"):
+        return BloodStock.objects.get(hospital=self.hospital, blood_group=blood_group)
+
+    def test_adjust_adds_and_removes_units(self):
+        response = self.client.post(self.url, {"blood_group": "O+", "delta": 5}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["available"], 5)
+
+        response = self.client.post(self.url, {"blood_group": "O+", "delta": -2}, format="json")
+        self.assertEqual(response.data["available"], 3)
+
+        response = self.client.post(self.url, {"blood_group": "O+", "delta": -4}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.stock().available, 3)
+
+        response = self.client.get(reverse("inventory-stock"))
+        self.assertEqual([(row["blood_group"], row["available"]) for row in response.data], [("O+", 3)])
+
+    def test_adjust_is_bounded(self):
+        for delta in (10 ** 12, -10 ** 12):
+            response = self.client.post(self.url, {"blood_group": "O+", "delta": delta}, format="json")
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn("delta", response.data)
+        self.assertFalse(BloodStock.objects.exists())
+
+    def test_donor_cannot_adjust(self):
+        self.client.force_authenticate(create_user("donor@example.com"))
+        response = self.client.post(self.url, {"blood_group": "O+", "delta": 5}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_reserve_release_and_fulfil(self):
+        stock = add_units(self.hospital, "O+", 3)
+        blood_request = BloodRequest.objects.create(
+            requester=self.hospital, blood_group="O+", quantity=2, location="Dhaka", contact_info="017",
+        )
+
+        self.assertIsNone(reserve(stock.pk, blood_request, 4))
+        first = reserve(stock.pk, blood_request, 2)
+        self.assertIsNone(reserve(stock.pk, blood_request, 2))
+        stock.refresh_from_db()
+        self.assertEqual((stock.available, stock.reserved), (1, 2))
+
+        # Closing twice only moves the units once
+        self.assertTrue(close(first, StockReservation.RELEASED))
+        self.assertFalse(close(first, StockReservation.FULFILLED))
+        stock.refresh_from_db()
+        self.assertEqual((stock.available, stock.reserved), (3, 0))
+
+        second = reserve(stock.pk, blood_request, 2)
+        self.assertTrue(close(second, StockReservation.FULFILLED))
+        stock.refresh_from_db()
+        self.assertEqual((stock.available, stock.reserved), (1, 0))
+
+
+class AllocationTests(APITestCase):
+    def setUp(self):
+        self.requester = create_user("requester@example.com", role="requester")
+        self.near = create_user("near@example.com", role="hospital", address="Mirpur 10, Dhaka")
+        self.far = create_user("far@example.com", role="hospital", address="Sylhet")
+        self.donor = create_user("donor@example.com", blood_group="B+", availability_status="available",
+                                 address="Mirpur, Dhaka")
+        self.client.force_authenticate(self.requester)
+
+    def create(self, quantity=1):
+        response = self.client.post(reverse("blood-request-create"), {
+            "blood_group": "B+", "quantity": quantity, "location": "Mirpur 10, Dhaka", "contact_info": "017",
+        }, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return BloodRequest.objects.get(pk=response.data["id"])
+
+    def test_nearby_stock_is_reserved_before_donors_are_notified(self):
+        add_units(self.near, "B+", 2)
+        add_units(self.far, "B+", 10)
+        blood_request = self.create(quantity=2)
+
+        self.assertEqual(blood_request.status, "accepted")
+        reservation = StockReservation.objects.get(blood_request=blood_request)
+        self.assertEqual((reservation.stock.hospital, reservation.quantity), (self.near, 2))
+        # The hospital hears about it; no donor does
+        recipients = list(Notification.objects.filter(blood_request=blood_request).values_list("recipient", flat=True))
+        self.assertEqual(recipients, [self.near.pk])
+
+    def test_request_covered_from_stock_is_closed_to_donors(self):
+        add_units(self.near, "B+", 1)
+        blood_request = self.create()
+        self.assertEqual((blood_request.status, blood_request.is_active), ("accepted", False))
+
+        self.client.force_authenticate(self.donor)
+        response = self.client.get(reverse("blood-request-list"))
+        self.assertNotIn(blood_request.pk, [row["id"] for row in response.data["results"]])
+        response = self.client.post(reverse("blood-request-accept", args=[blood_request.pk]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_bulk_allocation_shares_one_stock_lookup(self):
+        self.client.force_authenticate(self.near)
+        add_units(self.near, "B+", 3)
+        add_units(self.far, "B+", 10)
+        response = self.client.post(reverse("blood-request-bulk-create"), {"requests": [
+            {"blood_group": "B+", "quantity": 2, "location": "Mirpur 10, Dhaka", "contact_info": "017"},
+            {"blood_group": "B+", "quantity": 2, "location": "Mirpur 10, Dhaka", "contact_info": "017"},
+            {"blood_group": "B+", "quantity": 1, "location": "Sylhet", "contact_info": "017"},
+        ]}, format="json")
+
+        # The first request takes 2 of the hospital's own 3 units, so the
+        # second no longer fits anywhere near Mirpur; the third, in Sylhet,
+        # takes the last own unit ahead of the Sylhet hospital
+        self.assertEqual(response.data["reserved_from_stock"], 2)
+        self.assertEqual(
+            [(row.blood_request.location, row.stock.hospital_id) for row in StockReservation.objects.order_by("pk")],
+            [("Mirpur 10, Dhaka", self.near.pk), ("Sylhet", self.near.pk)],
+        )
+        self.assertEqual(BloodStock.objects.get(hospital=self.near).available, 0)
+
+    def test_without_enough_stock_donors_are_notified(self):
+        add_units(self.near, "B+", 1)
+        blood_request = self.create(quantity=2)
+
+        self.assertEqual(blood_request.status, "pending")
+        self.assertFalse(StockReservation.objects.exists())
+        self.assertTrue(Notification.objects.filter(blood_request=blood_request, recipient=self.donor).exists())
+
+    def test_cancel_releases_and_complete_fulfils(self):
+        stock = add_units(self.near, "B+", 2)
+        cancelled = self.create()
+        completed = self.create()
+        stock.refresh_from_db()
+        self.assertEqual((stock.available, stock.reserved), (0, 2))
+
+        self.client.post(reverse("blood-request-cancel", args=[cancelled.pk]))
+        self.client.post(reverse("blood-request-complete", args=[completed.pk]))
+
+        stock.refresh_from_db()
+        self.assertEqual((stock.available, stock.reserved), (1, 0))
+        self.assertEqual(
+            dict(StockReservation.objects.values_list("blood_request", "status")),
+            {cancelled.pk: StockReservation.RELEASED, completed.pk: StockReservation.FULFILLED},
+        )
+
+    def test_availability_lookup(self):
+        add_units(self.near, "B+", 2)
+        add_units(self.far, "B+", 5)
+        url = reverse("inventory-availability")
+
+        response = self.client.get(url, {"blood_group": "B+", "location": "Mirpur 10, Dhaka"})
+        self.assertEqual([row["hospital_id"] for row in response.data["results"]], [self.near.pk])
+        response = self.client.get(url, {"blood_group": "B+"})
+        self.assertEqual([row["hospital_id"] for row in response.data["results"]], [self.far.pk, self.near.pk])
+        response = self.client.get(url, {"blood_group": "X"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,12 @@
+from django.urls import path
+from .views import StockAdjustView, StockAvailabilityView, StockListView, StockReservationListView
+
+urlpatterns = [
+    # Hospital's own stock
+    path('stock/', StockListView.as_view(), name='inventory-stock'),
+    path('stock/adjust/', StockAdjustView.as_view(), name='inventory-stock-adjust'),
+    path('reservations/', StockReservationListView.as_view(), name='inventory-reservations'),
+
+    # Who holds a blood group (near a location)
+    path('availability/', StockAvailabilityView.as_view(), name='inventory-availability'),
+]
@@ -0,0 +1,88 @@
+import operator
+from functools import reduce
+
+from django.db.models import Q
+from rest_framework import generics, permissions, serializers, status
+from rest_framework.response import Response
+
+from accounts.permissions import IsRole
+from blood_requests.dispatch import location_terms
+from blood_requests.models import BloodRequest
+from .models import BloodStock, StockReservation
+from .serializers import (
+    BloodStockSerializer,
+    StockAdjustSerializer,
+    StockAvailabilitySerializer,
+    StockReservationSerializer,
+)
+from .stock import add_units, remove_units
+
+
+# -------------------------
+# Hospital stock
+# -------------------------
+class StockListView(generics.ListAPIView):
+    serializer_class = BloodStockSerializer
+    permission_classes = [IsRole.with_roles('hospital')]
+    pagination_class = None
+
+    def get_queryset(self):
+        if getattr(self, 'swagger_fake_view', False):
+            return BloodStock.objects.none()
+        return BloodStock.objects.filter(hospital=self.request.user).order_by('blood_group')
+
+
+class StockAdjustView(generics.GenericAPIView):
+    """Add received units (positive delta) or take out used / expired ones (negative)."""
+    serializer_class = StockAdjustSerializer
+    permission_classes = [IsRole.with_roles('hospital')]
+
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        blood_group, delta = serializer.validated_data['blood_group'], serializer.validated_data['delta']
+
+        if delta > 0:
+            stock = add_units(request.user, blood_group, delta)
+        elif remove_units(request.user, blood_group, -delta):
+            stock = BloodStock.objects.get(hospital=request.user, blood_group=blood_group)
+        else:
+            return Response({"detail": "Not enough units available."}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(BloodStockSerializer(stock).data, status=status.HTTP_200_OK)
+
+
+class StockReservationListView(generics.ListAPIView):
+    """Units of this hospital's stock held for open requests."""
+    serializer_class = StockReservationSerializer
+    permission_classes = [IsRole.with_roles('hospital')]
+
+    def get_queryset(self):
+        if getattr(self, 'swagger_fake_view', False):
+            return StockReservation.objects.none()
+        return (
+            StockReservation.objects.filter(stock__hospital=self.request.user, status=StockReservation.HELD)
+            .select_related('stock', 'blood_request')
+            .order_by('-created_at')
+        )
+
+
+# -------------------------
+# Availability lookup
+# -------------------------
+class StockAvailabilityView(generics.ListAPIView):
+    """Hospitals holding units of ?blood_group=, optionally near ?location=."""
+    serializer_class = StockAvailabilitySerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        if getattr(self, 'swagger_fake_view', False):
+            return BloodStock.objects.none()
+        params = self.request.query_params
+        blood_group = params.get('blood_group')
+        if blood_group not in dict(BloodRequest.BLOOD_GROUP_CHOICES):
+            raise serializers.ValidationError({'blood_group': ['A valid blood group is required.']})
+        queryset = BloodStock.objects.filter(blood_group=blood_group, available__gt=0, hospital__is_active=True)
+        nearby = [Q(hospital__address__icontains=term) for term in location_terms(params.get('location'))]
+        if nearby:
+            queryset = queryset.filter(reduce(operator.or_, nearby))
+        return queryset.select_related('hospital').order_by('-available', 'pk')
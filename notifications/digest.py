@@ -0,0 +1,121 @@
+"""
+Email digests of unread notifications.
+
+``send_digests`` picks the users due for a digest (by their DigestPreference,
+or NOTIFICATION_DIGEST_DEFAULT_FREQUENCY without one), loads the unread
+notifications of a whole batch of users in one query and sends the emails
+over a single SMTP connection for the run.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import Exists, OuterRef, Q, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from accounts.models import User
+from .models import DigestPreference, Notification
+
+PERIODS = {
+    'daily': timedelta(days=1),
+    'weekly': timedelta(days=7),
+}
+
+
+def get_default_frequency():
+    return getattr(settings, 'NOTIFICATION_DIGEST_DEFAULT_FREQUENCY', 'daily')
+
+
+def get_max_items():
+    return getattr(settings, 'NOTIFICATION_DIGEST_MAX_ITEMS', 20)
+
+
+def due_users(frequency, now):
+    """
+    Users on ``frequency`` who haven't had a digest this period and have unread
+    notifications since their last one (or within the period, for a first digest).
+    """
+    cutoff = now - PERIODS[frequency]
+    on_frequency = Q(digest_preference__frequency=frequency)
+    if frequency == get_default_frequency():
+        on_frequency |= Q(digest_preference__isnull=True)
+    return (
+        User.objects.filter(on_frequency, is_active=True)
+        .filter(Q(digest_preference__last_sent_at__isnull=True) | Q(digest_preference__last_sent_at__lte=cutoff))
+        .annotate(digest_since=Coalesce('digest_preference__last_sent_at', Value(cutoff)))
+        .filter(Exists(Notification.objects.filter(
+            recipient=OuterRef('pk'), is_read=False, created_at__gt=OuterRef('digest_since'),
+        )))
+        .order_by('pk')
+    )
+
+
+def render_digest(user, notifications, total):
+    lines = [f"Hi {user['full_name'] or user['email']},", ""]
+    lines.append(f"You have {total} new notification{'s' if total != 1 else ''} on Hemogrid:")
+    lines.append("")
+    for notification in notifications:
+        blood_request = notification.blood_request
+        lines.append(
+            f"- {notification.message} ({blood_request.quantity} unit(s) at {blood_request.location}, "
+            f"{blood_request.get_urgency_display().lower()} urgency)"
+        )
+    if total > len(notifications):
+        lines.append(f"...and {total - len(notifications)} more.")
+    frontend = getattr(settings, 'FRONTEND_URL', None)
+    if frontend:
+        lines += ["", f"See them all: {str(frontend).rstrip('/')}/notifications"]
+    return "\n".join(lines)
+
+
+def build_messages(users):
+    """One digest EmailMessage per user dict (pk, email, full_name, digest_since)."""
+    by_id = {user['pk']: user for user in users}
+    since = min(user['digest_since'] for user in users)
+    pending = defaultdict(list)
+    unread = (
+        Notification.objects.filter(recipient_id__in=by_id, is_read=False, created_at__gt=since)
+        .select_related('blood_request')
+        .order_by('recipient_id', '-created_at')
+    )
+    for notification in unread:
+        if notification.created_at > by_id[notification.recipient_id]['digest_since']:
+            pending[notification.recipient_id].append(notification)
+
+    max_items = get_max_items()
+    messages = []
+    for pk, notifications in pending.items():
+        user = by_id[pk]
+        messages.append(EmailMessage(
+            subject=f"Hemogrid: {len(notifications)} new notification{'s' if len(notifications) != 1 else ''}",
+            body=render_digest(user, notifications[:max_items], len(notifications)),
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            to=[user['email']],
+        ))
+    return messages
+
+
+def send_digests(frequency, now=None, batch_size=200, connection=None):
+    """Send every due ``frequency`` digest; returns the number of emails sent."""
+    now = now or timezone.now()
+    connection = connection or get_connection()
+    sent = 0
+    last_pk = 0
+    with connection:
+        while True:
+            users = list(
+                due_users(frequency, now).filter(pk__gt=last_pk)
+                .values('pk', 'email', 'full_name', 'digest_since')[:batch_size]
+            )
+            if not users:
+                break
+            last_pk = users[-1]['pk']
+            messages = build_messages(users)
+            sent += connection.send_messages(messages) or 0
+            DigestPreference.objects.bulk_create(
+                [DigestPreference(user_id=user['pk'], frequency=frequency, last_sent_at=now) for user in users],
+                update_conflicts=True, unique_fields=['user'], update_fields=['last_sent_at'],
+            )
+    return sent
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from notifications.digest import PERIODS, send_digests
+
+
+class Command(BaseCommand):
+    help = 'Email each user a digest of their unread notifications (run daily from cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--frequency', choices=sorted(PERIODS), action='append',
+            help='Only send digests of this frequency (default: all)',
+        )
+        parser.add_argument('--batch-size', type=int, default=200, help='Users rendered per query/SMTP batch')
+
+    def handle(self, *args, **options):
+        for frequency in options['frequency'] or PERIODS:
+            sent = send_digests(frequency, batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'Sent {sent} {frequency} digests.'))
@@ -8,6 +8,28 @@ class Notification(models.Model):
     message = models.TextField()
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            # Conditional GET of a user's notification list (max(updated_at) per recipient)
+            models.Index(fields=['recipient', 'updated_at'], name='notification_recipient_upd_idx'),
+        ]
 
     def __str__(self):
         return f"Notification for {self.recipient.email} - Read: {self.is_read}"
+
+
+class DigestPreference(models.Model):
+    FREQUENCY_CHOICES = [
+        ('never', 'Never'),
+        ('daily', 'Daily'),
+        ('weekly', 'Weekly'),
+    ]
+
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='digest_preference')
+    frequency = models.CharField(max_length=10, choices=FREQUENCY_CHOICES, default='daily')
+    last_sent_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.user.email}: {self.frequency} digest"
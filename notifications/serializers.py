@@ -1,7 +1,8 @@
 from rest_framework import serializers
-from .models import Notification
+from hemogrid.fieldsets import SparseFieldsetMixin
+from .models import Notification, DigestPreference
 
-class NotificationSerializer(serializers.ModelSerializer):
+class NotificationSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     recipient_email = serializers.ReadOnlyField(source='recipient.email')
     blood_request_detail = serializers.ReadOnlyField(source='blood_request.id')
 
@@ -9,3 +10,10 @@ class NotificationSerializer(serializers.ModelSerializer):
         model = Notification
         fields = '__all__'
         read_only_fields = ['recipient', 'blood_request', 'created_at']
+
+
+class DigestPreferenceSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = DigestPreference
+        fields = ['frequency', 'last_sent_at']
+        read_only_fields = ['last_sent_at']
@@ -1,3 +1,141 @@
-from django.test import TestCase
+import io
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from blood_requests.models import BloodRequest
+from . import digest, throttle
+from .models import DigestPreference, Notification
+
+User = get_user_model()
+
+
+@override_settings(NOTIFICATION_DAILY_LIMIT=2, NOTIFICATION_DEDUP_WINDOW=3600)
+class NotificationThrottleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.hospital = User.objects.create_user(email="hospital@example.com", password="x", role="hospital")
+        self.other = User.objects.create_user(email="other@example.com", password="x", role="hospital")
+
+    def request(self, requester=None, blood_group="O-"):
+        return BloodRequest.objects.create(
+            requester=requester or self.hospital, blood_group=blood_group, quantity=1,
+            location="Dhaka", contact_info="017",
+        )
+
+    def test_same_request_is_deduplicated(self):
+        blood_request = self.request()
+        self.assertEqual(throttle.claim(blood_request, [1, 2]), [1, 2])
+        # Already told about this request
+        self.assertEqual(throttle.claim(blood_request, [1, 2, 3]), [3])
+        # Another request from the same hospital for the same group is another patient
+        self.assertEqual(throttle.claim(self.request(), [1]), [1])
+
+    def test_daily_budget(self):
+        throttle.claim(self.request(), [1])
+        throttle.claim(self.request(blood_group="A+"), [1])
+        self.assertEqual(throttle.claim(self.request(self.other), [1, 2]), [2])
+
+    def test_budget_is_charged_atomically(self):
+        # A second runner read the counter before the first one charged it
+        throttle.claim(self.request(), [1])
+        stale = {throttle.budget_key(1, timezone.localdate()): 1}
+        with mock.patch.object(cache, "get_many", return_value=stale):
+            self.assertEqual(throttle.claim(self.request(), [1]), [1])
+            self.assertEqual(throttle.claim(self.request(), [1]), [])
+        # The refused claim doesn't mark the request as told
+        self.assertNotIn(throttle.dedup_key(1, BloodRequest.objects.last()), cache)
+
+    def test_limit_only_charges_claimed_donors(self):
+        self.assertEqual(throttle.claim(self.request(), [1, 2, 3], limit=1), [1])
+        self.assertEqual(throttle.claim(self.request(self.other), [2, 3]), [2, 3])
+
+    @override_settings(NOTIFICATION_DAILY_LIMIT=None, NOTIFICATION_DEDUP_WINDOW=None)
+    def test_disabled(self):
+        blood_request = self.request()
+        for _ in range(3):
+            self.assertEqual(throttle.claim(blood_request, [1, 2]), [1, 2])
+
+
+@override_settings(
+    EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend",
+    DEFAULT_FROM_EMAIL="noreply@example.com",
+    NOTIFICATION_DIGEST_DEFAULT_FREQUENCY="daily",
+)
+class NotificationDigestTests(APITestCase):
+    def setUp(self):
+        mail.outbox.clear()
+        self.hospital = User.objects.create_user(email="hospital@example.com", password="x", role="hospital")
+        self.blood_request = BloodRequest.objects.create(
+            requester=self.hospital, blood_group="O-", quantity=2, location="Dhaka Medical", contact_info="017",
+        )
+        self.donors = [
+            User.objects.create_user(email=f"donor{i}@example.com", password="x", is_active=True) for i in range(3)
+        ]
+        for donor in self.donors:
+            self.notify(donor)
+
+    def notify(self, user, **extra):
+        return Notification.objects.create(
+            recipient=user, blood_request=self.blood_request, message="New blood request for O- near you!", **extra
+        )
+
+    def test_one_digest_per_user_over_one_connection(self):
+        self.notify(self.donors[0])
+        self.notify(self.donors[1], is_read=True)
+        DigestPreference.objects.create(user=self.donors[2], frequency="weekly")
+
+        with mock.patch("django.core.mail.backends.locmem.EmailBackend.open") as opened:
+            sent = digest.send_digests("daily", batch_size=1)
+
+        self.assertEqual(sent, 2)
+        self.assertEqual(opened.call_count, 1)
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox), ["donor0@example.com", "donor1@example.com"])
+        first = next(m for m in mail.outbox if m.to == ["donor0@example.com"])
+        self.assertIn("2 new notifications", first.body)
+        self.assertIn("Dhaka Medical", first.body)
+
+    def test_digest_not_repeated_within_period(self):
+        call_command("send_notification_digests", "--frequency", "daily", stdout=io.StringIO())
+        self.assertEqual(len(mail.outbox), 3)
+
+        self.notify(self.donors[0])
+        self.assertEqual(digest.send_digests("daily"), 0)
+        self.assertEqual(digest.send_digests("daily", now=timezone.now() + timedelta(days=1, minutes=1)), 1)
+        self.assertIn("1 new notification on", mail.outbox[-1].body)
+
+    def test_preference_endpoint(self):
+        self.client.force_authenticate(self.donors[0])
+        url = reverse("notification-digest")
+
+        self.assertEqual(self.client.get(url).data["frequency"], "daily")
+        response = self.client.patch(url, {"frequency": "never"}, format="json")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(digest.send_digests("daily"), 2)
+        self.assertNotIn(["donor0@example.com"], [m.to for m in mail.outbox])
+
+    def test_notification_list_sparse_fieldset(self):
+        self.client.force_authenticate(self.donors[0])
+        response = self.client.get(reverse("notification-list"), {"fields": "id,message,is_read"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.data["results"][0]), ["id", "message", "is_read"])
+
+    def test_notification_list_conditional_get(self):
+        self.client.force_authenticate(self.donors[0])
+        url = reverse("notification-list")
+        etag = self.client.get(url)["ETag"]
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        notification = Notification.objects.get(recipient=self.donors[0])
+        self.client.patch(reverse("notification-mark-read", args=[notification.pk]))
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
@@ -0,0 +1,92 @@
+"""
+Per-donor notification budget.
+
+Fan-out asks ``claim()`` which donors may be notified before it writes any
+Notification rows. Two cache-backed rules apply:
+
+* dedup: a donor hears about the same blood request at most once per
+  NOTIFICATION_DEDUP_WINDOW seconds, however many waves or runners reach them;
+* budget: at most NOTIFICATION_DAILY_LIMIT notifications per donor per day.
+
+Either setting may be None to disable that rule. Counters live in the cache
+named by NOTIFICATION_THROTTLE_CACHE, which must be shared by every process
+that notifies (see CACHES in settings); losing them only relaxes the limits.
+Claims use the cache's atomic add() and incr(), so concurrent runners can't
+both pass a donor's last unit of budget or both send the same notification.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+
+DEFAULT_DAILY_LIMIT = 5
+DEFAULT_DEDUP_WINDOW = 6 * 60 * 60
+BUDGET_TIMEOUT = 2 * 24 * 60 * 60
+
+
+def get_cache():
+    return caches[getattr(settings, 'NOTIFICATION_THROTTLE_CACHE', 'default')]
+
+
+def get_daily_limit():
+    return getattr(settings, 'NOTIFICATION_DAILY_LIMIT', DEFAULT_DAILY_LIMIT)
+
+
+def get_dedup_window():
+    return getattr(settings, 'NOTIFICATION_DEDUP_WINDOW', DEFAULT_DEDUP_WINDOW)
+
+
+def dedup_key(recipient_id, blood_request):
+    return f'notify:dedup:{recipient_id}:{blood_request.pk}'
+
+
+def budget_key(recipient_id, day):
+    return f'notify:budget:{recipient_id}:{day:%Y%m%d}'
+
+
+def charge(cache, key, daily_limit):
+    """Take one unit of the budget at ``key``; False if it was already spent."""
+    cache.add(key, 0, timeout=BUDGET_TIMEOUT)
+    try:
+        spent = cache.incr(key)
+    except ValueError:
+        # Evicted between add() and incr()
+        cache.add(key, 1, timeout=BUDGET_TIMEOUT)
+        spent = 1
+    return spent <= daily_limit
+
+
+def claim(blood_request, recipient_ids, limit=None):
+    """
+    Return up to ``limit`` of ``recipient_ids`` (in order) that may be notified
+    about ``blood_request``, and charge them against their budgets.
+    """
+    daily_limit = get_daily_limit()
+    window = get_dedup_window()
+    if daily_limit is None and window is None:
+        return list(recipient_ids)[:limit]
+
+    cache = get_cache()
+    day = timezone.localdate()
+    dedup_keys = {pk: dedup_key(pk, blood_request) for pk in recipient_ids} if window else {}
+    budget_keys = {pk: budget_key(pk, day) for pk in recipient_ids} if daily_limit is not None else {}
+    # One read to pass over the donors that clearly can't be notified; the
+    # atomic add()/incr() below decide for the rest
+    known = cache.get_many([*dedup_keys.values(), *budget_keys.values()])
+
+    allowed = []
+    for pk in recipient_ids:
+        if limit is not None and len(allowed) >= limit:
+            break
+        if dedup_keys and dedup_keys[pk] in known:
+            continue
+        if budget_keys and known.get(budget_keys[pk], 0) >= daily_limit:
+            continue
+        if dedup_keys and not cache.add(dedup_keys[pk], 1, timeout=window):
+            continue
+        if budget_keys and not charge(cache, budget_keys[pk], daily_limit):
+            if dedup_keys:
+                # Not notified after all
+                cache.delete(dedup_keys[pk])
+            continue
+        allowed.append(pk)
+    return allowed
@@ -1,7 +1,8 @@
 from django.urls import path
-from .views import UserNotificationsView, MarkNotificationReadView
+from .views import UserNotificationsView, MarkNotificationReadView, DigestPreferenceView
 
 urlpatterns = [
     path('', UserNotificationsView.as_view(), name='notification-list'),
     path('mark-read/<int:pk>/', MarkNotificationReadView.as_view(), name='notification-mark-read'),
+    path('digest/', DigestPreferenceView.as_view(), name='notification-digest'),
 ]
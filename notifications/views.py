@@ -1,10 +1,13 @@
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
-from .models import Notification
-from .serializers import NotificationSerializer
+from .models import Notification, DigestPreference
+from .serializers import NotificationSerializer, DigestPreferenceSerializer
+from .digest import get_default_frequency
+from hemogrid.conditional import ConditionalListMixin
+from hemogrid.fieldsets import SparseQuerysetMixin
 
 # List user's notifications
-class UserNotificationsView(generics.ListAPIView):
+class UserNotificationsView(ConditionalListMixin, SparseQuerysetMixin, generics.ListAPIView):
     serializer_class = NotificationSerializer
     permission_classes = [permissions.IsAuthenticated]
 
@@ -26,3 +29,14 @@ class MarkNotificationReadView(generics.UpdateAPIView):
         notification.is_read = True
         notification.save()
         return Response({"detail": "Notification marked as read"}, status=status.HTTP_200_OK)
+
+# Email digest frequency for the current user
+class DigestPreferenceView(generics.RetrieveUpdateAPIView):
+    serializer_class = DigestPreferenceSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_object(self):
+        preference, _ = DigestPreference.objects.get_or_create(
+            user=self.request.user, defaults={'frequency': get_default_frequency()}
+        )
+        return preference
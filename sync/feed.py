@@ -0,0 +1,196 @@
+"""
+Reading the change feed.
+
+A sync reads the log past the client's cursor (two range scans on the
+(owner_id, id) index: public changes and the user's own), collapses repeated
+changes to the same object and loads the objects' current state. Objects
+that are gone, deactivated or no longer visible come back as tombstones
+(their IDs under ``removed``). The cost follows the number of changes, not
+the size of the tables.
+
+Ids are handed out when a log insert starts, not when it commits, so a
+slow transaction (a large dispatch bulk_create) can commit lower ids after a
+quicker one's higher ids are already visible. The cursor therefore only
+moves over an unbroken run of ids: at the first missing id the feed stops
+and waits. An id missing for longer than SYNC_GAP_SECONDS (counted from the
+creation of the change after it) is taken to be a rolled-back insert and
+skipped; a transaction still open after that long can have its changes
+missed by clients already past them. One page looks at no more than
+SYNC_SCAN_WINDOW ids past the cursor, so a client far behind pays for a
+window per page, not for the whole log. A cursor older than
+the retained log (see the prune_sync_changes command) gets ``reset``: the
+client reloads its lists and continues from the returned cursor.
+"""
+import base64
+import binascii
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from rest_framework import serializers
+
+from .models import Change
+
+
+def get_page_size():
+    return getattr(settings, 'SYNC_PAGE_SIZE', 200)
+
+
+def get_max_page_size():
+    return getattr(settings, 'SYNC_MAX_PAGE_SIZE', 1000)
+
+
+def get_scan_window():
+    return getattr(settings, 'SYNC_SCAN_WINDOW', 5000)
+
+
+def get_gap_seconds():
+    return getattr(settings, 'SYNC_GAP_SECONDS', 60)
+
+
+# Cursor positions are Change ids (bigint)
+MAX_POSITION = 2 ** 63 - 1
+# Stale gaps skipped in one sync; any further ones wait for the next
+MAX_GAPS_PER_SYNC = 10
+
+
+# -------------------------
+# Cursors
+# -------------------------
+def encode_cursor(position):
+    return base64.urlsafe_b64encode(f'c{position}'.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        if not raw.startswith('c'):
+            raise ValueError(raw)
+        position = int(raw[1:])
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise serializers.ValidationError({'since': ['Invalid cursor.']})
+    if not 0 <= position <= MAX_POSITION:
+        raise serializers.ValidationError({'since': ['Invalid cursor.']})
+    return position
+
+
+# -------------------------
+# Object state per kind
+# -------------------------
+def blood_request_rows(user, pks):
+    from blood_requests.models import BloodRequest
+    from blood_requests.serializers import BloodRequestSerializer
+
+    rows = BloodRequest.objects.filter(pk__in=pks, is_active=True).select_related('requester').order_by('pk')
+    return BloodRequestSerializer(rows, many=True).data
+
+
+def notification_rows(user, pks):
+    from notifications.models import Notification
+    from notifications.serializers import NotificationSerializer
+
+    rows = Notification.objects.filter(pk__in=pks, recipient=user).select_related('recipient').order_by('pk')
+    return NotificationSerializer(rows, many=True).data
+
+
+# kind: (response key, loader of the visible rows among the changed pks)
+KINDS = {
+    Change.BLOOD_REQUEST: ('blood_requests', blood_request_rows),
+    Change.NOTIFICATION: ('notifications', notification_rows),
+}
+
+
+# -------------------------
+# Feed
+# -------------------------
+def contiguous_end(position):
+    """
+    The highest id the feed may advance to from ``position``: the end of the
+    unbroken run of ids after it, continuing past gaps older than
+    SYNC_GAP_SECONDS, and at most SYNC_SCAN_WINDOW ids ahead.
+    """
+    bound = min(position + get_scan_window(), MAX_POSITION)
+    window = Change.objects.filter(pk__lte=bound)
+    stale = timezone.now() - timedelta(seconds=get_gap_seconds())
+    end = position
+    for _ in range(MAX_GAPS_PER_SYNC):
+        following = window.filter(pk__gt=end).order_by('pk').values_list('pk', 'created_at').first()
+        if following is None:
+            return end
+        pk, created_at = following
+        if pk != end + 1 and created_at > stale:
+            # end + 1 .. pk - 1 may still commit
+            return end
+        successor = Change.objects.filter(pk=OuterRef('pk') + 1)
+        end = (
+            window.filter(pk__gte=pk).exclude(Exists(successor))
+            .order_by('pk').values_list('pk', flat=True).first()
+        )
+        if end is None:
+            # Unbroken up to the bound; the next page carries on from there
+            return bound
+    return end
+
+
+def head():
+    """Cursor position to start from: the end of the run that reaches past the stale changes."""
+    stale = timezone.now() - timedelta(seconds=get_gap_seconds())
+    start = Change.objects.filter(created_at__lte=stale).order_by('-pk').values_list('pk', flat=True).first()
+    if start is None:
+        oldest = Change.objects.order_by('pk').values_list('pk', flat=True).first()
+        start = oldest - 1 if oldest else 0
+    return contiguous_end(start)
+
+
+def is_expired(position):
+    oldest = Change.objects.order_by('pk').values_list('pk', flat=True).first()
+    return oldest is not None and position < oldest - 1
+
+
+def read_changes(user, position, end, limit):
+    """([(pk, kind, object_id)], has_more): the next ``limit`` changes ``user`` may see up to ``end``."""
+    if end <= position:
+        return [], False
+    after = Change.objects.filter(pk__gt=position, pk__lte=end).order_by('pk')
+    columns = ('pk', 'kind', 'object_id')
+    public = list(after.filter(owner_id__isnull=True).values_list(*columns)[:limit + 1])
+    own = list(after.filter(owner_id=user.pk).values_list(*columns)[:limit + 1])
+    entries = sorted(public + own)[:limit + 1]
+    return entries[:limit], len(entries) > limit
+
+
+def sync(user, since=None, limit=None):
+    """The feed response for ``user`` after the cursor ``since``."""
+    limit = min(limit or get_page_size(), get_max_page_size())
+    position = decode_cursor(since) if since else None
+    response = {'cursor': None, 'reset': False, 'has_more': False}
+    response.update({key: [] for key, _ in KINDS.values()})
+    response['removed'] = {key: [] for key, _ in KINDS.values()}
+
+    if position is None or is_expired(position):
+        response.update(cursor=encode_cursor(head()), reset=True)
+        return response
+
+    end = contiguous_end(position)
+    entries, page_full = read_changes(user, position, end, limit)
+    has_more = page_full
+    if not page_full and end == position + get_scan_window():
+        # The scan stopped at the window, not at the head of the log
+        has_more = Change.objects.filter(pk__gt=end).exists()
+    changed = {kind: [] for kind in KINDS}
+    for _, kind, object_id in entries:
+        if object_id not in changed[kind]:
+            changed[kind].append(object_id)
+    for kind, pks in changed.items():
+        if not pks:
+            continue
+        key, load = KINDS[kind]
+        rows = load(user, pks)
+        response[key] = rows
+        present = {row['id'] for row in rows}
+        response['removed'][key] = [pk for pk in pks if pk not in present]
+
+    # With the page complete, skip ahead over the other users' changes too
+    response.update(cursor=encode_cursor(entries[-1][0] if page_full else end), has_more=has_more)
+    return response
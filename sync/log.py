@@ -0,0 +1,37 @@
+"""
+Recording changes for the sync feed.
+
+Saves and deletes of blood requests and notifications are logged by the
+receivers in signals.py. Writes that bypass signals (bulk_create,
+queryset.update()) must call ``record`` themselves.
+
+Entries are inserted after the surrounding transaction commits, each batch
+in its own short transaction, so ids are handed out close to commit order
+and rolled back writes never appear.
+"""
+from django.db import transaction
+
+from .models import Change
+
+
+def record(kind, pks, owner_ids=None):
+    """Log a change to each object in ``pks`` (with matching ``owner_ids``) on commit."""
+    pks = list(pks)
+    if not pks:
+        return
+    owner_ids = list(owner_ids) if owner_ids is not None else [None] * len(pks)
+    transaction.on_commit(lambda: Change.objects.bulk_create([
+        Change(kind=kind, object_id=pk, owner_id=owner_id) for pk, owner_id in zip(pks, owner_ids)
+    ]))
+
+
+def record_blood_requests(blood_requests):
+    record(Change.BLOOD_REQUEST, [blood_request.pk for blood_request in blood_requests])
+
+
+def record_notifications(notifications):
+    record(
+        Change.NOTIFICATION,
+        [notification.pk for notification in notifications],
+        [notification.recipient_id for notification in notifications],
+    )
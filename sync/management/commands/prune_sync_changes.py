@@ -0,0 +1,24 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from sync.models import Change
+
+
+class Command(BaseCommand):
+    help = 'Delete sync change log entries older than the retention period (run daily from cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=getattr(settings, 'SYNC_RETENTION_DAYS', 30),
+            help='Keep this many days of changes; older cursors have to reset',
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        # The newest entry always stays so expired cursors can still be told apart
+        newest = Change.objects.order_by('-pk').values_list('pk', flat=True).first()
+        deleted, _ = Change.objects.filter(created_at__lt=cutoff).exclude(pk=newest).delete()
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} changes.'))
@@ -0,0 +1,32 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Change(models.Model):
+    """
+    One row per write to a synced object, appended once the write commits
+    (see log.py). The id is the change sequence clients sync from.
+    """
+    BLOOD_REQUEST = 'blood_request'
+    NOTIFICATION = 'notification'
+    KIND_CHOICES = [
+        (BLOOD_REQUEST, 'Blood request'),
+        (NOTIFICATION, 'Notification'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    # The only user who may see the object (a notification's recipient); empty
+    # for public objects. A plain ID so the log outlives deleted users.
+    owner_id = models.BigIntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # Both feed reads: owner_id IS NULL / owner_id = %s, then id > cursor
+            models.Index(fields=['owner_id', 'id'], name='sync_change_owner_id_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id} (#{self.pk})"
@@ -0,0 +1,21 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from blood_requests.models import BloodRequest
+from notifications.models import Notification
+
+from .log import record_blood_requests, record_notifications
+
+
+@receiver(post_save, sender=BloodRequest)
+@receiver(post_delete, sender=BloodRequest)
+def blood_request_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        record_blood_requests([instance])
+
+
+@receiver(post_save, sender=Notification)
+@receiver(post_delete, sender=Notification)
+def notification_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        record_notifications([instance])
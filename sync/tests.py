@@ -0,0 +1,184 @@
+import io
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from blood_requests.models import BloodRequest
+from notifications.models import Notification
+from .feed import decode_cursor, encode_cursor
+from .models import Change
+
+User = get_user_model()
+
+
+class ChangeFeedTests(APITestCase):
+    def setUp(self):
+        self.requester = User.objects.create_user(email="requester@example.com", password="x", is_active=True)
+        self.donor = User.objects.create_user(email="donor@example.com", password="x", is_active=True)
+        self.other = User.objects.create_user(email="other@example.com", password="x", is_active=True)
+        self.client.force_authenticate(self.donor)
+        self.url = reverse("sync-changes")
+
+    def create_request(self, **extra):
+        data = {"blood_group": "O+", "quantity": 1, "location": "Dhaka", "contact_info": "017"}
+        data.update(extra)
+        with self.captureOnCommitCallbacks(execute=True):
+            return BloodRequest.objects.create(requester=self.requester, **data)
+
+    def notify(self, user, blood_request):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Notification.objects.create(recipient=user, blood_request=blood_request, message="Needed")
+
+    def start(self):
+        response = self.client.get(self.url)
+        self.assertTrue(response.data["reset"])
+        return response.data["cursor"]
+
+    def test_changes_since_cursor(self):
+        existing = self.create_request(location="Before")
+        cursor = self.start()
+
+        blood_request = self.create_request(location="Sylhet")
+        mine = self.notify(self.donor, blood_request)
+        self.notify(self.other, blood_request)
+        response = self.client.get(self.url, {"since": cursor})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.data["reset"])
+        self.assertEqual([row["id"] for row in response.data["blood_requests"]], [blood_request.pk])
+        self.assertEqual([row["id"] for row in response.data["notifications"]], [mine.pk])
+        self.assertNotIn(existing.pk, [row["id"] for row in response.data["blood_requests"]])
+
+        # Nothing new since
+        response = self.client.get(self.url, {"since": response.data["cursor"]})
+        self.assertEqual(response.data["blood_requests"], [])
+        self.assertEqual(response.data["removed"], {"blood_requests": [], "notifications": []})
+
+    def test_tombstones(self):
+        blood_request = self.create_request()
+        notification_id = self.notify(self.donor, blood_request).pk
+        cursor = self.start()
+
+        blood_request.is_active = False
+        blood_request.status = "cancelled"
+        with self.captureOnCommitCallbacks(execute=True):
+            blood_request.save()
+            Notification.objects.get(pk=notification_id).delete()
+        response = self.client.get(self.url, {"since": cursor})
+
+        self.assertEqual(response.data["blood_requests"], [])
+        self.assertEqual(response.data["removed"], {
+            "blood_requests": [blood_request.pk], "notifications": [notification_id],
+        })
+
+    def test_expiry_sweep_is_recorded(self):
+        blood_request = self.create_request(expires_at=timezone.now() - timedelta(minutes=1))
+        cursor = self.start()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("expire_blood_requests", "--once", stdout=io.StringIO())
+        response = self.client.get(self.url, {"since": cursor})
+        self.assertEqual(response.data["removed"]["blood_requests"], [blood_request.pk])
+
+    def test_pages_and_repeated_changes(self):
+        cursor = self.start()
+        requests = [self.create_request(location=f"Clinic {i}") for i in range(3)]
+        with self.captureOnCommitCallbacks(execute=True):
+            requests[0].save()
+            requests[0].save()
+
+        response = self.client.get(self.url, {"since": cursor, "limit": 2})
+        self.assertTrue(response.data["has_more"])
+        self.assertEqual([row["id"] for row in response.data["blood_requests"]], [r.pk for r in requests[:2]])
+
+        # Cursor expiry check, finding the end of the unbroken run of ids (next
+        # id, end of run, nothing after it), two range scans and one load
+        with self.assertNumQueries(7):
+            response = self.client.get(self.url, {"since": response.data["cursor"], "limit": 10})
+        self.assertFalse(response.data["has_more"])
+        self.assertEqual([row["id"] for row in response.data["blood_requests"]], [requests[0].pk, requests[2].pk])
+
+    def test_cursor_stops_at_uncommitted_ids(self):
+        cursor = self.start()
+        first, pending, last = (self.create_request(location=f"Clinic {i}") for i in range(3))
+        # The middle change is still being written by a slower transaction
+        gap = Change.objects.get(object_id=pending.pk)
+        gap_id = gap.pk
+        gap.delete()
+
+        response = self.client.get(self.url, {"since": cursor})
+        self.assertEqual([row["id"] for row in response.data["blood_requests"]], [first.pk])
+        response = self.client.get(self.url, {"since": response.data["cursor"]})
+        self.assertEqual(response.data["blood_requests"], [])
+
+        # It commits: the feed carries on from the gap
+        gap.pk = gap_id
+        gap.save()
+        response = self.client.get(self.url, {"since": response.data["cursor"]})
+        self.assertEqual([row["id"] for row in response.data["blood_requests"]], [pending.pk, last.pk])
+
+    def test_stale_gap_is_skipped(self):
+        cursor = self.start()
+        first, rolled_back, last = (self.create_request(location=f"Clinic {i}") for i in range(3))
+        Change.objects.filter(object_id=rolled_back.pk).delete()
+        with override_settings(SYNC_GAP_SECONDS=60):
+            response = self.client.get(self.url, {"since": cursor})
+            self.assertEqual([row["id"] for row in response.data["blood_requests"]], [first.pk])
+
+            Change.objects.update(created_at=timezone.now() - timedelta(minutes=5))
+            response = self.client.get(self.url, {"since": response.data["cursor"]})
+            self.assertEqual([row["id"] for row in response.data["blood_requests"]], [last.pk])
+
+    def test_long_log_is_read_one_window_per_page(self):
+        cursor = self.start()
+        first = self.create_request(location="Sylhet")
+        # Mostly other users' changes, which the donor never sees
+        Change.objects.bulk_create([
+            Change(kind=Change.NOTIFICATION, object_id=i, owner_id=self.other.pk) for i in range(240)
+        ])
+        last = self.create_request(location="Rangpur")
+
+        seen, queries = [], []
+        with override_settings(SYNC_SCAN_WINDOW=50):
+            while True:
+                position = decode_cursor(cursor)
+                with CaptureQueriesContext(connection) as captured:
+                    response = self.client.get(self.url, {"since": cursor})
+                queries.append(len(captured))
+                cursor = response.data["cursor"]
+                self.assertLessEqual(decode_cursor(cursor) - position, 50)
+                seen += [row["id"] for row in response.data["blood_requests"]]
+                if not response.data["has_more"]:
+                    break
+
+        # 242 changes in windows of 50 ids, each page a fixed number of queries
+        self.assertEqual(len(queries), 5)
+        self.assertLessEqual(max(queries), 8)
+        self.assertEqual(seen, [first.pk, last.pk])
+
+    def test_invalid_cursor(self):
+        for since in ("not a cursor", encode_cursor(10 ** 23), encode_cursor(-1)):
+            response = self.client.get(self.url, {"since": since})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn("since", response.data)
+
+    def test_pruned_cursor_resets(self):
+        self.create_request()
+        cursor = self.start()
+        self.create_request()
+        self.create_request()
+        Change.objects.update(created_at=timezone.now() - timedelta(days=40))
+
+        call_command("prune_sync_changes", "--days", "30", stdout=io.StringIO())
+        # The newest entry is kept
+        self.assertEqual(Change.objects.count(), 1)
+        response = self.client.get(self.url, {"since": cursor})
+        self.assertTrue(response.data["reset"])
+        self.assertEqual(response.data["cursor"], encode_cursor(Change.objects.get().pk))
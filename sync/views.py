@@ -0,0 +1,28 @@
+from rest_framework import permissions, serializers
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .feed import sync
+
+
+class ChangeFeedQuerySerializer(serializers.Serializer):
+    since = serializers.CharField(required=False, help_text="Cursor from the previous sync; omit to start over.")
+    limit = serializers.IntegerField(required=False, min_value=1, help_text="Most changes to return.")
+
+
+class ChangeFeedView(APIView):
+    """
+    Blood requests and notifications created, changed or removed since a cursor.
+
+    Start without ``since``: the response has ``reset: true`` and a cursor;
+    load the lists as usual, then pass the cursor back. Each sync returns the
+    current state of changed objects, the IDs of removed ones and the next
+    cursor; repeat while ``has_more``. ``reset: true`` later on means the
+    cursor expired and the lists must be reloaded.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        query = ChangeFeedQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        return Response(sync(request.user, **query.validated_data))